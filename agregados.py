@@ -0,0 +1,363 @@
+import numpy as np
+import pandas as pd
+
+# Dimensões usadas pelos gráficos do dashboard
+DIMENSOES = [
+    'NO_REGIAO',
+    'NO_UF',
+    'SG_UF',
+    'TP_LOCALIZACAO',
+    'TP_DEPENDENCIA',
+    'NU_ANO_CENSO',
+    'NO_CURSO_EDUC_PROFISSIONAL',
+]
+
+# Medidas somadas no cubo
+SOMAS = [
+    'QT_MAT_CURSO_TEC',
+    'QT_CURSO_TEC',
+    'QT_CURSO_TEC_CT',
+    'QT_CURSO_TEC_NM',
+    'QT_CURSO_TEC_CONC',
+    'QT_CURSO_TEC_SUBS',
+    'QT_CURSO_TEC_EJA',
+]
+
+# Medidas contadas no cubo (número de linhas não nulas)
+CONTAGENS = ['NO_ENTIDADE']
+
+# Agregações usadas pelos gráficos, calculadas já na inicialização
+AGREGACOES_PADRAO = [
+    (('NO_REGIAO',), ('NO_ENTIDADE',)),
+    (('TP_LOCALIZACAO',), ('NO_ENTIDADE',)),
+    (('TP_DEPENDENCIA',), ('NO_ENTIDADE',)),
+    (('NO_UF',), ('NO_ENTIDADE',)),
+    (('NU_ANO_CENSO', 'NO_REGIAO'), ('NO_ENTIDADE',)),
+    (('NO_CURSO_EDUC_PROFISSIONAL',), ('QT_MAT_CURSO_TEC',)),
+    (('NO_UF',), ('QT_MAT_CURSO_TEC',)),
+    (('NO_UF',), ('QT_CURSO_TEC_CT', 'QT_CURSO_TEC_SUBS')),
+    (('TP_DEPENDENCIA',), ('QT_MAT_CURSO_TEC',)),
+    (('NU_ANO_CENSO',), ('QT_MAT_CURSO_TEC',)),
+    (('NO_REGIAO', 'NO_CURSO_EDUC_PROFISSIONAL'), ('QT_MAT_CURSO_TEC',)),
+    (('SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL'), ('QT_MAT_CURSO_TEC',)),
+]
+
+# Níveis do drill-down, do mais geral ao mais fino: (chave, rótulo)
+NIVEIS_HIERARQUIA = [
+    ('NO_REGIAO', 'NO_REGIAO'),
+    ('SG_UF', 'SG_UF'),
+    ('CO_MUNICIPIO', 'NO_MUNICIPIO'),
+    ('CO_ENTIDADE', 'NO_ENTIDADE'),
+]
+
+
+def agregar_linhas(dados):
+    """Cubo (somas e contagens por DIMENSOES) de um conjunto de linhas."""
+    colunas = {m: (m, 'sum') for m in SOMAS}
+    colunas.update({m: (m, 'count') for m in CONTAGENS})
+    # Contadores vêm em int8/int32 da base; somas em int64 evitam estouro
+    dados = dados[DIMENSOES + CONTAGENS].join(dados[SOMAS].astype('int64'))
+    return dados.groupby(DIMENSOES, dropna=False, observed=True).agg(**colunas).reset_index()
+
+
+def combinar_cubos(cubos):
+    """Soma cubos parciais; contagens já agregadas também são somadas."""
+    juntos = pd.concat(cubos, ignore_index=True)
+    return juntos.groupby(DIMENSOES, dropna=False, observed=True)[SOMAS + CONTAGENS].sum().reset_index()
+
+
+def juntar_serie(particoes, cubo):
+    """Série multi-anual com os resumos das partições para os anos que não
+    estão no `cubo` e o próprio cubo para os anos carregados.
+
+    Assim uma correção no CSV do ano carregado chega à série sem esperar
+    um novo `python ingestao.py`.
+    """
+    dimensoes = [coluna for coluna in particoes.columns if coluna in DIMENSOES]
+    medidas = [coluna for coluna in particoes.columns if coluna not in DIMENSOES]
+    anos = cubo['NU_ANO_CENSO'].dropna().unique()
+    outros_anos = particoes[~particoes['NU_ANO_CENSO'].isin(anos).to_numpy()]
+    carregados = cubo.groupby(dimensoes, observed=True)[medidas].sum().reset_index()
+    serie = pd.concat([outros_anos, carregados], ignore_index=True)
+    return serie.sort_values(dimensoes, kind='stable').reset_index(drop=True)
+
+
+def _mesmos_tipos(ajustada, tabela):
+    # Categorias da tabela original (mais as que surgirem), para que a versão
+    # ajustada agrupe e ordene como uma recalculada da base
+    tipos = {}
+    for coluna in tabela.columns:
+        tipo = tabela[coluna].dtype
+        if isinstance(tipo, pd.CategoricalDtype):
+            novas = set(ajustada[coluna].dropna()) - set(tipo.categories)
+            if novas:
+                tipo = pd.CategoricalDtype(sorted(set(tipo.categories) | novas))
+        tipos[coluna] = tipo
+    return ajustada[list(tabela.columns)].astype(tipos)
+
+
+def ajustar_tabela(tabela, dimensoes, medidas, mais, menos, linhas, dropna=True):
+    """`tabela` (soma de `medidas` por `dimensoes`) com a parcial `mais`
+    somada e `menos` subtraída.
+
+    As parciais podem estar num nível mais fino que a tabela (o do cubo, por
+    exemplo): só elas e a tabela são reagrupadas, sem voltar à base. Um
+    grupo tocado que zerou todas as medidas continua só se ainda tiver
+    linhas em `linhas` (a base nova), pois soma zero não é grupo vazio.
+    """
+    dimensoes, medidas = list(dimensoes), list(medidas)
+    parciais = pd.concat([mais[dimensoes + medidas],
+                          menos[dimensoes + medidas].assign(**{m: -menos[m] for m in medidas})],
+                         ignore_index=True)
+    if parciais.empty:
+        return tabela
+    juntas = pd.concat([tabela[dimensoes + medidas], parciais], ignore_index=True)
+    ajustada = juntas.groupby(dimensoes, observed=True, dropna=dropna)[medidas].sum().reset_index()
+    zerados = ajustada[(ajustada[medidas] == 0).all(axis=1).to_numpy()]
+    zerados = zerados[dimensoes].merge(parciais[dimensoes].drop_duplicates(), on=dimensoes)
+    if len(zerados):
+        presentes = linhas[dimensoes].merge(zerados, on=dimensoes).drop_duplicates()
+        presentes['_presente'] = True
+        marcados = ajustada[dimensoes].merge(zerados.assign(_zerado=True), on=dimensoes, how='left')
+        marcados = marcados.merge(presentes, on=dimensoes, how='left')
+        vazio = (marcados['_zerado'].notna() & marcados['_presente'].isna()).to_numpy()
+        ajustada = ajustada[~vazio].reset_index(drop=True)
+    return _mesmos_tipos(ajustada, tabela)
+
+
+def selecionar_top(df, medida, n, grupo=None, crescente=False):
+    """Os `n` maiores/menores de `medida`, no geral ou por `grupo`.
+
+    Sem grupo usa seleção parcial (nlargest/nsmallest). Por grupo faz uma
+    única ordenação numpy por (grupo, medida) e corta pela posição dentro
+    do grupo, sem o sort_values + groupby.head do pandas. Empates mantêm a
+    ordem original das linhas.
+    """
+    if grupo is None:
+        if crescente:
+            return df.nsmallest(n, medida)
+        return df.nlargest(n, medida)
+    codigos = pd.factorize(df[grupo], sort=True)[0]
+    valores = df[medida].to_numpy()
+    chave = valores if crescente else -valores
+    ordem = np.lexsort((np.arange(len(df)), chave, codigos))
+    ordem = ordem[codigos[ordem] >= 0]  # grupos nulos ficam de fora, como no groupby
+    codigos = codigos[ordem]
+    # Posição de cada linha dentro do seu grupo
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    posicao = np.arange(len(ordem)) - np.repeat(inicios, np.diff(np.r_[inicios, len(ordem)]))
+    return df.iloc[ordem[posicao < n]]
+
+
+def agrupar_cauda(df, dimensoes, medidas, coluna, limite, rotulo='Outros'):
+    """Soma numa única categoria `rotulo` os valores de `coluna` além dos
+    `limite - 1` de maior total (pela primeira medida).
+
+    Sem efeito com `limite` 0 ou até `limite` categorias. As outras
+    dimensões são mantidas: num gráfico empilhado cada barra ganha um
+    segmento `rotulo`, depois dos demais.
+    """
+    if not limite:
+        return df
+    totais = df.groupby(coluna, observed=True)[medidas[0]].sum()
+    if len(totais) <= limite:
+        return df
+    principais = df[coluna].isin(totais.nlargest(limite - 1).index).to_numpy()
+    outras = [d for d in dimensoes if d != coluna]
+    cauda = df[~principais]
+    if outras:
+        cauda = cauda.groupby(outras, observed=True, sort=False)[list(medidas)].sum().reset_index()
+    else:
+        cauda = pd.DataFrame([cauda[list(medidas)].sum()])
+    cauda[coluna] = rotulo
+    resultado = pd.concat([df[principais].astype({coluna: object}), cauda], ignore_index=True)
+    return resultado[list(df.columns)]
+
+
+class CuboAgregado:
+    """Camada de agregados pré-calculados a partir da base carregada.
+
+    O cubo guarda somas e contagens no nível mais fino das dimensões dos
+    gráficos; cada agregação pedida é obtida somando o cubo (bem menor que
+    a base) e fica guardada para as próximas requisições.
+
+    `serie` é o resumo multi-anual das partições (ver `ingestao.py`); quando
+    informado, as agregações por NU_ANO_CENSO cobertas por ele são lidas
+    dali em vez do cubo, que só tem o ano carregado. O ano carregado vem
+    sempre do cubo, não da partição dele (ver `juntar_serie`).
+    """
+
+    def __init__(self, dados, serie=None):
+        self._preparar(agregar_linhas(dados), serie)
+
+    @classmethod
+    def de_blocos(cls, blocos, serie=None):
+        """Monta o cubo a partir de um iterável de blocos de linhas.
+
+        Cada bloco é agregado e somado ao cubo acumulado, de modo que as
+        linhas originais nunca ficam todas em memória.
+        """
+        cubo = None
+        for bloco in blocos:
+            parcial = agregar_linhas(bloco)
+            cubo = parcial if cubo is None else combinar_cubos([cubo, parcial])
+        if cubo is None:
+            raise ValueError("Nenhum bloco de dados para agregar")
+        instancia = cls.__new__(cls)
+        instancia._preparar(cubo, serie)
+        return instancia
+
+    def _preparar(self, cubo, serie):
+        self.cubo = cubo
+        self._particoes = serie
+        self.serie = None if serie is None else juntar_serie(serie, cubo)
+        # Posições das linhas do cubo de cada UF, para filtrar sem varrer o cubo
+        self._linhas_uf = self.cubo.groupby('SG_UF', observed=True).indices
+        self._agregacoes = {}
+        self._rankings = {}
+        # Cruzamentos pesados entregues pelo pré-cálculo (ver precomputo.py)
+        self._cruzamentos = {}
+        for dimensoes, medidas in AGREGACOES_PADRAO:
+            self.agregar(dimensoes, medidas)
+
+    def agregar(self, dimensoes, medidas, ufs=None):
+        """Retorna uma cópia do agrupamento de `medidas` por `dimensoes`.
+
+        Com `ufs` (lista de siglas) só as linhas do cubo desses estados são
+        usadas; o resultado filtrado não é guardado.
+        """
+        if ufs:
+            return self._agregar_ufs(dimensoes, medidas, ufs)
+        chave = (tuple(dimensoes), tuple(medidas))
+        if chave not in self._agregacoes:
+            self._agregacoes[chave] = (
+                self._origem(dimensoes, medidas)
+                .groupby(list(dimensoes), observed=True)[list(medidas)].sum().reset_index()
+            )
+        # Cópia para que os gráficos possam renomear/adicionar colunas
+        return self._agregacoes[chave].copy()
+
+    def top_n(self, dimensoes, medida, n, grupo=None, crescente=False, ufs=None):
+        """Os `n` maiores (menores com `crescente`) valores de `medida`.
+
+        Com `grupo`, seleciona os `n` maiores dentro de cada valor daquela
+        dimensão, ordenados por grupo e depois pela medida (ver
+        `selecionar_top`). Sem filtro de UF o ranking fica guardado e pedidos
+        com `n` menor são só um recorte dele.
+        """
+        if ufs:
+            return selecionar_top(self.agregar(dimensoes, [medida], ufs=ufs), medida, n, grupo, crescente)
+        chave = (tuple(dimensoes), medida, grupo, crescente)
+        calculado = self._rankings.get(chave)
+        if calculado is None or calculado[0] < n:
+            ranking = selecionar_top(self.agregar(dimensoes, [medida]), medida, n, grupo, crescente)
+            self._rankings[chave] = calculado = (n, ranking)
+        ranking = calculado[1]
+        if calculado[0] > n:
+            ranking = ranking.groupby(grupo, observed=True).head(n) if grupo else ranking.head(n)
+        return ranking.copy()
+
+    def _origem(self, dimensoes, medidas):
+        colunas = set(dimensoes) | set(medidas)
+        if self.serie is not None and 'NU_ANO_CENSO' in dimensoes and colunas <= set(self.serie.columns):
+            return self.serie
+        return self.cubo
+
+    def _agregar_ufs(self, dimensoes, medidas, ufs):
+        posicoes = [self._linhas_uf[uf] for uf in ufs if uf in self._linhas_uf]
+        if not posicoes:
+            return pd.DataFrame(columns=list(dimensoes) + list(medidas))
+        linhas = self.cubo.take(np.sort(np.concatenate(posicoes)))
+        return linhas.groupby(list(dimensoes), observed=True)[list(medidas)].sum().reset_index()
+
+    def com_delta(self, adicionadas, removidas, linhas):
+        """Novo cubo com as linhas `adicionadas` somadas e as `removidas`
+        subtraídas (ver incremental.py); `linhas` é a base nova inteira.
+
+        O cubo e as agregações já guardadas são ajustados só pelas parciais
+        dessas linhas e os rankings guardados são refeitos a partir das
+        agregações ajustadas; a série multi-anual é refeita com o ano
+        carregado do cubo novo e as agregações dela, recalculadas (são
+        pequenas). Os cruzamentos são copiados como estão (ver
+        precomputo.ajustar_cruzamentos). Este cubo não muda: requisições em
+        andamento continuam com ele.
+        """
+        mais, menos = agregar_linhas(adicionadas), agregar_linhas(removidas)
+        novo = CuboAgregado.__new__(CuboAgregado)
+        novo.cubo = ajustar_tabela(self.cubo, DIMENSOES, SOMAS + CONTAGENS, mais, menos, linhas, dropna=False)
+        novo._particoes = self._particoes
+        novo.serie = None if self._particoes is None else juntar_serie(self._particoes, novo.cubo)
+        novo._linhas_uf = novo.cubo.groupby('SG_UF', observed=True).indices
+        novo._cruzamentos = dict(self._cruzamentos)
+        novo._agregacoes = {}
+        for (dimensoes, medidas), agregado in self._agregacoes.items():
+            if self.serie is not None and self._origem(dimensoes, medidas) is self.serie:
+                novo._agregacoes[(dimensoes, medidas)] = (
+                    novo.serie.groupby(list(dimensoes), observed=True)[list(medidas)].sum().reset_index()
+                )
+            else:
+                novo._agregacoes[(dimensoes, medidas)] = ajustar_tabela(agregado, dimensoes, medidas, mais, menos, linhas)
+        novo._rankings = {}
+        for (dimensoes, medida, grupo, crescente), (n, _) in self._rankings.items():
+            ranking = selecionar_top(novo.agregar(dimensoes, [medida]), medida, n, grupo, crescente)
+            novo._rankings[(dimensoes, medida, grupo, crescente)] = (n, ranking)
+        return novo
+
+    def registrar_cruzamento(self, nome, resultado):
+        self._cruzamentos[nome] = resultado
+
+    def cruzamento(self, nome, copia=True):
+        """Cópia do cruzamento `nome`; None enquanto o pré-cálculo não terminou.
+
+        Com `copia=False` retorna a própria tabela, só para leitura.
+        """
+        resultado = self._cruzamentos.get(nome)
+        if resultado is None or not copia:
+            return resultado
+        return resultado.copy()
+
+    def ufs(self):
+        """Siglas das UFs presentes no cubo, em ordem alfabética."""
+        return list(self._linhas_uf)
+
+
+def _chave_simples(valor):
+    # Códigos chegam do navegador como int; os do pandas como escalares numpy
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+class Hierarquia:
+    """Filhos de cada nó do drill-down Região -> UF -> Município -> Escola.
+
+    Montada uma vez a partir do cruzamento `escolas` (uma linha por escola,
+    ver precomputo.py): para cada nó guarda a tabela dos seus filhos já
+    somada e ordenada, de modo que descer um nível é só uma consulta ao
+    dicionário, sem reagrupar a base.
+    """
+
+    def __init__(self, escolas, medida='QT_MAT_CURSO_TEC'):
+        self.medida = medida
+        self.niveis = len(NIVEIS_HIERARQUIA)
+        self._filhos = {}
+        for nivel, (chave, rotulo) in enumerate(NIVEIS_HIERARQUIA):
+            chaves = [c for c, _ in NIVEIS_HIERARQUIA[:nivel + 1]]
+            colunas = chaves + ([rotulo] if rotulo != chave else [])
+            agregado = escolas.groupby(colunas, observed=True)[medida].sum().reset_index()
+            agregado = agregado.sort_values(medida, ascending=False, kind='stable')
+            filhos = agregado[[chave, rotulo, medida]] if rotulo != chave else agregado[[chave, medida]]
+            if nivel == 0:
+                self._filhos[()] = filhos.reset_index(drop=True)
+                continue
+            # Agrupado pelas chaves dos níveis acima: cada grupo são os filhos de um nó
+            pais = [agregado[c] for c in chaves[:-1]]
+            for caminho, grupo in filhos.groupby(pais, observed=True, sort=False):
+                self._filhos[tuple(_chave_simples(parte) for parte in caminho)] = grupo.reset_index(drop=True)
+
+    def filhos(self, caminho=()):
+        """Filhos do nó `caminho` (chaves desde a região); None se não existir."""
+        tabela = self._filhos.get(tuple(_chave_simples(parte) for parte in caminho))
+        return None if tabela is None else tabela.copy()
+
+    def nivel(self, caminho=()):
+        """(chave, rótulo) do nível dos filhos de `caminho`."""
+        return NIVEIS_HIERARQUIA[len(caminho)]
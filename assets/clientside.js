@@ -0,0 +1,226 @@
+// Callbacks executados no navegador quando DISC_TAC_CLIENTSIDE=1.
+// Os payloads são montados em clientside.py.
+(function () {
+    var colunasDecodificadas = new WeakMap();
+
+    // Decodifica {dtype, bdata} (base64 little-endian) em um TypedArray
+    function decodificar(coluna) {
+        var binario = atob(coluna.bdata);
+        var bytes = new Uint8Array(binario.length);
+        for (var i = 0; i < binario.length; i++) {
+            bytes[i] = binario.charCodeAt(i);
+        }
+        if (coluna.dtype === 'u2') {
+            return new Uint16Array(bytes.buffer);
+        }
+        if (coluna.dtype === 'u4') {
+            return new Uint32Array(bytes.buffer);
+        }
+        return coluna.dtype === 'f8' ? new Float64Array(bytes.buffer) : new Int32Array(bytes.buffer);
+    }
+
+    function colunas(payload) {
+        var resultado = colunasDecodificadas.get(payload);
+        if (!resultado) {
+            resultado = {
+                uf: decodificar(payload.colunas.uf),
+                regiao: decodificar(payload.colunas.regiao),
+                curso: decodificar(payload.colunas.curso),
+                matriculas: decodificar(payload.matriculas)
+            };
+            colunasDecodificadas.set(payload, resultado);
+        }
+        return resultado;
+    }
+
+    function comTemplate(layout, template) {
+        return Object.assign({}, layout, {template: template});
+    }
+
+    var tabelasDecodificadas = new WeakMap();
+
+    // Colunas de uma tabela do payload do main: números como TypedArray e
+    // textos a partir dos códigos e do dicionário de valores
+    function tabela(payload, nome) {
+        var tabelas = tabelasDecodificadas.get(payload);
+        if (!tabelas) {
+            tabelas = {};
+            tabelasDecodificadas.set(payload, tabelas);
+        }
+        if (!tabelas[nome]) {
+            var resultado = {};
+            Object.keys(payload.tabelas[nome]).forEach(function (coluna) {
+                var valores = payload.tabelas[nome][coluna];
+                resultado[coluna] = valores.codigos ?
+                    Array.from(decodificar(valores.codigos), function (codigo) { return valores.valores[codigo]; }) :
+                    decodificar(valores);
+            });
+            tabelas[nome] = resultado;
+        }
+        return tabelas[nome];
+    }
+
+    function linhasTraco(linhas) {
+        if (linhas.inicio !== undefined) {
+            var faixa = [];
+            for (var i = linhas.inicio; i < linhas.fim; i++) {
+                faixa.push(i);
+            }
+            return faixa;
+        }
+        return Array.from(decodificar(linhas));
+    }
+
+    // Traço montado a partir das `linhas` da tabela (ver clientside._figura_com_tabela)
+    function montarTraco(molde, linhas, payload) {
+        var colunas = tabela(payload, molde._tabela);
+        var traco = {};
+        Object.keys(molde).forEach(function (propriedade) {
+            if (propriedade.charAt(0) !== '_') {
+                traco[propriedade] = molde[propriedade];
+            }
+        });
+        Object.keys(molde._colunas).forEach(function (propriedade) {
+            var coluna = colunas[molde._colunas[propriedade]];
+            traco[propriedade] = linhas.map(function (linha) { return coluna[linha]; });
+        });
+        return traco;
+    }
+
+    function figuraMain(tipoGrafico, payload) {
+        if (!payload || !payload.figuras[tipoGrafico]) {
+            return {};
+        }
+        var figura = payload.figuras[tipoGrafico];
+        var dados = [];
+        figura.data.forEach(function (traco) {
+            if (traco._tabela) {
+                dados.push(montarTraco(traco, linhasTraco(traco._linhas), payload));
+            } else {
+                dados.push(traco);
+            }
+        });
+        return {data: dados, layout: comTemplate(figura.layout, payload.template)};
+    }
+
+    function figuraFiltro(tipoGrafico, estados, payload) {
+        var grafico = payload && payload.graficos[tipoGrafico];
+        if (!grafico) {
+            return {};
+        }
+        var dados = colunas(payload);
+        var dicionarios = payload.dicionarios;
+        var grupos = dados[grafico.grupo];
+        var nomesGrupo = dicionarios[grafico.grupo];
+
+        var selecionadas = null;
+        if (estados && estados.length) {
+            selecionadas = new Set(estados.map(function (uf) { return dicionarios.uf.indexOf(uf); }));
+        }
+
+        // Soma das matrículas por grupo e, dentro dele, por curso, só das
+        // UFs selecionadas
+        var somas = new Map();
+        for (var i = 0; i < dados.matriculas.length; i++) {
+            if (selecionadas && !selecionadas.has(dados.uf[i])) {
+                continue;
+            }
+            var porGrupo = somas.get(grupos[i]);
+            if (!porGrupo) {
+                porGrupo = new Map();
+                somas.set(grupos[i], porGrupo);
+            }
+            porGrupo.set(dados.curso[i], (porGrupo.get(dados.curso[i]) || 0) + dados.matriculas[i]);
+        }
+        var linhas = [];
+        somas.forEach(function (porGrupo, grupo) {
+            porGrupo.forEach(function (valor, curso) {
+                linhas.push([grupo, curso, valor]);
+            });
+        });
+        // Mesma ordem do servidor: grupo, maior valor, curso
+        linhas.sort(function (a, b) { return a[0] - b[0] || b[2] - a[2] || a[1] - b[1]; });
+
+        // Top-N de cada grupo
+        var selecionadasTop = [];
+        var noGrupo = 0;
+        for (var j = 0; j < linhas.length; j++) {
+            noGrupo = (j > 0 && linhas[j][0] === linhas[j - 1][0]) ? noGrupo + 1 : 0;
+            if (noGrupo < grafico.top_n) {
+                selecionadasTop.push(linhas[j]);
+            }
+        }
+        linhas = agruparCauda(selecionadasTop, grafico.limite);
+
+        var paleta = grafico.paleta || payload.template.layout.colorway || [];
+        var rotuloX = grafico.layout.xaxis.title.text;
+        var semRotulos = linhas.length > payload.limite_rotulos;
+        var tracos = [];
+        var porCurso = {};
+        for (j = 0; j < linhas.length; j++) {
+            var curso = linhas[j][1] < 0 ? payload.rotulo_outros : dicionarios.curso[linhas[j][1]];
+            var traco = porCurso[curso];
+            if (!traco) {
+                traco = porCurso[curso] = {
+                    type: 'bar',
+                    name: curso,
+                    legendgroup: curso,
+                    showlegend: true,
+                    orientation: 'v',
+                    textposition: 'auto',
+                    marker: {color: paleta[tracos.length % paleta.length]},
+                    hovertemplate: 'Curso=' + curso + '<br>' + rotuloX +
+                        '=%{x}<br>Número de Matrículas=' + (semRotulos ? '%{y}' : '%{text}') + '<extra></extra>',
+                    x: [],
+                    y: []
+                };
+                if (!semRotulos) {
+                    traco.text = [];
+                }
+                tracos.push(traco);
+            }
+            traco.x.push(nomesGrupo[linhas[j][0]]);
+            traco.y.push(linhas[j][2]);
+            if (!semRotulos) {
+                traco.text.push(linhas[j][2]);
+            }
+        }
+        return {data: tracos, layout: comTemplate(grafico.layout, payload.template)};
+    }
+
+    // Mesmo corte de graficos.py (agregados.agrupar_cauda): além de `limite`
+    // cursos, os de menor total viram "Outros" (curso -1), um por grupo,
+    // depois das demais linhas
+    function agruparCauda(linhas, limite) {
+        var totais = new Map();
+        linhas.forEach(function (linha) {
+            totais.set(linha[1], (totais.get(linha[1]) || 0) + linha[2]);
+        });
+        if (!limite || totais.size <= limite) {
+            return linhas;
+        }
+        var cursos = Array.from(totais.keys());
+        cursos.sort(function (a, b) { return totais.get(b) - totais.get(a) || a - b; });
+        var principais = new Set(cursos.slice(0, limite - 1));
+        var resultado = [];
+        var outros = new Map();
+        linhas.forEach(function (linha) {
+            if (principais.has(linha[1])) {
+                resultado.push(linha);
+            } else {
+                outros.set(linha[0], (outros.get(linha[0]) || 0) + linha[2]);
+            }
+        });
+        outros.forEach(function (valor, grupo) {
+            resultado.push([grupo, -1, valor]);
+        });
+        return resultado;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        disc_tac: {
+            figura_main: figuraMain,
+            figura_filtro: figuraFiltro
+        }
+    });
+})();
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+import traceback
+
+# Recarga da base sem reiniciar o servidor: uma thread confere os arquivos
+# da base e, quando o conteúdo muda, o app monta a nova versão fora do
+# caminho das requisições e a troca de uma vez
+
+
+def arquivos_versao(caminho_base):
+    """Arquivos cuja mudança gera uma nova versão da base: o CSV e o
+    manifesto das partições anuais (ver ingestao.py)."""
+    return [caminho_base, os.path.join(os.path.dirname(caminho_base), 'particoes', 'manifesto.json')]
+
+
+def assinatura_arquivos(caminhos):
+    """mtime/tamanho de cada arquivo (None para os que não existem): barato
+    de conferir, decide quando vale recalcular `versao_arquivos`."""
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            estado = os.stat(caminho)
+            assinatura.append((estado.st_mtime_ns, estado.st_size))
+        except OSError:
+            assinatura.append(None)
+    return tuple(assinatura)
+
+
+def versao_arquivos(caminhos):
+    """Hash do conteúdo de cada arquivo (None para os que não existem)."""
+    from carregador import impressao_digital
+
+    return tuple(impressao_digital(caminho) if os.path.exists(caminho) else None for caminho in caminhos)
+
+
+class Atualizador:
+    """Chama `recarregar()` quando o conteúdo de `caminhos` deixa de bater
+    com `versao_carregada()`.
+
+    A cada `intervalo` segundos só o mtime/tamanho é conferido; o hash é
+    recalculado apenas quando eles mudam.
+    """
+
+    def __init__(self, caminhos, versao_carregada, recarregar, intervalo=30.0, relatorio=print):
+        self.caminhos = list(caminhos)
+        self.versao_carregada = versao_carregada
+        self.recarregar = recarregar
+        self.intervalo = intervalo
+        self.relatorio = relatorio
+        self.recargas = 0
+        # Sem assinatura, a primeira verificação compara o conteúdo: pega
+        # mudanças feitas entre a carga inicial e a subida do atualizador
+        self._assinatura = None
+        self._parar = threading.Event()
+
+    def verificar(self):
+        """Recarrega se a base mudou; retorna True quando houve recarga."""
+        assinatura = assinatura_arquivos(self.caminhos)
+        if assinatura == self._assinatura:
+            return False
+        carregada = self.versao_carregada()
+        if carregada is None:
+            # Carga inicial em andamento: sem guardar a assinatura, a primeira
+            # verificação depois dela compara o conteúdo com o que foi lido
+            return False
+        if versao_arquivos(self.caminhos) == carregada:
+            # Só o mtime mudou
+            self._assinatura = assinatura
+            return False
+        inicio = time.perf_counter()
+        self.recarregar()
+        self._assinatura = assinatura
+        self.recargas += 1
+        if self.relatorio:
+            self.relatorio(f"Base recarregada em {time.perf_counter() - inicio:.2f}s")
+        return True
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.verificar()
+            except Exception:
+                # Arquivo pela metade ou inválido: a versão em uso continua
+                # servindo e a próxima verificação tenta de novo
+                traceback.print_exc()
+
+    def iniciar(self):
+        threading.Thread(target=self._executar, name='atualizador', daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,169 @@
+import gzip
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+from agregados import AGREGACOES_PADRAO, CONTAGENS, selecionar_top
+import main
+from rotulos import categoria_por_posicao, texto_valor_porcentagem
+
+REPETICOES = 50
+
+# Orçamento de subida do app, em segundos: até responder /health e até /ready
+ORCAMENTO_SAUDE_S = 1.5
+ORCAMENTO_PRONTO_S = 5.0
+
+# Medido num processo novo, para incluir os imports a frio
+_SCRIPT_INICIALIZACAO = """
+import json, time
+inicio = time.perf_counter()
+import main
+cliente = main.create_app().server.test_client()
+assert cliente.get('/health').status_code == 200
+saude = time.perf_counter() - inicio
+while cliente.get('/ready').status_code != 200:
+    if main.carregamento.erro is not None:
+        raise main.carregamento.erro
+    time.sleep(0.01)
+print(json.dumps({'saude': saude, 'pronto': time.perf_counter() - inicio}))
+"""
+
+
+def medir(funcao, repeticoes=REPETICOES):
+    """Tempo médio em milissegundos de `funcao()`."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def agregar_base(dimensoes, medidas):
+    # Caminho antigo: groupby direto sobre todas as linhas de `dados`
+    func = 'count' if medidas[0] in CONTAGENS else 'sum'
+    return main.dados.groupby(list(dimensoes))[list(medidas)].agg(func).reset_index()
+
+
+def benchmark_agregados():
+    if main.dados is None:
+        # DISC_TAC_STREAMING=1: só o cubo fica em memória, não há base para comparar
+        print("Agregações: comparação com a base pulada no modo em blocos (DISC_TAC_STREAMING=1)")
+        return
+    print(f"{'Agregação':<60} {'base (ms)':>10} {'cubo (ms)':>10}")
+    for dimensoes, medidas in AGREGACOES_PADRAO:
+        antes = medir(lambda: agregar_base(dimensoes, medidas))
+        depois = medir(lambda: main.cubo.agregar(dimensoes, medidas))
+        nome = f"{'+'.join(dimensoes)} -> {'+'.join(medidas)}"
+        print(f"{nome:<60} {antes:>10.3f} {depois:>10.3f}")
+
+
+def top_n_ordenando(df, medida, n, grupo):
+    # Caminho antigo: ordena o agrupamento inteiro e depois corta
+    df = df.sort_values(by=[grupo, medida], ascending=[True, False])
+    return df.groupby(grupo, observed=True).head(n)
+
+
+def benchmark_top_n():
+    dimensoes = ('SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL')
+    df = main.cubo.agregar(dimensoes, ['QT_MAT_CURSO_TEC'])
+    print(f"\n{'Top-N por UF':<25} {'ordenando (ms)':>15} {'seleção (ms)':>13} {'em cache (ms)':>14}")
+    for n in (3, 10, 50):
+        antes = medir(lambda: top_n_ordenando(df, 'QT_MAT_CURSO_TEC', n, 'SG_UF'))
+        selecao = medir(lambda: selecionar_top(df, 'QT_MAT_CURSO_TEC', n, 'SG_UF'))
+        cache = medir(lambda: main.cubo.top_n(dimensoes, 'QT_MAT_CURSO_TEC', n, grupo='SG_UF'))
+        print(f"{f'n={n}':<25} {antes:>15.3f} {selecao:>13.3f} {cache:>14.3f}")
+
+
+def benchmark_graficos():
+    print(f"\n{'Gráfico':<25} {'sem cache (ms)':>15} {'com cache (ms)':>15}")
+    for opcao in main.opcoes_grafico:
+        tipo = opcao['value']
+        sem_cache = medir(lambda: main.construir_grafico(tipo), repeticoes=10)
+        com_cache = medir(lambda: main.atualizar_grafico(tipo), repeticoes=10)
+        print(f"{tipo:<25} {sem_cache:>15.2f} {com_cache:>15.2f}")
+    print(f"\nCache de figuras: {main.cache_figuras.estatisticas()}")
+
+
+def rotulos_por_linha(df):
+    # Caminho antigo: f-string linha a linha com DataFrame.apply
+    df = df.assign(Porcentagem=df['Valor'] / df['Valor'].sum() * 100)
+    texto = df.apply(lambda row: f"{row['Valor']} ({row['Porcentagem']:.1f}%)", axis=1)
+    cor = ['Top 3' if i < 3 else 'Outros' for i in range(len(df))]
+    return texto, cor
+
+
+def benchmark_inicializacao(execucoes=3):
+    print(f"\n{'Subida do app (s)':<25} {'/health':>10} {'/ready':>10}")
+    medidas = []
+    for _ in range(execucoes):
+        saida = subprocess.run([sys.executable, '-c', _SCRIPT_INICIALIZACAO], capture_output=True,
+                               text=True, check=True)
+        medidas.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    saude = max(medida['saude'] for medida in medidas)
+    pronto = max(medida['pronto'] for medida in medidas)
+    print(f"{f'pior de {execucoes}':<25} {saude:>10.2f} {pronto:>10.2f}")
+    print(f"{'orçamento':<25} {ORCAMENTO_SAUDE_S:>10.2f} {ORCAMENTO_PRONTO_S:>10.2f}")
+    for nome, medido, orcamento in (('/health', saude, ORCAMENTO_SAUDE_S), ('/ready', pronto, ORCAMENTO_PRONTO_S)):
+        if medido > orcamento:
+            print(f"ORÇAMENTO ESTOURADO {nome}: {medido:.2f}s > {orcamento:.2f}s")
+
+
+def benchmark_rotulos():
+    print(f"\n{'Rótulos':<25} {'por linha (ms)':>15} {'vetorizado (ms)':>16}")
+    gerador = np.random.default_rng(0)
+    for grupos in (5, 500, 5000, 50000):
+        df = pd.DataFrame({'Grupo': [f"G{i}" for i in range(grupos)],
+                           'Valor': gerador.integers(1, 100000, grupos)})
+        texto, _ = rotulos_por_linha(df)
+        assert texto.tolist() == texto_valor_porcentagem(df['Valor']).tolist()
+        repeticoes = 5 if grupos > 1000 else REPETICOES
+        antes = medir(lambda: rotulos_por_linha(df), repeticoes)
+        depois = medir(lambda: (texto_valor_porcentagem(df['Valor']),
+                                categoria_por_posicao(len(df), 3, 'Top 3', 'Outros')), repeticoes)
+        print(f"{f'{grupos} grupos':<25} {antes:>15.3f} {depois:>16.3f}")
+
+
+def resposta_callback(cliente, tipo, codificacao):
+    """Bytes da resposta do callback do main.py para `tipo`, pedida com
+    Accept-Encoding `codificacao`."""
+    corpo = {
+        'output': 'grafico-escolas.figure',
+        'outputs': {'id': 'grafico-escolas', 'property': 'figure'},
+        'inputs': [{'id': 'dropdown-grafico', 'property': 'value', 'value': tipo}],
+        'changedPropIds': ['dropdown-grafico.value'],
+        'state': [],
+    }
+    resposta = cliente.post('/_dash-update-component', json=corpo, headers={'Accept-Encoding': codificacao})
+    return len(resposta.data)
+
+
+def benchmark_payload(app):
+    # Antes: figura completa (template inteiro, rótulos repetidos) sem compressão
+    codificacoes = ['identity', 'gzip'] + (['br'] if importlib.util.find_spec('brotli') else [])
+    nomes = {'identity': 'depois', 'gzip': 'depois gz', 'br': 'depois br'}
+    print(f"\n{'Bytes por gráfico':<25} {'antes':>8} {'antes gz':>9}" + ''.join(f" {nomes[c]:>9}" for c in codificacoes))
+    cliente = app.server.test_client()
+    totais = np.zeros(2 + len(codificacoes), dtype=int)
+    for opcao in main.opcoes_grafico:
+        tipo = opcao['value']
+        completa = json.dumps(main.construir_grafico(tipo), cls=PlotlyJSONEncoder).encode('utf-8')
+        linha = [len(completa), len(gzip.compress(completa))]
+        linha += [resposta_callback(cliente, tipo, codificacao) for codificacao in codificacoes]
+        totais += linha
+        print(f"{tipo:<25} {linha[0]:>8} {linha[1]:>9}" + ''.join(f" {valor:>9}" for valor in linha[2:]))
+    print(f"{'total':<25} {totais[0]:>8} {totais[1]:>9}" + ''.join(f" {valor:>9}" for valor in totais[2:]))
+
+
+if __name__ == "__main__":
+    benchmark_inicializacao()
+    app = main.create_app(segundo_plano=False)
+    benchmark_agregados()
+    benchmark_top_n()
+    benchmark_rotulos()
+    benchmark_graficos()
+    benchmark_payload(app)
@@ -0,0 +1,180 @@
+import argparse
+import json
+import resource
+import threading
+import time
+
+import numpy as np
+
+import filtro
+import main
+from graficos import GRAFICOS_POR_ESTADO
+
+CAMINHO_BASELINE = "benchmark_baseline.json"
+
+# Apps com a base já carregada
+app_main = main.create_app(segundo_plano=False)
+app_filtro = filtro.create_app(segundo_plano=False)
+
+
+def cenarios():
+    """(nome, app, id do gráfico, [(id do dropdown, valor)]) de cada callback."""
+    lista = []
+    for opcao in main.opcoes_grafico:
+        lista.append((f"main:{opcao['value']}", app_main, 'grafico-escolas',
+                      [('dropdown-grafico', opcao['value'])]))
+    for tipo_grafico in GRAFICOS_POR_ESTADO:
+        lista.append((f"filtro:{tipo_grafico}", app_filtro, 'grafico-filtro',
+                      [('dropdown-regiao', tipo_grafico), ('dropdown-estado', None)]))
+        for uf in filtro.cubo.ufs():
+            lista.append((f"filtro:{tipo_grafico}:{uf}", app_filtro, 'grafico-filtro',
+                          [('dropdown-regiao', tipo_grafico), ('dropdown-estado', [uf])]))
+    return lista
+
+
+def requisitar(cliente, grafico, entradas):
+    """Chama o callback pelo endpoint do Dash; retorna (ms, bytes da resposta)."""
+    corpo = {
+        'output': f"{grafico}.figure",
+        'outputs': {'id': grafico, 'property': 'figure'},
+        'inputs': [{'id': id_entrada, 'property': 'value', 'value': valor} for id_entrada, valor in entradas],
+        'changedPropIds': [f"{entradas[0][0]}.value"],
+        'state': [],
+    }
+    inicio = time.perf_counter()
+    resposta = cliente.post('/_dash-update-component', json=corpo)
+    decorrido = (time.perf_counter() - inicio) * 1000
+    if resposta.status_code != 200:
+        raise RuntimeError(f"{grafico} {entradas}: HTTP {resposta.status_code}")
+    return decorrido, len(resposta.data)
+
+
+def percentis(tempos):
+    p50, p95, p99 = np.percentile(tempos, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+
+def limpar_caches():
+    main.cache_figuras.limpar()
+    filtro.cache_figuras.limpar()
+
+
+def medir_latencia(lista, repeticoes, sem_cache=False):
+    """Latência sequencial de cada cenário.
+
+    A primeira chamada (cache vazio) é reportada à parte como `frio`; os
+    percentis são das `repeticoes` seguintes, com o cache limpo antes de
+    cada uma quando `sem_cache`.
+    """
+    clientes = {}
+    resultados = {}
+    for nome, app, grafico, entradas in lista:
+        cliente = clientes.setdefault(id(app), app.server.test_client())
+        frio, tamanho = requisitar(cliente, grafico, entradas)
+        tempos = []
+        for _ in range(repeticoes):
+            if sem_cache:
+                limpar_caches()
+            tempos.append(requisitar(cliente, grafico, entradas)[0])
+        resultados[nome] = {'frio': frio, 'bytes': tamanho, **percentis(tempos)}
+    return resultados
+
+
+def medir_vazao(lista, clientes, requisicoes_por_cliente):
+    """Vazão e latência com `clientes` threads chamando cenários em rodízio."""
+    tempos = []
+    trava = threading.Lock()
+
+    def cliente(numero):
+        testes = {}
+        locais = []
+        for i in range(requisicoes_por_cliente):
+            _, app, grafico, entradas = lista[(numero + i) % len(lista)]
+            teste = testes.setdefault(id(app), app.server.test_client())
+            locais.append(requisitar(teste, grafico, entradas)[0])
+        with trava:
+            tempos.extend(locais)
+
+    threads = [threading.Thread(target=cliente, args=(numero,)) for numero in range(clientes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+    return {'clientes': clientes, 'req_s': len(tempos) / decorrido, **percentis(tempos)}
+
+
+def rss_pico_mb():
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def comparar(resultado, baseline, tolerancia, minimo_ms=1.0):
+    """Cenários cujo p95 piorou mais que `tolerancia` (e mais que `minimo_ms`,
+    para ignorar ruído em chamadas muito rápidas) em relação à baseline."""
+    if baseline.get('sem_cache') != resultado['sem_cache']:
+        print("Aviso: baseline medida com outra opção de --sem-cache")
+    regressoes = []
+    for nome, atual in resultado['cenarios'].items():
+        anterior = baseline.get('cenarios', {}).get(nome)
+        if anterior and atual['p95'] - anterior['p95'] > max(anterior['p95'] * tolerancia, minimo_ms):
+            regressoes.append((nome, anterior['p95'], atual['p95']))
+    vazao_anterior = baseline.get('vazao', {}).get('req_s')
+    if vazao_anterior and resultado['vazao']['req_s'] < vazao_anterior / (1 + tolerancia):
+        regressoes.append(('vazao (req/s)', vazao_anterior, resultado['vazao']['req_s']))
+    return regressoes
+
+
+def executar(repeticoes, clientes, requisicoes_por_cliente, sem_cache=False):
+    lista = cenarios()
+    limpar_caches()
+    return {
+        'sem_cache': sem_cache,
+        'cenarios': medir_latencia(lista, repeticoes, sem_cache),
+        'vazao': medir_vazao(lista, clientes, requisicoes_por_cliente),
+        'rss_pico_mb': rss_pico_mb(),
+    }
+
+
+def imprimir(resultado):
+    print(f"{'Cenário':<40} {'frio':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'bytes':>9}")
+    for nome, medidas in resultado['cenarios'].items():
+        print(f"{nome:<40} {medidas['frio']:>8.2f} {medidas['p50']:>8.2f} {medidas['p95']:>8.2f} "
+              f"{medidas['p99']:>8.2f} {medidas['bytes']:>9}")
+    vazao = resultado['vazao']
+    print(f"\n{vazao['clientes']} clientes: {vazao['req_s']:.1f} req/s "
+          f"(p50 {vazao['p50']:.2f} ms, p95 {vazao['p95']:.2f} ms, p99 {vazao['p99']:.2f} ms)")
+    print(f"RSS de pico: {resultado['rss_pico_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga dos callbacks do Dash (sem navegador)")
+    parser.add_argument("--repeticoes", type=int, default=20, help="chamadas sequenciais por cenário")
+    parser.add_argument("--clientes", type=int, default=4, help="clientes concorrentes na medida de vazão")
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por cliente concorrente")
+    parser.add_argument("--sem-cache", action="store_true", help="limpa o cache de figuras antes de cada chamada medida")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE, help="arquivo da baseline")
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava o resultado como nova baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora relativa aceita antes de acusar regressão")
+    parser.add_argument("--minimo-ms", type=float, default=1.0, help="piora absoluta mínima (ms) para acusar regressão")
+    argumentos = parser.parse_args()
+
+    resultado = executar(argumentos.repeticoes, argumentos.clientes, argumentos.requisicoes, argumentos.sem_cache)
+    imprimir(resultado)
+
+    try:
+        with open(argumentos.baseline) as arquivo:
+            baseline = json.load(arquivo)
+    except (OSError, ValueError):
+        baseline = None
+    if baseline:
+        regressoes = comparar(resultado, baseline, argumentos.tolerancia, argumentos.minimo_ms)
+        for nome, anterior, atual in regressoes:
+            print(f"REGRESSÃO {nome}: {anterior:.2f} -> {atual:.2f}")
+        if not regressoes:
+            print(f"Sem regressões em relação a {argumentos.baseline}")
+    if argumentos.salvar_baseline:
+        with open(argumentos.baseline, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+        print(f"Baseline gravada em {argumentos.baseline}")
@@ -0,0 +1,118 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+# Busca de cursos e escolas para o dropdown do filtro: o índice fica no
+# servidor e o navegador recebe só as opções que casam com o que foi
+# digitado (ver filtro.buscar_opcoes), nunca a lista inteira
+
+# Opções devolvidas por busca
+LIMITE_RESULTADOS = 20
+
+# Menos que isso casa com boa parte da base: o dropdown espera mais letras
+MINIMO_CARACTERES = 2
+
+_PALAVRA = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Técnico em Informática' -> 'tecnico em informatica'."""
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def palavras(texto):
+    return _PALAVRA.findall(normalizar(texto))
+
+
+class IndiceBusca:
+    """Índice de prefixos, sem acento e sem caixa, sobre (valor, rótulo, peso).
+
+    Cada palavra dos rótulos entra numa lista ordenada; as palavras que
+    começam com um termo digitado são uma faixa contínua dela, achada por
+    busca binária. Com vários termos, cada um tem que ser prefixo de alguma
+    palavra do rótulo ('tec info' acha 'Técnico em Informática'). Os
+    resultados saem primeiro os rótulos que começam com o texto digitado,
+    depois os de maior peso (matrículas).
+    """
+
+    def __init__(self, itens):
+        self._valores = []
+        self._rotulos = []
+        self._pesos = []
+        self._normalizados = []
+        entradas = []
+        for posicao, (valor, rotulo, peso) in enumerate(itens):
+            self._valores.append(valor)
+            self._rotulos.append(rotulo)
+            self._pesos.append(peso)
+            self._normalizados.append(' '.join(palavras(rotulo)))
+            entradas.extend((palavra, posicao) for palavra in set(palavras(rotulo)))
+        entradas.sort()
+        self._palavras = [palavra for palavra, _ in entradas]
+        self._posicoes = [posicao for _, posicao in entradas]
+        self._por_valor = {valor: posicao for posicao, valor in enumerate(self._valores)}
+
+    def __len__(self):
+        return len(self._valores)
+
+    def _com_prefixo(self, termo):
+        inicio = bisect_left(self._palavras, termo)
+        fim = bisect_left(self._palavras, termo + '\U0010ffff', inicio)
+        return set(self._posicoes[inicio:fim])
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Posições dos melhores `limite` itens para `texto`."""
+        termos = palavras(texto or '')
+        if not termos or len(''.join(termos)) < MINIMO_CARACTERES:
+            return []
+        # Do termo mais longo (faixa menor) para o mais curto
+        termos.sort(key=len, reverse=True)
+        encontrados = self._com_prefixo(termos[0])
+        for termo in termos[1:]:
+            if not encontrados:
+                break
+            encontrados &= self._com_prefixo(termo)
+        inicio = ' '.join(palavras(texto))
+        return sorted(encontrados, key=lambda posicao: (
+            not self._normalizados[posicao].startswith(inicio),
+            -self._pesos[posicao],
+            self._normalizados[posicao],
+        ))[:limite]
+
+    def opcao(self, posicao):
+        # `search` é o texto em que o dropdown filtra as opções recebidas:
+        # sem ele, 'tecnico' não acharia 'Técnico' no navegador
+        rotulo = self._rotulos[posicao]
+        return {'label': rotulo, 'value': self._valores[posicao],
+                'search': f"{rotulo} {self._normalizados[posicao]}"}
+
+    def opcoes(self, texto, limite=LIMITE_RESULTADOS):
+        """Opções do dcc.Dropdown para o texto digitado."""
+        return [self.opcao(posicao) for posicao in self.buscar(texto, limite)]
+
+    def opcao_do_valor(self, valor):
+        """Opção de um valor já escolhido; None se ele não está no índice."""
+        posicao = self._por_valor.get(valor)
+        return None if posicao is None else self.opcao(posicao)
+
+
+def indice_cursos_escolas(cubo):
+    """Índice dos cursos (do cubo) e das escolas (do cruzamento `escolas`).
+
+    Os valores das opções são 'curso:<nome>' e 'escola:<CO_ENTIDADE>'; o
+    peso é o total de matrículas.
+    """
+    cursos = cubo.agregar(('NO_CURSO_EDUC_PROFISSIONAL',), ('QT_MAT_CURSO_TEC',))
+    itens = [(f"curso:{curso}", str(curso), int(matriculas))
+             for curso, matriculas in zip(cursos['NO_CURSO_EDUC_PROFISSIONAL'], cursos['QT_MAT_CURSO_TEC'])]
+    escolas = cubo.cruzamento('escolas', copia=False)
+    if escolas is not None:
+        # Nomes de escola se repetem: o rótulo leva o município e a UF
+        itens.extend(
+            (f"escola:{codigo}", f"{nome} ({municipio} - {uf})", int(matriculas))
+            for codigo, nome, municipio, uf, matriculas in zip(
+                escolas['CO_ENTIDADE'], escolas['NO_ENTIDADE'], escolas['NO_MUNICIPIO'],
+                escolas['SG_UF'], escolas['QT_MAT_CURSO_TEC'])
+        )
+    return IndiceBusca(itens)
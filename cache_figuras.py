@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from plotly.utils import PlotlyJSONEncoder
+
+from atualizacao import arquivos_versao, assinatura_arquivos, versao_arquivos
+from compactacao import enxugar_figura
+from metricas import contar_cache, fase
+
+
+# Pasta servida pelo Dash em /assets/graficos com as figuras exportadas
+DIRETORIO_EXPORTADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'graficos')
+
+_NOME_VALIDO = re.compile(r'^[A-Za-z0-9_]+$')
+
+
+def serializar(figura):
+    # Sem o que só repete padrões do plotly (ver compactacao.py)
+    return json.dumps(enxugar_figura(figura), cls=PlotlyJSONEncoder)
+
+
+def nome_arquivo(parametros):
+    """Nome do arquivo exportado de (tipo, ufs); None se não for exportável."""
+    tipo_grafico, ufs = parametros
+    partes = [tipo_grafico, *ufs]
+    # Os valores vêm do navegador: só nomes simples viram caminho de arquivo
+    if not all(isinstance(parte, str) and _NOME_VALIDO.match(parte) for parte in partes):
+        return None
+    return '__'.join(partes) + '.json'
+
+
+def normalizar_parametros(parametros):
+    """Chave hashable dos parâmetros: listas (valores de dropdown multi,
+    vindos do navegador) viram tuplas ordenadas, já que a ordem da seleção
+    não muda a figura; tuplas (como o caminho do drill-down) ficam como estão."""
+    return tuple(tuple(sorted(parte, key=str)) if isinstance(parte, list) else parte for parte in parametros)
+
+
+class CacheFiguras:
+    """Cache LRU das figuras já enxutas (ver `serializar`).
+
+    Cada figura é guardada já decodificada e o mesmo dicionário é retornado
+    a cada acerto, sem reler o JSON: quem a recebe (os callbacks, que a
+    entregam ao Dash) não pode alterá-la.
+
+    A chave é formada pelos parâmetros do gráfico mais a versão da base (os
+    hashes do CSV e do manifesto das partições, ver
+    atualizacao.arquivos_versao); quando esses arquivos mudam (mtime/tamanho)
+    os hashes são recalculados e as entradas antigas são descartadas.
+
+    Numa falha, antes de montar a figura, procura a versão exportada por
+    `python exportar.py` em `diretorio_exportado`, desde que tenha sido
+    gerada a partir da mesma versão da base. Os parâmetros são (tipo, tupla
+    de UFs).
+    """
+
+    def __init__(self, caminho_base, tamanho_maximo=128, diretorio_exportado=DIRETORIO_EXPORTADO):
+        self.caminho_base = caminho_base
+        self.arquivos = arquivos_versao(caminho_base)
+        self.tamanho_maximo = tamanho_maximo
+        self.diretorio_exportado = diretorio_exportado
+        self.acertos = 0
+        self.falhas = 0
+        self.exportados = 0
+        self._manifesto = None
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self._assinatura = None
+        self._versao = None
+
+    def _verificar_base(self):
+        # stat é barato; os hashes só são recalculados quando os arquivos mudam
+        assinatura = assinatura_arquivos(self.arquivos)
+        if assinatura != self._assinatura:
+            versao = versao_arquivos(self.arquivos)
+            if versao != self._versao:
+                self._entradas.clear()
+                self._manifesto = None
+                self._versao = versao
+            self._assinatura = assinatura
+        return self._versao
+
+    def obter(self, parametros, construir, versao=None):
+        """Retorna a figura de `parametros`, chamando `construir()` na falha.
+
+        `versao` identifica a base usada por `construir()`; sem ela vale a
+        dos arquivos atuais. Apps que recarregam a base em segundo plano
+        passam a versão em memória (a tupla de hashes do CSV e das partições,
+        ver main.montar_estado), que pode estar atrás dos arquivos.
+        """
+        parametros = normalizar_parametros(parametros)
+        with self._trava:
+            chave = (parametros, versao or self._verificar_base())
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                contar_cache('acertos')
+                return self._entradas[chave]
+            self.falhas += 1
+            contar_cache('falhas')
+
+        figura_json = self._ler_exportado(parametros, chave[1])
+        if figura_json is None:
+            figura = construir()
+            with fase('serializar'):
+                figura_json = serializar(figura)
+
+        # Decodificada uma vez: o JSON normaliza o que o encoder do plotly
+        # converte (numpy, datas) e a figura fica igual à exportada
+        figura = json.loads(figura_json)
+        with self._trava:
+            self._entradas[chave] = figura
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+        return figura
+
+    def _ler_exportado(self, parametros, versao):
+        if not self.diretorio_exportado:
+            return None
+        manifesto = self._ler_manifesto()
+        nome = nome_arquivo(parametros)
+        # A versão inteira: figuras das séries históricas dependem também das partições
+        if tuple(manifesto.get('versao') or ()) != tuple(versao) or nome not in manifesto.get('graficos', {}):
+            return None
+        try:
+            with open(os.path.join(self.diretorio_exportado, nome)) as arquivo:
+                figura_json = arquivo.read()
+        except OSError:
+            return None
+        self.exportados += 1
+        contar_cache('exportados')
+        return figura_json
+
+    def _ler_manifesto(self):
+        # Relido só quando o exportador grava um novo manifesto
+        caminho = os.path.join(self.diretorio_exportado, 'manifesto.json')
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+        except OSError:
+            return {}
+        if self._manifesto is None or self._manifesto[0] != mtime:
+            try:
+                with open(caminho) as arquivo:
+                    self._manifesto = (mtime, json.load(arquivo))
+            except (OSError, ValueError):
+                return {}
+        return self._manifesto[1]
+
+    def herdar(self, anterior, versao_anterior, versao, inalterada):
+        """Copia do cache `anterior` as figuras da base `versao_anterior`
+        para as quais `inalterada(parametros)`, como figuras da `versao`.
+
+        Usado na recarga incremental (ver incremental.py): só as figuras
+        cujos dados mudaram precisam ser montadas de novo. Retorna quantas
+        foram copiadas.
+        """
+        with anterior._trava:
+            entradas = [(parametros, figura) for (parametros, versao_figura), figura in anterior._entradas.items()
+                        if versao_figura == versao_anterior]
+        herdadas = 0
+        for parametros, figura in entradas:
+            if inalterada(parametros):
+                with self._trava:
+                    self._entradas[(parametros, versao)] = figura
+                herdadas += 1
+        return herdadas
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._manifesto = None
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'exportados': self.exportados,
+                'entradas': len(self._entradas),
+                'tamanho_maximo': self.tamanho_maximo,
+            }
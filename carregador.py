@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Tipo de cada coluna da base: textos repetidos como categoria e códigos no
+# menor inteiro que comporta os valores do censo; contadores (QT_) com folga,
+# e valores que não cabem param a leitura (ver tipar) em vez de estourar
+ESQUEMA = {
+    'NU_ANO_CENSO': 'int16',
+    'NO_REGIAO': 'category',
+    'CO_REGIAO': 'int8',
+    'NO_UF': 'category',
+    'SG_UF': 'category',
+    'CO_UF': 'int8',
+    'NO_MUNICIPIO': 'category',
+    'CO_MUNICIPIO': 'int32',
+    'TP_LOCALIZACAO': 'int8',
+    'TP_LOCALIZACAO_DIFERENCIADA': 'int8',
+    'TP_DEPENDENCIA': 'int8',
+    'NO_ENTIDADE': 'category',
+    'CO_ENTIDADE': 'int32',
+    'NO_AREA_CURSO_PROFISSIONAL': 'category',
+    'ID_AREA_CURSO_PROFISSIONAL': 'int16',
+    'NO_CURSO_EDUC_PROFISSIONAL': 'category',
+    'CO_CURSO_EDUC_PROFISSIONAL': 'int32',
+    'QT_CURSO_TEC': 'int16',
+    'QT_MAT_CURSO_TEC': 'int32',
+    'QT_CURSO_TEC_CT': 'int16',
+    'QT_MAT_CURSO_TEC_CT': 'int32',
+    'QT_CURSO_TEC_NM': 'int16',
+    'QT_MAT_CURSO_TEC_NM': 'int32',
+    'QT_CURSO_TEC_CONC': 'int16',
+    'QT_MAT_CURSO_TEC_CONC': 'int32',
+    'QT_CURSO_TEC_SUBS': 'int16',
+    'QT_MAT_TEC_SUBS': 'int32',
+    'QT_CURSO_TEC_EJA': 'int16',
+    'QT_MAT_TEC_EJA': 'int32',
+}
+
+# Colunas referenciadas pelos gráficos; só estas são carregadas
+COLUNAS_USADAS = [
+    'NU_ANO_CENSO',
+    'NO_REGIAO',
+    'NO_UF',
+    'SG_UF',
+    'TP_LOCALIZACAO',
+    'TP_DEPENDENCIA',
+    'NO_ENTIDADE',
+    'NO_CURSO_EDUC_PROFISSIONAL',
+    'QT_CURSO_TEC',
+    'QT_MAT_CURSO_TEC',
+    'QT_CURSO_TEC_CT',
+    'QT_CURSO_TEC_NM',
+    'QT_CURSO_TEC_CONC',
+    'QT_CURSO_TEC_SUBS',
+    'QT_CURSO_TEC_EJA',
+]
+
+
+try:
+    import pyarrow  # noqa: F401
+    FORMATO_SNAPSHOT = 'parquet'
+except ImportError:
+    # Sem pyarrow o snapshot é gravado em pickle, que também preserva os tipos
+    FORMATO_SNAPSHOT = 'pkl'
+
+
+def impressao_digital(caminho):
+    """Hash SHA-1 do conteúdo do arquivo da base."""
+    sha1 = hashlib.sha1()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha1.update(bloco)
+    return sha1.hexdigest()
+
+
+def caminhos_snapshot(caminho_csv):
+    raiz = os.path.splitext(caminho_csv)[0]
+    return f"{raiz}.{FORMATO_SNAPSHOT}", f"{raiz}.meta.json"
+
+
+def tipos_leitura(colunas):
+    """dtypes do read_csv: inteiros lidos em int64 e reduzidos depois por
+    `tipar`, pois o read_csv estoura em silêncio (300 em int8 vira 44)."""
+    return {coluna: 'int64' if ESQUEMA[coluna].startswith('int') else ESQUEMA[coluna] for coluna in colunas}
+
+
+def tipar(dados):
+    """Reduz os inteiros aos tipos do ESQUEMA, com erro se algum valor não cabe."""
+    tipos = {}
+    for coluna in dados.columns:
+        tipo = ESQUEMA.get(coluna, '')
+        if not tipo.startswith('int') or dados[coluna].dtype == tipo:
+            continue
+        limites = np.iinfo(tipo)
+        if len(dados) and (dados[coluna].min() < limites.min or dados[coluna].max() > limites.max):
+            raise ValueError(f"{coluna} tem valores fora de {tipo} ({dados[coluna].min()} a {dados[coluna].max()}); "
+                             f"aumente o tipo no ESQUEMA")
+        tipos[coluna] = tipo
+    return dados.astype(tipos) if tipos else dados
+
+
+def ler_csv(caminho_csv, colunas=COLUNAS_USADAS):
+    """Lê o CSV já com os tipos do ESQUEMA, apenas com as `colunas` pedidas."""
+    return tipar(pd.read_csv(
+        caminho_csv,
+        sep=";",
+        encoding="latin1",
+        usecols=colunas,
+        dtype=tipos_leitura(colunas),
+    )[colunas])
+
+
+def linhas_por_bloco(caminho_csv, limite_memoria_mb, colunas=COLUNAS_USADAS, amostra=2000):
+    """Quantas linhas cabem em um bloco respeitando `limite_memoria_mb`.
+
+    O custo por linha é estimado numa amostra do início do arquivo; metade
+    do limite fica reservada para o agregado acumulado.
+    """
+    inicio = ler_csv_amostra(caminho_csv, colunas, amostra)
+    bytes_por_linha = max(inicio.memory_usage(deep=True).sum() / max(len(inicio), 1), 1)
+    return max(int(limite_memoria_mb * 1e6 / 2 / bytes_por_linha), 1)
+
+
+def ler_csv_amostra(caminho_csv, colunas, linhas):
+    return tipar(pd.read_csv(
+        caminho_csv,
+        sep=";",
+        encoding="latin1",
+        usecols=colunas,
+        dtype=tipos_leitura(colunas),
+        nrows=linhas,
+    ))
+
+
+def ler_em_blocos(caminho_csv, limite_memoria_mb=64, colunas=COLUNAS_USADAS, relatorio=print):
+    """Gera blocos tipados do CSV sem nunca carregar o arquivo inteiro.
+
+    `relatorio` recebe uma linha de progresso por bloco (None desliga).
+    """
+    tamanho_bloco = linhas_por_bloco(caminho_csv, limite_memoria_mb, colunas)
+    tamanho_arquivo = os.path.getsize(caminho_csv)
+    inicio = time.perf_counter()
+    linhas = 0
+    with open(caminho_csv, 'rb') as arquivo:
+        leitor = pd.read_csv(
+            arquivo,
+            sep=";",
+            encoding="latin1",
+            usecols=colunas,
+            dtype=tipos_leitura(colunas),
+            chunksize=tamanho_bloco,
+        )
+        for numero, bloco in enumerate(leitor, start=1):
+            linhas += len(bloco)
+            yield tipar(bloco[colunas])
+            if relatorio:
+                # A posição no arquivo inclui o buffer do leitor: é aproximada
+                lido = min(arquivo.tell() / max(tamanho_arquivo, 1), 1)
+                decorrido = time.perf_counter() - inicio
+                relatorio(
+                    f"Bloco {numero}: {linhas} linhas, ~{lido:.0%} do arquivo, "
+                    f"{decorrido:.2f}s ({linhas / max(decorrido, 1e-9):,.0f} linhas/s)"
+                )
+
+
+def uso_memoria(dados):
+    """Memória ocupada pelo DataFrame, em MB."""
+    return dados.memory_usage(deep=True).sum() / 1e6
+
+
+def assinatura_esquema():
+    return [[coluna, ESQUEMA[coluna]] for coluna in COLUNAS_USADAS]
+
+
+def ler_snapshot(caminho):
+    if FORMATO_SNAPSHOT == 'parquet':
+        return pd.read_parquet(caminho)
+    return pd.read_pickle(caminho)
+
+
+def gravar_snapshot(dados, caminho):
+    # Grava em arquivo temporário e troca de uma vez, para que outro processo
+    # nunca leia um snapshot pela metade
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    if FORMATO_SNAPSHOT == 'parquet':
+        dados.to_parquet(temporario, index=False)
+    else:
+        dados.to_pickle(temporario)
+    os.replace(temporario, caminho)
+
+
+def _gravar_meta(caminho_meta, estado, impressao):
+    with open(caminho_meta, 'w') as arquivo:
+        json.dump({
+            'mtime_ns': estado.st_mtime_ns,
+            'tamanho': estado.st_size,
+            'sha1': impressao,
+            'formato': FORMATO_SNAPSHOT,
+            'esquema': assinatura_esquema(),
+        }, arquivo)
+
+
+def _ler_meta(caminho_meta):
+    try:
+        with open(caminho_meta) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def gerar_snapshot(caminho_csv, dados=None):
+    """Converte o CSV em snapshot colunar e retorna o DataFrame lido.
+
+    Com `dados` (as COLUNAS_USADAS do CSV atual, já lidas) o CSV não é relido.
+    """
+    caminho_snapshot, caminho_meta = caminhos_snapshot(caminho_csv)
+    estado = os.stat(caminho_csv)
+    if dados is None:
+        dados = ler_csv(caminho_csv)
+    gravar_snapshot(dados, caminho_snapshot)
+    _gravar_meta(caminho_meta, estado, impressao_digital(caminho_csv))
+    return dados
+
+
+def snapshot_atualizado(caminho_csv):
+    """Indica se o snapshot corresponde ao conteúdo atual do CSV."""
+    caminho_snapshot, caminho_meta = caminhos_snapshot(caminho_csv)
+    meta = _ler_meta(caminho_meta)
+    if meta is None or not os.path.exists(caminho_snapshot):
+        return False
+    if meta.get('formato') != FORMATO_SNAPSHOT or meta.get('esquema') != assinatura_esquema():
+        return False
+    estado = os.stat(caminho_csv)
+    if (meta['mtime_ns'], meta['tamanho']) == (estado.st_mtime_ns, estado.st_size):
+        return True
+    # mtime mudou: só reconstrói se o conteúdo realmente mudou
+    impressao = impressao_digital(caminho_csv)
+    if impressao != meta['sha1']:
+        return False
+    _gravar_meta(caminho_meta, estado, impressao)
+    return True
+
+
+def carregar_dados(caminho_csv):
+    """Carrega a base pelo snapshot, reconstruindo-o se o CSV mudou.
+
+    Se o snapshot não puder ser lido nem gravado, a base é lida do CSV.
+    """
+    caminho_snapshot, _ = caminhos_snapshot(caminho_csv)
+    try:
+        if snapshot_atualizado(caminho_csv):
+            return ler_snapshot(caminho_snapshot)
+        return gerar_snapshot(caminho_csv)
+    except (OSError, ValueError, ImportError) as erro:
+        print(f"Snapshot indisponível ({erro}); lendo {caminho_csv}")
+        return ler_csv(caminho_csv)
+
+
+# Gera (ou atualiza) o snapshot da base
+if __name__ == "__main__":
+    import sys
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "base/suplemento_cursos_tecnicos_2023.csv"
+    inicio = time.perf_counter()
+    dados = gerar_snapshot(caminho)
+    print(f"Snapshot {caminhos_snapshot(caminho)[0]} gerado em {time.perf_counter() - inicio:.2f}s")
+
+    # Comparação com a leitura sem esquema (todas as colunas, tipos padrão)
+    completo = pd.read_csv(caminho, sep=";", encoding="latin1")
+    print(f"Memória sem esquema: {uso_memoria(completo):.2f} MB ({completo.shape[1]} colunas)")
+    print(f"Memória com esquema: {uso_memoria(dados):.2f} MB ({dados.shape[1]} colunas)")
@@ -0,0 +1,219 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+from cache_figuras import serializar
+from compactacao import decodificar, template_enxuto
+from graficos import (GRAFICOS, GRAFICOS_POR_ESTADO, LIMITE_ROTULOS, PALETA_CURSOS_ESTADO, ROTULO_OUTROS,
+                      dados_grafico, gerar_figura)
+
+# Paletas dos gráficos por estado; None usa a paleta do template
+PALETAS_POR_ESTADO = {
+    'maior_cursos_regiao': None,
+    'maior_cursos_estado': PALETA_CURSOS_ESTADO,
+}
+
+
+def codificar(valores, tipo):
+    """Array numérico em base64 (little-endian), decodificado no navegador
+    como TypedArray."""
+    return {
+        'dtype': tipo,
+        'bdata': base64.b64encode(np.ascontiguousarray(valores, dtype=f"<{tipo}").tobytes()).decode('ascii'),
+    }
+
+
+def tipo_indices(maior):
+    """Menor tipo sem sinal (u2 ou u4) para códigos e índices até `maior`."""
+    return 'u2' if maior <= 0xFFFF else 'u4'
+
+
+def _figura_sem_template(tipo_grafico, cubo):
+    figura = json.loads(serializar(gerar_figura(tipo_grafico, cubo)))
+    figura.get('layout', {}).pop('template', None)
+    return figura
+
+
+def _template(figuras):
+    # Um só template para o payload, com os padrões de todos os tipos de traço
+    return template_enxuto({traco.get('type', 'scatter') for figura in figuras for traco in figura.get('data', ())})
+
+
+def _normal(valor):
+    # Números comparados como float (bdata, int e numpy), o resto como texto
+    if isinstance(valor, (int, float, np.number)) and not isinstance(valor, (bool, np.bool_)):
+        return float(valor)
+    return str(valor)
+
+
+def _arrays(traco):
+    """Propriedades do traço que são arrays de valores, já normalizados."""
+    arrays = {}
+    for propriedade, valores in traco.items():
+        if isinstance(valores, dict) and 'bdata' in valores:
+            valores = decodificar(valores).tolist()
+        elif not isinstance(valores, list) or not valores or isinstance(valores[0], (list, dict)):
+            continue
+        arrays[propriedade] = [_normal(valor) for valor in valores]
+    return arrays
+
+
+def _codificar_tabela(df):
+    """Colunas tipadas da agregação: números em TypedArray e textos/categorias
+    como códigos num dicionário de valores."""
+    colunas = {}
+    for nome in df.columns:
+        valores = df[nome]
+        if valores.dtype.kind in 'iu':
+            colunas[nome] = codificar(valores.to_numpy(), 'i4')
+        elif valores.dtype.kind == 'f':
+            colunas[nome] = codificar(valores.to_numpy(), 'f8')
+        else:
+            codigos, unicos = pd.factorize(valores.astype(object), sort=True)
+            colunas[nome] = {'codigos': codificar(codigos, tipo_indices(len(unicos))),
+                             'valores': [str(valor) for valor in unicos]}
+    return colunas
+
+
+def _codificar_linhas(linhas):
+    # Faixa contínua (o caso comum: um traço por bloco da agregação) sai como
+    # início e fim; o resto como índices u2 (u4 em tabelas maiores)
+    if len(linhas) and np.array_equal(linhas, np.arange(linhas[0], linhas[0] + len(linhas))):
+        return {'inicio': int(linhas[0]), 'fim': int(linhas[0] + len(linhas))}
+    return codificar(linhas, tipo_indices(int(np.max(linhas, initial=0))))
+
+
+def _propriedades(traco):
+    """(propriedades da categoria, propriedades do valor) do traço, pelo tipo
+    e orientação que o plotly express usa para as dimensões e medidas."""
+    tipo = traco.get('type')
+    if tipo == 'pie':
+        return ('labels',), ('values', 'text')
+    if tipo == 'choropleth':
+        return ('hovertext',), ('z',)
+    if traco.get('orientation') == 'h':
+        return ('y',), ('x', 'text')
+    return ('x',), ('y', 'text')
+
+
+def _tamanho(traco):
+    categorias, valores = _propriedades(traco)
+    arrays = _arrays(traco)
+    return next((len(arrays[propriedade]) for propriedade in categorias + valores if propriedade in arrays), 0)
+
+
+def _linhas_tracos(tracos, df, especificacao):
+    """(linhas, dimensão, medida) de `df` de onde sai cada traço, pela
+    especificação do gráfico; None se os traços não seguem a agregação.
+
+    Com várias medidas há um traço por medida (barras empilhadas por
+    modalidade), cada um com todas as linhas; com duas dimensões, um traço
+    por valor da última (a legenda), na ordem em que aparece; com uma só,
+    os traços cobrem as linhas em sequência (um por barra colorida, um por
+    bloco de cor ou um só traço).
+    """
+    dimensoes, medidas = list(especificacao['dimensoes']), list(especificacao['medidas'])
+    if len(medidas) > 1:
+        if len(tracos) != len(medidas):
+            return None
+        return [(np.arange(len(df)), dimensoes[0], medida) for medida in medidas]
+    if len(dimensoes) > 1:
+        codigos, valores = pd.factorize(df[dimensoes[-1]])
+        if len(tracos) != len(valores):
+            return None
+        return [(np.flatnonzero(codigos == codigo), dimensoes[0], medidas[0]) for codigo in range(len(valores))]
+    fronteiras = np.cumsum([0] + [_tamanho(traco) for traco in tracos])
+    if fronteiras[-1] != len(df):
+        return None
+    return [(np.arange(inicio, fim), dimensoes[0], medidas[0]) for inicio, fim in zip(fronteiras, fronteiras[1:])]
+
+
+def _figura_com_tabela(figura, tabela, df, especificacao):
+    """Figura cujos arrays que saem da agregação viram referências à tabela.
+
+    As linhas e colunas de cada traço vêm da especificação do gráfico (ver
+    _linhas_tracos); um array só vira referência se for igual à coluna
+    nessas linhas, e o que o gráfico calcula ou renomeia (rótulos com %,
+    nomes da dependência) segue no traço como está.
+    """
+    tracos = list(figura.get('data', ()))
+    ligacoes = _linhas_tracos(tracos, df, especificacao)
+    if ligacoes is None:
+        return figura
+    dados = []
+    for traco, (linhas, dimensao, medida) in zip(tracos, ligacoes):
+        arrays = _arrays(traco)
+        categorias, valores = _propriedades(traco)
+        colunas = {}
+        for propriedades, coluna in ((categorias, dimensao), (valores, medida)):
+            esperado = [_normal(valor) for valor in df[coluna].to_numpy()[linhas].tolist()]
+            colunas.update({propriedade: coluna for propriedade in propriedades
+                            if arrays.get(propriedade) == esperado})
+        if not colunas:
+            dados.append(traco)
+            continue
+        traco = {propriedade: valor for propriedade, valor in traco.items() if propriedade not in colunas}
+        traco['_tabela'] = tabela
+        traco['_linhas'] = _codificar_linhas(linhas)
+        traco['_colunas'] = colunas
+        dados.append(traco)
+    return {**figura, 'data': dados}
+
+
+def payload_main(cubo):
+    """Agregações dos gráficos do main.py em colunas tipadas, mais o molde
+    de cada figura: os traços guardam só as linhas e as colunas da tabela
+    de onde saem os valores, e o navegador monta os arrays. O que o gráfico
+    calcula ou renomeia (rótulos com %, nomes da dependência) segue no
+    molde como está. Gráficos com a mesma agregação dividem a tabela e o
+    template Plotly vai uma única vez."""
+    tabelas = {}
+    nomes_tabelas = {}
+    figuras = {}
+    for tipo_grafico, especificacao in GRAFICOS.items():
+        chave = (especificacao['dimensoes'], especificacao['medidas'], especificacao['top_n'],
+                 especificacao['grupo_top'], especificacao['crescente'], especificacao['limite'])
+        df = dados_grafico(tipo_grafico, cubo)
+        if chave not in nomes_tabelas:
+            nomes_tabelas[chave] = f"t{len(nomes_tabelas)}"
+            tabelas[nomes_tabelas[chave]] = _codificar_tabela(df)
+        figuras[tipo_grafico] = _figura_com_tabela(_figura_sem_template(tipo_grafico, cubo), nomes_tabelas[chave],
+                                                   df, especificacao)
+    return {'template': _template(figuras.values()), 'tabelas': tabelas, 'figuras': figuras}
+
+
+def payload_filtro(cubo):
+    """Tabela UF x região x curso em colunas codificadas por dicionário,
+    suficiente para filtrar estados e montar os gráficos no navegador."""
+    tabela = cubo.agregar(['SG_UF', 'NO_REGIAO', 'NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'])
+    colunas = {}
+    dicionarios = {}
+    for nome, coluna in [('uf', 'SG_UF'), ('regiao', 'NO_REGIAO'), ('curso', 'NO_CURSO_EDUC_PROFISSIONAL')]:
+        codigos, valores = pd.factorize(tabela[coluna], sort=True)
+        colunas[nome] = codificar(codigos, tipo_indices(len(valores)))
+        dicionarios[nome] = [str(valor) for valor in valores]
+
+    graficos = {}
+    figuras = []
+    for tipo_grafico in GRAFICOS_POR_ESTADO:
+        especificacao = GRAFICOS[tipo_grafico]
+        figura = _figura_sem_template(tipo_grafico, cubo)
+        figuras.append(figura)
+        graficos[tipo_grafico] = {
+            'grupo': 'regiao' if especificacao['grupo_top'] == 'NO_REGIAO' else 'uf',
+            'top_n': especificacao['top_n'],
+            'limite': especificacao['limite'],
+            'paleta': PALETAS_POR_ESTADO[tipo_grafico],
+            'layout': figura['layout'],
+        }
+    return {
+        'template': _template(figuras),
+        'rotulo_outros': ROTULO_OUTROS,
+        'limite_rotulos': LIMITE_ROTULOS,
+        'dicionarios': dicionarios,
+        'colunas': colunas,
+        'matriculas': codificar(tabela['QT_MAT_CURSO_TEC'].to_numpy(), 'i4'),
+        'graficos': graficos,
+    }
@@ -0,0 +1,129 @@
+import base64
+from functools import lru_cache
+
+import numpy as np
+import plotly.io as pio
+
+# Figuras enxutas para as respostas dos callbacks: o template só com os
+# padrões dos tipos de traço usados, sem propriedades iguais ao padrão do
+# plotly.js e sem rótulos que repetem os valores do eixo
+
+# Propriedades de traço que só repetem o padrão do plotly.js
+PADROES_TRACO = {'xaxis': 'x', 'yaxis': 'y', 'orientation': 'v'}
+
+_templates = {}
+
+
+@lru_cache(maxsize=1)
+def _template_padrao():
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+
+def template_enxuto(tipos, template=None):
+    """Template com os padrões só dos tipos de traço em `tipos`.
+
+    Sem `template`, parte do template padrão do plotly e o resultado é
+    guardado por conjunto de tipos: todas as figuras de barras, por
+    exemplo, passam a referenciar o mesmo objeto.
+    """
+    if template is None:
+        chave = frozenset(tipos)
+        if chave not in _templates:
+            _templates[chave] = template_enxuto(tipos, _template_padrao())
+        return _templates[chave]
+    return {
+        'data': {tipo: padroes for tipo, padroes in template.get('data', {}).items() if tipo in tipos},
+        'layout': template.get('layout', {}),
+    }
+
+
+def decodificar(valores):
+    """Array numpy de {dtype, bdata} ou de uma lista; None se não for numérico."""
+    if isinstance(valores, dict) and 'bdata' in valores:
+        return np.frombuffer(base64.b64decode(valores['bdata']), dtype=valores['dtype'])
+    valores = np.asarray(valores)
+    return valores if valores.dtype.kind in 'iuf' else None
+
+
+# Maior inteiro que um float64 representa sem perda
+MAIOR_INTEIRO_F8 = 2 ** 53
+
+
+def codificar(valores):
+    """Typed array do plotly.js ({dtype, bdata}) de uma lista numérica.
+
+    O plotly.js não tem typed array de 64 bits inteiros: inteiros além de i4
+    vão como f8 quando cabem sem perda; senão retorna None e a lista fica
+    como está.
+    """
+    valores = np.asarray(valores)
+    if valores.dtype.kind not in 'iuf':
+        # Inteiros maiores que 64 bits viram objetos Python
+        return None
+    if valores.dtype.kind in 'iu':
+        # Menor inteiro que comporta os valores, como o plotly faz com numpy
+        menor, maior = valores.min(initial=0), valores.max(initial=0)
+        for tipo in ('i1', 'i2', 'i4'):
+            limites = np.iinfo(tipo)
+            if limites.min <= menor and maior <= limites.max:
+                valores = valores.astype(tipo)
+                break
+        else:
+            if np.abs(valores, dtype='f8').max(initial=0) > MAIOR_INTEIRO_F8:
+                return None
+            valores = valores.astype('f8')
+    return {'dtype': valores.dtype.str.lstrip('<|='), 'bdata': base64.b64encode(valores.tobytes()).decode('ascii')}
+
+
+def _rotulo_repetido(traco):
+    """Eixo ('x' ou 'y') cujos valores o texto do traço só repete."""
+    if traco.get('texttemplate') != '%{text}' or 'text' not in traco:
+        return None
+    eixo = 'x' if traco.get('orientation') == 'h' else 'y'
+    texto, valores = decodificar(traco['text']), decodificar(traco.get(eixo, ()))
+    if texto is None or valores is None or valores.dtype.kind not in 'iu' or not np.array_equal(texto, valores):
+        return None
+    return eixo
+
+
+def _enxugar_traco(traco):
+    eixo = _rotulo_repetido(traco)
+    if eixo is not None:
+        # Mesmo texto, lido do eixo: `:d` mostra o inteiro como o rótulo mostrava
+        del traco['text']
+        traco['texttemplate'] = f'%{{{eixo}:d}}'
+        if 'hovertemplate' in traco:
+            traco['hovertemplate'] = traco['hovertemplate'].replace('%{text}', f'%{{{eixo}:d}}')
+    for propriedade, padrao in PADROES_TRACO.items():
+        if traco.get(propriedade) == padrao:
+            del traco[propriedade]
+    marcador = traco.get('marker')
+    if isinstance(marcador, dict) and marcador.get('pattern') == {'shape': ''}:
+        del marcador['pattern']
+    for propriedade, valores in traco.items():
+        # Listas numéricas que não passaram pelo numpy viram typed arrays
+        if isinstance(valores, (list, tuple)) and valores and all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores):
+            traco[propriedade] = codificar(valores) or valores
+    return traco
+
+
+def enxugar_figura(figura):
+    """Dicionário da figura pronto para serializar, sem o que é redundante.
+
+    Recebe uma go.Figure ou o dicionário de uma; o resultado desenha a
+    mesma coisa no navegador.
+    """
+    if hasattr(figura, 'to_plotly_json'):
+        figura = figura.to_plotly_json()
+    if not figura:
+        return figura
+    dados = [_enxugar_traco(dict(traco)) for traco in figura.get('data', ())]
+    layout = dict(figura.get('layout', {}))
+    tipos = {traco.get('type', 'scatter') for traco in dados}
+    if 'template' in layout:
+        if layout['template'] == _template_padrao():
+            layout['template'] = template_enxuto(tipos)
+        else:
+            layout['template'] = template_enxuto(tipos, layout['template'])
+    return {**figura, 'data': dados, 'layout': layout}
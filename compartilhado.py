@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from carregador import assinatura_esquema, carregar_dados, impressao_digital
+
+# Base tipada em um .npy por coluna (códigos no caso das categorias), mapeada
+# em memória: os workers do gunicorn abrem os mesmos arquivos e compartilham
+# as páginas do cache do sistema, sem parse do CSV nem cópia por processo
+
+
+def diretorio_colunas(caminho_csv):
+    return f"{os.path.splitext(caminho_csv)[0]}.colunas"
+
+
+def _ler_meta(diretorio):
+    try:
+        with open(os.path.join(diretorio, 'meta.json')) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_colunas(dados, diretorio, meta):
+    """Grava as colunas de `dados` em `diretorio` de uma só vez.
+
+    As colunas são montadas num diretório temporário e trocadas com rename:
+    workers que já mapearam a versão anterior continuam lendo os arquivos
+    antigos até reiniciarem.
+    """
+    temporario = f"{diretorio}.tmp{os.getpid()}"
+    os.makedirs(temporario)
+    categorias = {}
+    for coluna in dados.columns:
+        valores = dados[coluna]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            categorias[coluna] = valores.cat.categories.tolist()
+            valores = valores.cat.codes
+        np.save(os.path.join(temporario, f"{coluna}.npy"), valores.to_numpy())
+    with open(os.path.join(temporario, 'meta.json'), 'w') as arquivo:
+        json.dump({**meta, 'colunas': list(dados.columns), 'categorias': categorias}, arquivo)
+
+    antigo = f"{diretorio}.antigo{os.getpid()}"
+    if os.path.exists(diretorio):
+        os.rename(diretorio, antigo)
+    try:
+        os.rename(temporario, diretorio)
+    except OSError:
+        # Outro processo gravou a mesma base primeiro
+        shutil.rmtree(temporario)
+    shutil.rmtree(antigo, ignore_errors=True)
+
+
+# Tentativas de mapear enquanto outro worker troca o diretório das colunas
+TENTATIVAS_MAPEAR = 50
+ESPERA_MAPEAR_S = 0.1
+
+
+def _mapear(diretorio, meta):
+    colunas = {}
+    for coluna in meta['colunas']:
+        valores = np.load(os.path.join(diretorio, f"{coluna}.npy"), mmap_mode='r')
+        if coluna in meta['categorias']:
+            # validate=False mantém os códigos mapeados (a validação copia)
+            valores = pd.Categorical.from_codes(
+                valores, dtype=pd.CategoricalDtype(meta['categorias'][coluna]), validate=False
+            )
+        colunas[coluna] = valores
+    return pd.DataFrame(colunas, copy=False)
+
+
+def mapear_colunas(diretorio):
+    """DataFrame sobre os arquivos mapeados, sem copiar os dados.
+
+    Outro worker pode estar trocando o diretório (ver gravar_colunas): sem
+    meta.json, com arquivo sumindo no meio ou com meta.json trocado durante
+    o mapeamento (colunas de versões diferentes), tenta de novo.
+    """
+    for tentativa in range(TENTATIVAS_MAPEAR):
+        meta = _ler_meta(diretorio)
+        if meta is not None:
+            try:
+                dados = _mapear(diretorio, meta)
+            except (OSError, ValueError):
+                pass
+            else:
+                if _ler_meta(diretorio) == meta:
+                    return dados
+        time.sleep(ESPERA_MAPEAR_S)
+    raise RuntimeError(f"Colunas em {diretorio} não ficaram estáveis para o mapeamento")
+
+
+def colunas_atualizadas(caminho_csv, meta):
+    if meta is None or meta.get('esquema') != assinatura_esquema():
+        return False
+    estado = os.stat(caminho_csv)
+    if (meta['mtime_ns'], meta['tamanho']) == (estado.st_mtime_ns, estado.st_size):
+        return True
+    return meta['sha1'] == impressao_digital(caminho_csv)
+
+
+def carregar_compartilhado(caminho_csv):
+    """Base mapeada em memória, gravando as colunas se o CSV mudou.
+
+    Só o primeiro processo (ou `python compartilhado.py`, antes de subir os
+    workers) paga a leitura da base; os demais apenas mapeiam os arquivos.
+    """
+    diretorio = diretorio_colunas(caminho_csv)
+    if not colunas_atualizadas(caminho_csv, _ler_meta(diretorio)):
+        estado = os.stat(caminho_csv)
+        gravar_colunas(carregar_dados(caminho_csv), diretorio, {
+            'mtime_ns': estado.st_mtime_ns,
+            'tamanho': estado.st_size,
+            'sha1': impressao_digital(caminho_csv),
+            'esquema': assinatura_esquema(),
+        })
+    return mapear_colunas(diretorio)
+
+
+# Prepara as colunas mapeadas antes de subir os workers
+if __name__ == "__main__":
+    import resource
+    import sys
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "base/suplemento_cursos_tecnicos_2023.csv"
+    inicio = time.perf_counter()
+    dados = carregar_compartilhado(caminho)
+    print(f"{diretorio_colunas(caminho)}: {len(dados)} linhas, {dados.shape[1]} colunas "
+          f"em {time.perf_counter() - inicio:.2f}s")
+    tamanho = sum(os.path.getsize(os.path.join(diretorio_colunas(caminho), nome))
+                  for nome in os.listdir(diretorio_colunas(caminho)))
+    print(f"Arquivos mapeados: {tamanho / 1e6:.2f} MB")
+    print(f"RSS de pico deste processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
@@ -0,0 +1,79 @@
+import gzip
+import os
+
+# Compressão das respostas do servidor Flask dos apps: as figuras dos
+# callbacks (JSON) encolhem bastante, o que pesa em conexões móveis lentas
+
+# Respostas menores que isto não compensam a compressão
+TAMANHO_MINIMO = 500
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/', 'application/javascript')
+
+
+def _compressores():
+    """Codificações disponíveis, na ordem de preferência do servidor."""
+    compressores = []
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressores.append(('br', lambda corpo: brotli.compress(corpo, quality=5)))
+    compressores.append(('gzip', lambda corpo: gzip.compress(corpo, compresslevel=6)))
+    return compressores
+
+
+def _comprimir(corpo, aceitas):
+    """Comprime `corpo` com a codificação de maior q em `aceitas` (o
+    Accept-Encoding já interpretado, `request.accept_encodings`); q=0 recusa
+    a codificação. Empates ficam com a preferência do servidor."""
+    melhor = None
+    for nome, compressor in _compressores():
+        qualidade = aceitas[nome]
+        if qualidade > 0 and (melhor is None or qualidade > melhor[0]):
+            melhor = (qualidade, nome, compressor)
+    if melhor is None:
+        return None, corpo
+    return melhor[1], melhor[2](corpo)
+
+
+def registrar_compressao(server):
+    """Comprime as respostas do servidor Flask (callbacks, layout, assets).
+
+    Usa o flask-compress quando instalado (`pip install dash[compress]`);
+    sem ele, um after_request com brotli (se instalado) ou gzip da
+    biblioteca padrão. Desligada com DISC_TAC_COMPRESSAO=0.
+    """
+    if os.environ.get("DISC_TAC_COMPRESSAO", "1") == "0":
+        return
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        pass
+    else:
+        server.config.setdefault('COMPRESS_ALGORITHM', ['br', 'gzip'])
+        Compress(server)
+        return
+
+    from flask import request
+
+    def comprimir(resposta):
+        if (resposta.direct_passthrough or resposta.status_code != 200
+                or 'Content-Encoding' in resposta.headers
+                or not resposta.mimetype.startswith(TIPOS_COMPRIMIVEIS)):
+            return resposta
+        corpo = resposta.get_data()
+        if len(corpo) < TAMANHO_MINIMO:
+            return resposta
+        codificacao, comprimido = _comprimir(corpo, request.accept_encodings)
+        if codificacao is None:
+            return resposta
+        resposta.set_data(comprimido)
+        resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        # ETag do corpo original não vale mais byte a byte
+        etag, fraca = resposta.get_etag()
+        if etag is not None and not fraca:
+            resposta.set_etag(etag, weak=True)
+        return resposta
+
+    server.after_request(comprimir)
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+# API de consulta para outros sistemas: /api/consulta agrupa as tabelas já
+# agregadas (o cubo e os cruzamentos de precomputo.py) pelas dimensões e
+# filtros pedidos, sem passar pelo pipeline das figuras. Ativada com
+# DISC_TAC_CONSULTA=1; pandas só é importado na primeira consulta
+ATIVO = os.environ.get("DISC_TAC_CONSULTA") == "1"
+
+# Filtros aceitos na query string: parâmetro -> coluna
+FILTROS = {
+    'uf': 'SG_UF',
+    'regiao': 'NO_REGIAO',
+    'dependencia': 'TP_DEPENDENCIA',
+    'localizacao': 'TP_LOCALIZACAO',
+    'area': 'NO_AREA_CURSO_PROFISSIONAL',
+    'curso': 'NO_CURSO_EDUC_PROFISSIONAL',
+    'municipio': 'CO_MUNICIPIO',
+}
+
+# Códigos numéricos: os valores dos filtros são convertidos para int
+COLUNAS_INTEIRAS = {'TP_LOCALIZACAO', 'TP_DEPENDENCIA', 'NU_ANO_CENSO', 'CO_MUNICIPIO', 'CO_ENTIDADE'}
+
+FORMATOS = {
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+POR_PAGINA = 1000
+MAXIMO_POR_PAGINA = 10000
+
+
+class ErroConsulta(ValueError):
+    """Consulta inválida (400) ou que depende de um cruzamento ainda não
+    calculado (503)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def tabelas(cubo):
+    """(nome, dimensões, tabela) de cada tabela consultável; a tabela é None
+    para os cruzamentos que ainda não ficaram prontos."""
+    from agregados import DIMENSOES
+    from precomputo import CRUZAMENTOS
+
+    yield 'cubo', DIMENSOES, cubo.cubo
+    for nome, especificacao in CRUZAMENTOS.items():
+        yield nome, especificacao['dimensoes'], cubo.cruzamento(nome, copia=False)
+
+
+def _medidas(dimensoes, tabela):
+    # Participações (PC_) não podem ser somadas entre grupos
+    return [c for c in tabela.columns if c not in dimensoes and not c.startswith('PC_')]
+
+
+def _lista(args, nome, separar=True):
+    # Aceita ?uf=SP&uf=RJ e ?uf=SP,RJ; nomes (áreas, cursos) podem ter
+    # vírgula e só vêm repetidos
+    valores = args.getlist(nome)
+    if separar:
+        valores = [parte for valor in valores for parte in valor.split(',')]
+    return [valor.strip() for valor in valores if valor.strip()]
+
+
+def _inteiro(args, nome, padrao, minimo, maximo):
+    try:
+        valor = int(args.get(nome, padrao))
+    except ValueError:
+        raise ErroConsulta(f"'{nome}' deve ser um número inteiro")
+    if not minimo <= valor <= maximo:
+        raise ErroConsulta(f"'{nome}' deve estar entre {minimo} e {maximo}")
+    return valor
+
+
+def interpretar(args):
+    """Consulta normalizada a partir da query string.
+
+    Filtros saem ordenados e sem repetição, para que a mesma consulta escrita
+    de outro jeito caia na mesma entrada do cache e na mesma ETag.
+    """
+    filtros = []
+    for parametro, coluna in sorted(FILTROS.items(), key=lambda item: item[1]):
+        valores = _lista(args, parametro, separar=not coluna.startswith('NO_'))
+        if not valores:
+            continue
+        if coluna in COLUNAS_INTEIRAS:
+            try:
+                valores = [int(valor) for valor in valores]
+            except ValueError:
+                raise ErroConsulta(f"'{parametro}' aceita apenas códigos numéricos")
+        filtros.append((coluna, sorted(set(valores))))
+    formato = args.get('formato', 'json')
+    if formato not in FORMATOS:
+        raise ErroConsulta(f"'formato' deve ser um de: {', '.join(FORMATOS)}")
+    return {
+        'dimensoes': list(dict.fromkeys(_lista(args, 'dimensoes'))),
+        'medidas': list(dict.fromkeys(_lista(args, 'medidas'))) or ['QT_MAT_CURSO_TEC'],
+        'filtros': filtros,
+        'pagina': _inteiro(args, 'pagina', 1, 1, 1 << 31),
+        'por_pagina': _inteiro(args, 'por_pagina', POR_PAGINA, 1, MAXIMO_POR_PAGINA),
+        'formato': formato,
+    }
+
+
+def chave_resultado(consulta):
+    """Identifica o resultado completo (sem paginação nem formato)."""
+    return json.dumps([consulta['dimensoes'], consulta['medidas'], consulta['filtros']], ensure_ascii=False)
+
+
+def escolher_tabela(cubo, consulta):
+    """A menor tabela pronta que tem todas as colunas da consulta."""
+    dimensoes = set(consulta['dimensoes']) | {coluna for coluna, _ in consulta['filtros']}
+    escolhida = None
+    pendente = False
+    for nome, dimensoes_tabela, tabela in tabelas(cubo):
+        if not dimensoes <= set(dimensoes_tabela):
+            continue
+        if tabela is None:
+            pendente = True
+            continue
+        if not set(consulta['medidas']) <= set(_medidas(dimensoes_tabela, tabela)):
+            continue
+        if escolhida is None or len(tabela) < len(escolhida):
+            escolhida = tabela
+    if escolhida is None:
+        if pendente:
+            raise ErroConsulta("Cruzamento necessário para esta consulta ainda em cálculo", status=503)
+        raise ErroConsulta("Nenhuma tabela agregada tem essa combinação de dimensões, filtros e medidas")
+    return escolhida
+
+
+def executar(cubo, consulta):
+    """Resultado completo da consulta, ordenado pelas dimensões."""
+    import numpy as np
+    import pandas as pd
+
+    tabela = escolher_tabela(cubo, consulta)
+    manter = np.ones(len(tabela), dtype=bool)
+    for coluna, valores in consulta['filtros']:
+        manter &= tabela[coluna].isin(valores).to_numpy()
+    linhas = tabela[manter] if not manter.all() else tabela
+    medidas = consulta['medidas']
+    if consulta['dimensoes']:
+        resultado = linhas.groupby(consulta['dimensoes'], observed=True)[medidas].sum().reset_index()
+    else:
+        resultado = pd.DataFrame([linhas[medidas].sum()])
+    # Somas de contadores int8/int32 em int64, como no cubo
+    return resultado.astype({m: 'int64' for m in medidas if resultado[m].dtype.kind in 'iu'})
+
+
+class CacheConsultas:
+    """Cache LRU dos resultados completos; as páginas são recortes deles.
+
+    A chave inclui a impressão digital da base, então uma recarga (ver
+    atualizacao.py) passa a usar entradas novas e as antigas saem pelo LRU.
+    """
+
+    def __init__(self, tamanho_maximo=64):
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, calcular):
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return self._entradas[chave]
+            self.falhas += 1
+        resultado = calcular()
+        with self._trava:
+            self._entradas[chave] = resultado
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+        return resultado
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+
+cache_consultas = CacheConsultas()
+
+
+def etag(impressao, consulta):
+    conteudo = f"{impressao}|{chave_resultado(consulta)}|{consulta['pagina']}|{consulta['por_pagina']}|{consulta['formato']}"
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def serializar(pagina, consulta, total):
+    """Corpo da resposta no formato pedido."""
+    formato = consulta['formato']
+    if formato == 'csv':
+        return pagina.to_csv(index=False).encode('utf-8')
+    if formato == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ErroConsulta("Formato arrow indisponível: pyarrow não está instalado", status=406)
+        tabela = pa.Table.from_pandas(pagina, preserve_index=False)
+        destino = pa.BufferOutputStream()
+        with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return destino.getvalue().to_pybytes()
+    return json.dumps({
+        'dimensoes': consulta['dimensoes'],
+        'medidas': consulta['medidas'],
+        'filtros': {coluna: valores for coluna, valores in consulta['filtros']},
+        'pagina': consulta['pagina'],
+        'por_pagina': consulta['por_pagina'],
+        'total_linhas': total,
+        'total_paginas': -(-total // consulta['por_pagina']),
+        'linhas': pagina.to_dict('records'),
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def registrar_consulta(server, obter_estado):
+    """Monta /api/consulta no servidor Flask (somente com ATIVO).
+
+    `obter_estado()` retorna a versão da base em uso (com `cubo` e
+    `impressao`) ou None enquanto ela carrega.
+    """
+    if not ATIVO:
+        return
+    from flask import Response, request
+
+    from metricas import requisicao
+
+    def erro(mensagem, status):
+        resposta = Response(json.dumps({'erro': mensagem}, ensure_ascii=False), status, mimetype='application/json')
+        if status == 503:
+            resposta.headers['Retry-After'] = '5'
+        return resposta
+
+    def link(pagina):
+        args = request.args.to_dict(flat=False)
+        args['pagina'] = [str(pagina)]
+        return f"<{request.base_url}?{urlencode(args, doseq=True)}>"
+
+    def consultar():
+        atual = obter_estado()
+        if atual is None:
+            return erro("Base carregando", 503)
+        try:
+            consulta = interpretar(request.args)
+        except ErroConsulta as falha:
+            return erro(str(falha), falha.status)
+
+        # A ETag sai só da versão da base e da consulta: um cliente com a
+        # página atual recebe 304 sem que nada seja agrupado ou serializado
+        marca = etag(atual.impressao, consulta)
+        # Comparação fraca: com compressão a ETag enviada sai como W/"..."
+        if request.if_none_match.contains_weak(marca):
+            resposta = Response(status=304)
+            resposta.set_etag(marca)
+            return resposta
+
+        ufs = next((valores for coluna, valores in consulta['filtros'] if coluna == 'SG_UF'), ())
+        with requisicao('consulta', ufs):
+            try:
+                resultado = cache_consultas.obter(
+                    (atual.impressao, chave_resultado(consulta)),
+                    lambda: executar(atual.cubo, consulta)
+                )
+                inicio = (consulta['pagina'] - 1) * consulta['por_pagina']
+                pagina = resultado.iloc[inicio:inicio + consulta['por_pagina']]
+                corpo = serializar(pagina, consulta, len(resultado))
+            except ErroConsulta as falha:
+                return erro(str(falha), falha.status)
+
+        resposta = Response(corpo, mimetype=FORMATOS[consulta['formato']])
+        resposta.set_etag(marca)
+        # Sempre revalidado: a mesma URL muda de conteúdo quando a base muda
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.headers['X-Total-Count'] = str(len(resultado))
+        links = []
+        if inicio + consulta['por_pagina'] < len(resultado):
+            links.append(f'{link(consulta["pagina"] + 1)}; rel="next"')
+        if consulta['pagina'] > 1:
+            links.append(f'{link(consulta["pagina"] - 1)}; rel="prev"')
+        if links:
+            resposta.headers['Link'] = ', '.join(links)
+        return resposta
+
+    server.add_url_rule('/api/consulta', 'consulta', consultar)
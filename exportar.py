@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+from agregados import CuboAgregado
+from atualizacao import arquivos_versao, versao_arquivos
+from cache_figuras import DIRETORIO_EXPORTADO, nome_arquivo, serializar
+from carregador import carregar_dados
+from graficos import GRAFICOS, GRAFICOS_POR_ESTADO, gerar_figura, registrar_mapas
+from ingestao import carregar_serie
+from mapas import garantir_geometrias
+
+
+def combinacoes(cubo):
+    """Parâmetros (tipo, ufs) pré-gerados: cada gráfico sem filtro e, para
+    os gráficos com filtro de estado, cada UF isolada."""
+    for tipo_grafico in GRAFICOS:
+        yield tipo_grafico, ()
+    for uf in cubo.ufs():
+        for tipo_grafico in GRAFICOS_POR_ESTADO:
+            yield tipo_grafico, (uf,)
+
+
+def _gravar(caminho, conteudo):
+    """Grava `conteudo` num temporário por processo e o troca de uma vez:
+    quem lê `caminho` nunca vê o arquivo pela metade."""
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, 'w') as arquivo:
+        arquivo.write(conteudo)
+    try:
+        os.replace(temporario, caminho)
+    except OSError:
+        # Outro exportador trocou o arquivo primeiro
+        if not os.path.exists(caminho):
+            raise
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+
+
+def exportar(caminho_base, diretorio=DIRETORIO_EXPORTADO, relatorio=print):
+    """Gera o JSON de cada combinação em `diretorio` e retorna os tempos (ms).
+
+    O manifesto guarda a versão inteira da base (CSV e partições anuais):
+    uma ingestão nova invalida as figuras exportadas das séries históricas.
+    Antes de tudo baixa as malhas dos mapas que faltam em base/geo/ e para
+    com erro se não conseguir (ver mapas.garantir_geometrias).
+    """
+    garantir_geometrias(relatorio=relatorio)
+    registrar_mapas()
+    versao = versao_arquivos(arquivos_versao(caminho_base))
+    dados = carregar_dados(caminho_base)
+    cubo = CuboAgregado(dados, serie=carregar_serie(os.path.dirname(caminho_base)))
+    os.makedirs(diretorio, exist_ok=True)
+    # O manifesto antigo sai antes da primeira figura: enquanto ele valesse,
+    # os apps da versão anterior serviriam as figuras novas já gravadas
+    caminho_manifesto = os.path.join(diretorio, 'manifesto.json')
+    try:
+        os.remove(caminho_manifesto)
+    except FileNotFoundError:
+        pass
+
+    tempos = {}
+    for tipo_grafico, ufs in combinacoes(cubo):
+        nome = nome_arquivo((tipo_grafico, ufs))
+        inicio = time.perf_counter()
+        figura_json = serializar(gerar_figura(tipo_grafico, cubo, ufs=ufs))
+        tempos[nome] = (time.perf_counter() - inicio) * 1000
+        _gravar(os.path.join(diretorio, nome), figura_json)
+        if relatorio:
+            relatorio(f"{nome:<45} {tempos[nome]:>8.1f} ms")
+
+    # Manifesto por último: os apps só usam os arquivos depois que ele existe
+    _gravar(caminho_manifesto, json.dumps({'versao': list(versao), 'graficos': tempos}, indent=2))
+    return tempos
+
+
+# Pré-gera as figuras servidas em /assets/graficos/
+if __name__ == "__main__":
+    import sys
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "base/suplemento_cursos_tecnicos_2023.csv"
+    inicio = time.perf_counter()
+    tempos = exportar(caminho)
+    print(f"{len(tempos)} figuras exportadas em {time.perf_counter() - inicio:.2f}s")
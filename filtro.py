@@ -1,160 +1,505 @@
-from dash import Dash, dcc, html, Input, Output
+import os
+
+from dash import ClientsideFunction, Dash, ctx, dcc, html, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
 
-# Inicializar o app com Bootstrap para estilo
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+from atualizacao import Atualizador, arquivos_versao
+from compressao import registrar_compressao
+from inicializacao import Carregamento, registrar_saude
+from metricas import registrar_endpoint, requisicao
 
-# Carregar a base real
+# Base real
 caminho_base = "base/suplemento_cursos_tecnicos_2023.csv"
-dados = pd.read_csv(caminho_base, sep=";", encoding="latin1")
-
-# Layout do app
-app.layout = dbc.Container([
-    dbc.Row(
-        dbc.Col(
-            html.H1("Suplemento Cursos Técnicos 2023", className="text-center mb-4"),
-            width=12
-        )
-    ),
-    dbc.Row(
-        [
-            dbc.Col(
-                dbc.Button("Acesso a base", 
-                        href="https://github.com/Adjailson/disc_tac/blob/main/base/suplemento_cursos_tecnicos_2023.csv", 
-                        target="_blank",
-                        color="success", size="sm", className="mb-6 me-2"),
-                width="auto"
-            ),
 
+# Com DISC_TAC_CLIENTSIDE=1 o filtro de estados e a troca de gráfico rodam
+# no navegador, sobre a tabela compacta enviada no carregamento da página
+modo_clientside = os.environ.get("DISC_TAC_CLIENTSIDE") == "1"
+
+# Intervalo (s) entre as verificações de mudança na base; 0 desliga a recarga
+intervalo_atualizacao = float(os.environ.get("DISC_TAC_ATUALIZACAO_S", "30"))
+
+# Versão da base em uso, trocada por inteiro a cada recarga (ver main.py)
+estado = None
+
+
+def montar_estado():
+    """Lê a base e monta o cubo, o cache de figuras e as opções dos filtros.
+
+    pandas e plotly.express só são importados aqui, fora do caminho de
+    subida do servidor.
+    """
+    from types import SimpleNamespace
+
+    from agregados import CuboAgregado, Hierarquia
+    from atualizacao import versao_arquivos
+    from busca import indice_cursos_escolas
+    from cache_figuras import CacheFiguras
+    from carregador import carregar_dados
+    from clientside import payload_filtro
+    from compartilhado import carregar_compartilhado
+    from graficos import GRAFICOS_POR_ESTADO, opcoes
+    from mapas import geometria_disponivel
+    from precomputo import precalcular
+
+    versao = versao_arquivos(arquivos_versao(caminho_base))
+
+    # Base mapeada dos arquivos compartilhados pelos workers com
+    # DISC_TAC_COMPARTILHADO=1 (ver compartilhado.py)
+    if os.environ.get("DISC_TAC_COMPARTILHADO") == "1":
+        dados = carregar_compartilhado(caminho_base)
+    else:
+        dados = carregar_dados(caminho_base)
+
+    # Agregados pré-calculados, indexados por UF para os filtros de estado
+    cubo = CuboAgregado(dados)
+
+    # Drill-down servido pela hierarquia montada sobre o cruzamento por
+    # escola e gráfico da escola buscada, sobre o de cursos por escola
+    # (lidos de base/cruzamentos/ ou calculados uma vez)
+    precalcular(cubo, caminho_base, nomes=['escolas', 'cursos_escola'], relatorio=None)
+
+    # Mapa por município só com a malha em base/geo/ (ver mapas.py)
+    mapa_municipios = geometria_disponivel('municipio')
+    if mapa_municipios:
+        precalcular(cubo, caminho_base, nomes=['modalidade_municipio'], relatorio=None)
+
+    # Linhas desta versão, base do diff da próxima recarga incremental
+    if incremental_ativo():
+        from incremental import preparar
+        preparar(caminho_base, versao[0])
+
+    return SimpleNamespace(
+        versao=versao,
+        impressao=versao[0],
+        dados=dados,
+        cubo=cubo,
+        hierarquia=Hierarquia(cubo.cruzamento('escolas')),
+        # Busca de cursos e escolas do dropdown (ver busca.py)
+        indice=indice_cursos_escolas(cubo),
+        # Cache das figuras desta versão: descartado junto com ela na troca
+        cache_figuras=CacheFiguras(caminho_base),
+        payload=payload_filtro(cubo) if modo_clientside else None,
+        opcoes_regiao=opcoes(GRAFICOS_POR_ESTADO),
+        opcoes_estado=[{'label': uf, 'value': uf} for uf in cubo.ufs()],
+        mapa_municipios=mapa_municipios,
+    )
+
+
+def incremental_ativo():
+    # Com a base compartilhada entre workers a recarga é sempre completa
+    from incremental import ATIVO
+
+    return ATIVO and os.environ.get("DISC_TAC_COMPARTILHADO") != "1"
+
+
+def caminho_drill(hierarquia, textos):
+    """Chaves do nó do drill-down cujas chaves em texto (as do cache de
+    figuras) são `textos`; None se ele não existir em `hierarquia`."""
+    caminho = []
+    for texto in textos:
+        filhos = hierarquia.filhos(caminho)
+        chave = hierarquia.nivel(caminho)[0]
+        encontradas = [] if filhos is None else [valor for valor in filhos[chave] if str(valor) == texto]
+        if not encontradas:
+            return None
+        caminho.append(encontradas[0])
+    return caminho
+
+
+def figura_inalterada(parametros, anterior, atual, ufs):
+    """Se a figura de `parametros` sai igual em `atual` e em `anterior`."""
+    from incremental import figura_inalterada as grafico_inalterado, mesmos_dados
+
+    tipo, chaves = parametros
+    if tipo != 'drill':
+        return grafico_inalterado(parametros, anterior.cubo, atual.cubo, ufs)
+    caminho = caminho_drill(anterior.hierarquia, chaves)
+    if caminho is None or caminho_drill(atual.hierarquia, chaves) is None:
+        return False
+    return mesmos_dados(anterior.hierarquia.filhos(caminho), atual.hierarquia.filhos(caminho))
+
+
+def montar_estado_incremental(anterior):
+    """Nova versão a partir de `anterior` aplicando só as linhas do CSV que
+    mudaram (ver main.montar_estado_incremental); None quando a recarga
+    precisa ser completa."""
+    from types import SimpleNamespace
+
+    from agregados import Hierarquia
+    from atualizacao import versao_arquivos
+    from busca import indice_cursos_escolas
+    from cache_figuras import CacheFiguras
+    from carregador import COLUNAS_USADAS
+    from clientside import payload_filtro
+    from incremental import aplicar
+
+    versao = versao_arquivos(arquivos_versao(caminho_base))
+    resultado = aplicar(caminho_base, anterior.cubo, anterior.impressao, versao[0])
+    if resultado is None:
+        return None
+    cubo, linhas, ufs = resultado
+    if cubo.cruzamento('escolas', copia=False) is None:
+        return None
+
+    atual = SimpleNamespace(
+        versao=versao,
+        impressao=versao[0],
+        dados=linhas[COLUNAS_USADAS],
+        cubo=cubo,
+        hierarquia=Hierarquia(cubo.cruzamento('escolas')),
+        indice=indice_cursos_escolas(cubo),
+        cache_figuras=CacheFiguras(caminho_base),
+        payload=payload_filtro(cubo) if modo_clientside else None,
+        opcoes_regiao=anterior.opcoes_regiao,
+        opcoes_estado=[{'label': uf, 'value': uf} for uf in cubo.ufs()],
+        mapa_municipios=anterior.mapa_municipios,
+    )
+    atual.cache_figuras.herdar(anterior.cache_figuras, anterior.versao, atual.versao,
+                               lambda parametros: figura_inalterada(parametros, anterior, atual, ufs))
+    return atual
+
+
+def carregar():
+    global estado
+    novo = None
+    if estado is not None and incremental_ativo():
+        novo = montar_estado_incremental(estado)
+    estado = novo or montar_estado()
+
+
+def __getattr__(nome):
+    # filtro.cubo, filtro.cache_figuras... da versão em uso
+    if estado is not None and hasattr(estado, nome):
+        return getattr(estado, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+carregamento = Carregamento(carregar)
+
+
+def aviso_carregando():
+    if carregamento.pronto.is_set():
+        return None
+    return dbc.Alert("Carregando a base, recarregue a página em instantes.", color="info")
+
+
+# Layout do app, montado a cada carregamento da página
+def layout():
+    atual = estado
+    return dbc.Container([
+        dbc.Row(
             dbc.Col(
-                dbc.Button("Mais informações", 
-                        href="https://github.com/Adjailson/disc_tac/blob/main/base/RelatorioAdjailsonDisc-TAC.pdf",
-                        target="_blank",
-                        color="primary", size="sm", className="mb-6"),
-                width="auto"
+                html.H1("Suplemento Cursos Técnicos 2023", className="text-center mb-4"),
+                width=12
             )
-        ],
-        justify="center",
-        className="mb-4"
-    ),
-
-    dbc.Row(
-        dbc.Col(
-            dcc.Dropdown(
-                id='dropdown-regiao',
-                options=[
-                    {'label': 'Cursos com Maior Número de Matrículas por Região', 'value': 'maior_cursos_regiao'},
-                    {'label': 'Cursos com Maior Número de Matrículas por Estado', 'value': 'maior_cursos_estado'},
-                ],
-                value='barras',
-                placeholder='Escolha o tipo de gráfico',
-                multi=False
-            ),
-            width=6,
+        ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Button("Acesso a base", 
+                            href="https://github.com/Adjailson/disc_tac/blob/main/base/suplemento_cursos_tecnicos_2023.csv", 
+                            target="_blank",
+                            color="success", size="sm", className="mb-6 me-2"),
+                    width="auto"
+                ),
+
+                dbc.Col(
+                    dbc.Button("Mais informações", 
+                            href="https://github.com/Adjailson/disc_tac/blob/main/base/RelatorioAdjailsonDisc-TAC.pdf",
+                            target="_blank",
+                            color="primary", size="sm", className="mb-6"),
+                    width="auto"
+                )
+            ],
+            justify="center",
             className="mb-4"
-        )
-    ),
+        ),
 
+        aviso_carregando(),
 
-    dbc.Row(
-        dbc.Col(
-            dcc.Dropdown(
-                id='dropdown-estado',
-                options=[{'label': uf, 'value': uf} for uf in dados['SG_UF'].unique()],
-                placeholder="Selecione um estado",
-                multi=False,  # Permitir seleção de múltiplos estados
+        dbc.Row(
+            dbc.Col(
+                dcc.Dropdown(
+                    id='dropdown-regiao',
+                    options=atual.opcoes_regiao if atual else [],
+                    value='barras',
+                    placeholder='Escolha o tipo de gráfico',
+                    multi=False
+                ),
+                width=6,
                 className="mb-4"
+            )
+        ),
+
+
+        dbc.Row(
+            dbc.Col(
+                dcc.Dropdown(
+                    id='dropdown-estado',
+                    options=atual.opcoes_estado if atual else [],
+                    placeholder="Selecione um ou mais estados",
+                    multi=True,  # Permitir seleção de múltiplos estados
+                    className="mb-4"
+                ),
+                width=6
+            )
+        ),
+
+        dbc.Row(
+            dbc.Col(
+                dcc.Graph(id='grafico-filtro'),
+                width=12
+            )
+        ),
+        dcc.Store(id='payload-filtro', data=atual.payload if atual else None),
+
+        # Mapa por município dos estados selecionados (o país, sem seleção);
+        # escondido quando não há malha de municípios em base/geo/
+        dbc.Row(
+            dbc.Col(
+                dcc.Graph(id='mapa-municipios'),
+                width=12
             ),
-            width=6
-        )
-    ),
+            style=None if atual and atual.mapa_municipios else {'display': 'none'}
+        ),
 
-    dbc.Row(
-        dbc.Col(
-            dcc.Graph(id='grafico-filtro'),
-            width=12
-        )
-    ),
-    dbc.Row(
-        dbc.Col(
-            html.P("© 2023 Suplemento Cursos Técnicos", className="text-center"),
-            width=12,
+        # Busca de curso ou escola: as opções vêm do servidor conforme o
+        # texto digitado (ver buscar_opcoes)
+        dbc.Row(
+            dbc.Col(
+                dcc.Dropdown(
+                    id='dropdown-busca',
+                    options=[],
+                    placeholder="Busque um curso ou uma escola",
+                    multi=False
+                ),
+                width=6
+            ),
+            className="mt-4"
+        ),
+        dbc.Row(
+            dbc.Col(
+                dcc.Graph(id='grafico-busca'),
+                width=12
+            )
+        ),
+
+        # Drill-down: clique numa barra para descer um nível
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Button("Voltar", id='botao-voltar', color="secondary", size="sm"),
+                    width="auto"
+                ),
+                dbc.Col(html.Span(id='caminho-texto'), width="auto")
+            ],
+            align="center",
             className="mt-4"
+        ),
+        dbc.Row(
+            dbc.Col(
+                dcc.Graph(id='grafico-drill'),
+                width=12
+            )
+        ),
+        dcc.Store(id='caminho-drill', data=[]),
+        dbc.Row(
+            dbc.Col(
+                html.P("© 2023 Suplemento Cursos Técnicos", className="text-center"),
+                width=12,
+                className="mt-4"
+            )
         )
-    )
-], fluid=True)
+    ], fluid=True)
+
 
-@app.callback(
-    Output('grafico-filtro', 'figure'),
-    [Input('dropdown-regiao', 'value'),
-     Input('dropdown-estado', 'value')]
-)
 def atualizar_grafico(tipo_grafico, estados_selecionados):
-    # Filtrar o DataFrame com base nos estados selecionados
-    #df_filtrado = dados
-    print(estados_selecionados)
-    if estados_selecionados:
-        df_filtrado = dados[dados['SG_UF'].isin(estados_selecionados)]
-        print(df_filtrado)
-
-    #Select - Cursos com Maior Número de Matrículas por Região
-    if tipo_grafico == 'maior_cursos_regiao':
-        df_cursos_regiao = dados.groupby(['NO_REGIAO', 'NO_CURSO_EDUC_PROFISSIONAL'])['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_cursos_regiao.columns = ['Região', 'Curso', 'Número de Matrículas']
-
-        df_top_cursos = df_cursos_regiao.sort_values(by=['Região', 'Número de Matrículas'], ascending=[True, False])
-        df_top_cursos = df_top_cursos.groupby('Região').head(5)  # Pega os 5 maiores por região
-
-        fig = px.bar(
-            df_top_cursos,
-            x='Região',
-            y='Número de Matrículas',
-            color='Curso',
-            title="Cursos com Maior Número de Matrículas por Região",
-            text='Número de Matrículas'
+    if not carregamento.pronto.is_set():
+        raise PreventUpdate
+    # Mesma seleção em outra ordem gera a mesma figura
+    estados_selecionados = tuple(sorted(estados_selecionados or []))
+    atual = estado
+    with requisicao(tipo_grafico, estados_selecionados):
+        return atual.cache_figuras.obter(
+            (tipo_grafico, estados_selecionados),
+            lambda: construir_grafico(tipo_grafico, estados_selecionados, atual),
+            versao=atual.versao
         )
-        # Ajustar layout para gráfico empilhado
-        fig.update_layout(
-            xaxis_title="Região",
-            yaxis_title="Número de Matrículas",
-            barmode='stack',  # Empilhamento das barras
-            legend_title="Curso"
+
+
+def atualizar_mapa(estados_selecionados):
+    if not carregamento.pronto.is_set():
+        raise PreventUpdate
+    atual = estado
+    if not atual.mapa_municipios:
+        return {}
+    estados_selecionados = tuple(sorted(estados_selecionados or []))
+    with requisicao('mapa_municipios', estados_selecionados):
+        return atual.cache_figuras.obter(
+            ('mapa_municipios', estados_selecionados),
+            lambda: construir_mapa(estados_selecionados, atual),
+            versao=atual.versao
         )
 
-    #Select - Cursos com Maior Número de Matrículas por Estado
-    elif tipo_grafico == 'maior_cursos_estado':
-        df_cursos_estado = dados.groupby(['SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL'])['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_cursos_estado.columns = ['Estado', 'Curso', 'Número de Matrículas']
-
-        df_top_cursos = df_cursos_estado.sort_values(by=['Estado', 'Número de Matrículas'], ascending=[True, False])
-        df_top_cursos = df_top_cursos.groupby('Estado').head(3)  # Pega os 3 maiores por região
-
-        fig = px.bar(
-            df_top_cursos,
-            x='Estado',
-            y='Número de Matrículas',
-            color='Curso',
-            title="Cursos com Maior Número de Matrículas por Estado",
-            text='Número de Matrículas',
-            color_discrete_sequence=px.colors.qualitative.Set2
+
+def construir_mapa(estados_selecionados, atual):
+    from mapas import figura_municipios
+
+    cruzamento = atual.cubo.cruzamento('modalidade_municipio', copia=False)
+    if cruzamento is None:
+        return {}
+    return figura_municipios(cruzamento, ufs=estados_selecionados)
+
+
+def buscar_opcoes(texto, valor):
+    """Opções do dropdown de busca para o texto digitado.
+
+    Só os melhores resultados do índice vão para o navegador; a opção já
+    escolhida continua na lista para o dropdown seguir mostrando-a.
+    """
+    if not carregamento.pronto.is_set() or not texto:
+        raise PreventUpdate
+    atual = estado
+    with requisicao('busca'):
+        opcoes = atual.indice.opcoes(texto)
+    escolhida = atual.indice.opcao_do_valor(valor)
+    if escolhida is not None and all(opcao['value'] != valor for opcao in opcoes):
+        opcoes.insert(0, escolhida)
+    return opcoes
+
+
+def atualizar_busca(valor):
+    if not carregamento.pronto.is_set():
+        raise PreventUpdate
+    if not valor:
+        return {}
+    atual = estado
+    with requisicao('busca'):
+        return atual.cache_figuras.obter(
+            ('busca', (valor,)),
+            lambda: construir_busca(valor, atual),
+            versao=atual.versao
         )
-        # Ajustar layout para gráfico empilhado
-        fig.update_layout(
-            xaxis_title="Estado",
-            yaxis_title="Número de Matrículas",
-            barmode='stack',  # Empilhamento das barras
-            legend_title="Curso"
+
+
+def construir_busca(valor, atual):
+    from graficos import figura_busca
+
+    return figura_busca(valor, atual.cubo)
+
+
+def construir_grafico(tipo_grafico, estados_selecionados, atual=None):
+    from graficos import gerar_figura
+
+    # Só as linhas do cubo dos estados selecionados (todos se nenhum)
+    return gerar_figura(tipo_grafico, (atual or estado).cubo, ufs=estados_selecionados)
+
+
+def navegar(clique, _voltar, caminho):
+    """Desce um nível no clique de uma barra ou sobe um com "Voltar".
+
+    `caminho` guarda [chave, rótulo] de cada nível escolhido.
+    """
+    if not carregamento.pronto.is_set():
+        raise PreventUpdate
+    caminho = caminho or []
+    atual = estado
+    if ctx.triggered_id == 'grafico-drill' and clique:
+        # Escolas são o último nível
+        if len(caminho) + 1 >= atual.hierarquia.niveis:
+            raise PreventUpdate
+        ponto = clique['points'][0]['customdata']
+        # A barra "Outros" junta vários filhos: não há um nó para descer
+        from graficos import ROTULO_OUTROS
+        if ponto[0] == ROTULO_OUTROS:
+            raise PreventUpdate
+        caminho = caminho + [[ponto[0], ponto[-1]]]
+    elif ctx.triggered_id == 'botao-voltar':
+        caminho = caminho[:-1]
+    chaves = tuple(chave for chave, _ in caminho)
+    if atual.hierarquia.filhos(chaves) is None:
+        caminho, chaves = [], ()
+    with requisicao('drill', nivel=len(chaves)):
+        figura = atual.cache_figuras.obter(
+            ('drill', tuple(str(chave) for chave in chaves)),
+            lambda: construir_drill(caminho, atual),
+            versao=atual.versao
         )
+    texto = " > ".join(["Brasil"] + [rotulo for _, rotulo in caminho])
+    return figura, caminho, texto
+
+
+def construir_drill(caminho, atual):
+    from graficos import figura_drill
 
+    return figura_drill(
+        atual.hierarquia.filhos([chave for chave, _ in caminho]),
+        len(caminho),
+        [rotulo for _, rotulo in caminho],
+    )
+
+
+def create_app(segundo_plano=True):
+    """Cria o app Dash e inicia a carga da base (ver main.create_app)."""
+    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    app.layout = layout
+
+    # Callback do gráfico: no navegador (assets/clientside.js) ou no servidor
+    if modo_clientside:
+        app.clientside_callback(
+            ClientsideFunction(namespace='disc_tac', function_name='figura_filtro'),
+            Output('grafico-filtro', 'figure'),
+            [Input('dropdown-regiao', 'value'),
+             Input('dropdown-estado', 'value')],
+            State('payload-filtro', 'data')
+        )
     else:
-        fig = {}
-    
-    return fig
+        app.callback(
+            Output('grafico-filtro', 'figure'),
+            [Input('dropdown-regiao', 'value'),
+             Input('dropdown-estado', 'value')]
+        )(atualizar_grafico)
 
-# Executar o servidor localhost
-if __name__ == "__main__":
-    app.run_server(debug=True)
+    # Mapa por município, sempre no servidor (a malha não vai no payload)
+    app.callback(
+        Output('mapa-municipios', 'figure'),
+        Input('dropdown-estado', 'value')
+    )(atualizar_mapa)
 
+    # Busca de curso/escola: opções e gráfico sempre no servidor
+    app.callback(
+        Output('dropdown-busca', 'options'),
+        Input('dropdown-busca', 'search_value'),
+        State('dropdown-busca', 'value')
+    )(buscar_opcoes)
+    app.callback(
+        Output('grafico-busca', 'figure'),
+        Input('dropdown-busca', 'value')
+    )(atualizar_busca)
 
+    # Drill-down Região -> UF -> Município -> Escola, sempre no servidor
+    app.callback(
+        [Output('grafico-drill', 'figure'),
+         Output('caminho-drill', 'data'),
+         Output('caminho-texto', 'children')],
+        [Input('grafico-drill', 'clickData'),
+         Input('botao-voltar', 'n_clicks')],
+        State('caminho-drill', 'data')
+    )(navegar)
+
+    registrar_saude(app.server, carregamento)
+    # Respostas comprimidas (brotli/gzip); DISC_TAC_COMPRESSAO=0 desliga
+    registrar_compressao(app.server)
+    # /metrics (Prometheus) quando DISC_TAC_METRICAS=1
+    registrar_endpoint(app.server, lambda: estado and estado.cache_figuras)
+
+    carregamento.iniciar(segundo_plano)
+    if segundo_plano and intervalo_atualizacao > 0:
+        Atualizador(arquivos_versao(caminho_base), lambda: estado and estado.versao, carregar, intervalo_atualizacao).iniciar()
+    return app
+
+
+# Executar o servidor localhost
+if __name__ == "__main__":
+    create_app().run(debug=True)
@@ -0,0 +1,589 @@
+import os
+
+import pandas as pd
+import plotly.express as px
+
+from agregados import agrupar_cauda
+from mapas import CODIGOS_UF, figura_mapa, geometria_disponivel, url_geometria
+from metricas import GRAFICOS_CONHECIDOS, fase
+from rotulos import categoria_por_posicao, porcentagem, texto_valor_porcentagem
+
+# Registro dos gráficos: valor do dropdown -> especificação do gráfico
+GRAFICOS = {}
+
+# Gráficos oferecidos com filtro de estados (filtro.py)
+GRAFICOS_POR_ESTADO = ['maior_cursos_regiao', 'maior_cursos_estado']
+
+# Paleta do gráfico de cursos por estado (também usada no modo clientside)
+PALETA_CURSOS_ESTADO = px.colors.qualitative.Set3
+
+NOMES_DEPENDENCIA = {1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'}
+
+# Máximo de categorias por gráfico: acima dele a cauda vira uma barra (ou
+# segmento) "Outros". Padrão de DISC_TAC_LIMITE_CATEGORIAS (0 desliga),
+# ajustável por gráfico com `limite=` no registro
+LIMITE_CATEGORIAS = int(os.environ.get("DISC_TAC_LIMITE_CATEGORIAS", "30"))
+ROTULO_OUTROS = 'Outros'
+
+# Acima de tantas barras numa figura os rótulos de texto deixam de ser
+# enviados: não cabem nas barras e só aumentam o payload
+LIMITE_ROTULOS = 100
+
+
+def grafico(valor, rotulo, dimensoes, medidas, top_n=None, grupo_top=None, crescente=False, limite=None):
+    """Registra a função que monta a figura a partir da agregação declarada.
+
+    A figura recebe o agrupamento de `medidas` por `dimensoes` já calculado
+    pelo cubo; com `top_n` recebe só os `top_n` maiores (ou menores, com
+    `crescente`) pela primeira medida, por `grupo_top` quando informado.
+    A última dimensão (a categoria das barras ou da legenda) é cortada em
+    `limite` categorias (padrão LIMITE_CATEGORIAS; 0 desliga).
+    """
+    def registrar(construir):
+        GRAFICOS[valor] = {
+            'valor': valor,
+            'rotulo': rotulo,
+            'dimensoes': tuple(dimensoes),
+            'medidas': tuple(medidas),
+            'top_n': top_n,
+            'grupo_top': grupo_top,
+            'crescente': crescente,
+            'limite': LIMITE_CATEGORIAS if limite is None else limite,
+            'construir': construir,
+        }
+        # Valor aceito como rótulo das métricas (ver metricas.rotulos_requisicao)
+        GRAFICOS_CONHECIDOS.add(valor)
+        return construir
+    return registrar
+
+
+def opcoes(valores=None):
+    """Opções do dropdown, na ordem do registro (ou de `valores`)."""
+    valores = list(GRAFICOS) if valores is None else valores
+    return [{'label': GRAFICOS[valor]['rotulo'], 'value': valor} for valor in valores]
+
+
+def dados_grafico(tipo_grafico, cubo, ufs=None):
+    """Agregação (já com top-N) usada pelo gráfico `tipo_grafico`."""
+    especificacao = GRAFICOS[tipo_grafico]
+    if especificacao['top_n']:
+        df = cubo.top_n(
+            especificacao['dimensoes'],
+            especificacao['medidas'][0],
+            especificacao['top_n'],
+            grupo=especificacao['grupo_top'],
+            crescente=especificacao['crescente'],
+            ufs=ufs,
+        )
+    else:
+        df = cubo.agregar(especificacao['dimensoes'], especificacao['medidas'], ufs=ufs)
+    return agrupar_cauda(df, especificacao['dimensoes'], especificacao['medidas'],
+                         especificacao['dimensoes'][-1], especificacao['limite'], ROTULO_OUTROS)
+
+
+def limitar_rotulos(fig, limite=LIMITE_ROTULOS):
+    """Tira o texto das barras quando a figura tem mais de `limite` barras.
+
+    O hover passa a ler o valor do eixo, já que o texto deixa de existir.
+    """
+    barras = [traco for traco in fig.data if traco.type == 'bar']
+    if sum(len(traco.x if traco.x is not None else ()) for traco in barras) <= limite:
+        return fig
+    for traco in barras:
+        valor = '%{x}' if traco.orientation == 'h' else '%{y}'
+        if traco.hovertemplate:
+            traco.hovertemplate = traco.hovertemplate.replace('%{text}', valor)
+        traco.text = None
+        traco.texttemplate = None
+    return fig
+
+
+def gerar_figura(tipo_grafico, cubo, ufs=None):
+    """Figura do gráfico `tipo_grafico`; `{}` para valores desconhecidos."""
+    especificacao = GRAFICOS.get(tipo_grafico)
+    if especificacao is None:
+        return {}
+    with fase('agregar'):
+        df = dados_grafico(tipo_grafico, cubo, ufs=ufs)
+    with fase('montar_figura'):
+        return limitar_rotulos(especificacao['construir'](df))
+
+
+#Select - Número de Escolas por Região
+@grafico('regiao', 'Número de Escolas por Região', ['NO_REGIAO'], ['NO_ENTIDADE'])
+def grafico_regiao(df_regioes):
+    df_regioes.columns = ['Região', 'Número de Escolas']
+
+    df_regioes['Porcentagem'] = porcentagem(df_regioes['Número de Escolas'])
+
+    # Criar o gráfico
+    fig = px.bar(
+        df_regioes,
+        x='Região',
+        y='Número de Escolas',
+        title="Número de Escolas por Região",
+        text=texto_valor_porcentagem(df_regioes['Número de Escolas']),  # Valores + Porcentagem
+        color='Região',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+
+    # Ajustar posição e layout do texto
+    fig.update_traces(
+        textposition='outside'
+    )
+    fig.update_layout(
+        xaxis_title="Região",
+        yaxis_title="Número de Escolas",
+        uniformtext_minsize=8,
+        uniformtext_mode='hide'
+    )
+    return fig
+
+
+#Select - Número de Escolas por Zona (Urbana/Rural)
+@grafico('zona', 'Número de Escolas por Zona (Urbana/Rural)', ['TP_LOCALIZACAO'], ['NO_ENTIDADE'])
+def grafico_zona(df_localizacao):
+    df_localizacao['Zona'] = df_localizacao['TP_LOCALIZACAO'].map({1: 'Urbana', 2: 'Rural'})
+    df_localizacao.columns = ['TP_LOCALIZACAO', 'Número de Escolas', 'Zona']
+
+    fig = px.pie(
+        df_localizacao,
+        names='Zona',
+        values='Número de Escolas',
+        title="Distribuição de Escolas por Zona Urbana/Rural",
+        hole=0.4,  # Gráfico de pizza semi-donut
+        color='Zona',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    # Adicionar valores e porcentagens nos rótulos
+    fig.update_traces(
+        textinfo='label+percent+value',
+        texttemplate='%{label}: %{value} (%{percent})'
+    )
+    return fig
+
+
+#Número por Dependência Administrativa
+@grafico('dependencia', 'Número por Dependência Administrativa', ['TP_DEPENDENCIA'], ['NO_ENTIDADE'])
+def grafico_dependencia(df_dependencia):
+    #Comparação por Dependência Administrativa (Pública, privada , federal..)
+    df_dependencia['Dependência'] = df_dependencia['TP_DEPENDENCIA'].map(NOMES_DEPENDENCIA)
+    df_dependencia.columns = ['TP_DEPENDENCIA', 'Número de Escolas', 'Dependência']
+    # Calcular a porcentagem
+    df_dependencia['Porcentagem'] = porcentagem(df_dependencia['Número de Escolas'])
+
+    # Criar o gráfico
+    fig = px.bar(
+        df_dependencia,
+        x='Dependência',
+        y='Número de Escolas',
+        title="Comparação por Dependência Administrativa",
+        text=texto_valor_porcentagem(df_dependencia['Número de Escolas']),
+        color='Dependência',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    return fig
+
+
+#Select - Análise por Ano e Região
+@grafico('ano_regiao', 'Análise por Ano e Região', ['NU_ANO_CENSO', 'NO_REGIAO'], ['NO_ENTIDADE'])
+def grafico_ano_regiao(df_ano_regiao):
+    df_ano_regiao.columns = ['Ano', 'Região', 'Número de Escolas']
+
+    fig = px.line(
+        df_ano_regiao,
+        x='Ano',
+        y='Número de Escolas',
+        color='Região',
+        title="Número de Escolas por Ano e Região",
+        markers=True
+    )
+    # Adicionar rótulos nos pontos
+    fig.update_traces(text='Número de Escolas', textposition='top center')
+    # Ajustar o layout para melhor visualização
+    fig.update_layout(hovermode='x unified')
+    return fig
+
+
+#Select - Número de Cursos por Estado
+@grafico('cursos_estado', 'Número de Cursos por Estado', ['NO_UF'], ['NO_ENTIDADE'])
+def grafico_cursos_estado(df_cursos_estado):
+    df_cursos_estado.columns = ['Estado', 'Número de Cursos']
+
+    fig = px.bar(
+        df_cursos_estado,
+        x='Estado',
+        y='Número de Cursos',
+        title="Número de Cursos por Estado",
+        text='Número de Cursos',
+        color='Estado',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    # Adicionar valores como rótulos e ajustar layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(xaxis_title="Estado", yaxis_title="Número de Cursos")
+    return fig
+
+
+#Select - Matrículas por Curso (Top 10)
+@grafico('matriculas_curso', 'Matrículas por Curso (Top 10)', ['NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'], top_n=10)
+def grafico_matriculas_curso(df_matriculas_curso):
+    df_matriculas_curso.columns = ['Curso', 'Número de Matrículas']
+
+    # Criar uma nova coluna para as cores: top 3 com cor específica, restante com outra cor
+    df_matriculas_curso['Cor'] = categoria_por_posicao(len(df_matriculas_curso), 3, 'Top 3 - Cursos', 'Outros')
+
+    fig = px.bar(
+        df_matriculas_curso,  # Os 10 cursos com mais matrículas
+        x='Número de Matrículas',
+        y='Curso',
+        orientation='h',  # Gráfico de barras horizontal
+        title="Top 10 Cursos por Matrículas",
+        text='Número de Matrículas',
+        color='Cor',
+        color_discrete_map={
+            'Top 3 - Cursos': '#FF7F50',  # Cor personalizada para os 3 primeiros
+            'Outros': '#d3d3d3'  # Cor cinza para os demais
+        },
+    )
+    # Adicionar rótulos com os valores e ajustar layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(
+        yaxis_title="Curso",
+        xaxis_title="Número de Matrículas",
+        yaxis=dict(autorange="reversed")  # Reverter ordem para exibir do maior ao menor
+    )
+    return fig
+
+
+#Select  - Número de Alunos por Estado
+@grafico('alunos_estado', 'Número de Alunos por Estado', ['NO_UF'], ['QT_MAT_CURSO_TEC'])
+def grafico_alunos_estado(df_alunos_estado):
+    df_alunos_estado.columns = ['Estado', 'Número de Alunos']
+
+    fig = px.bar(
+        df_alunos_estado,
+        x='Estado',
+        y='Número de Alunos',
+        title="Número de Alunos por Estado",
+        text='Número de Alunos',
+        color='Estado',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    # Adicionar rótulos com os valores e ajustar layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(xaxis_title="Estado", yaxis_title="Número de Alunos")
+    return fig
+
+
+#select - Número de Alunos por Curso (mesma agregação de 'matriculas_curso')
+@grafico('alunos_curso', 'Número de Alunos por Curso', ['NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'], top_n=10)
+def grafico_alunos_curso(df_alunos_curso):
+    df_alunos_curso.columns = ['Curso', 'Número de Alunos']
+
+    fig = px.bar(
+        df_alunos_curso,  # Os 10 cursos com mais alunos
+        x='Número de Alunos',
+        y='Curso',
+        orientation='h',  # Gráfico de barras horizontal
+        title="Top 10 Cursos por Número de Alunos",
+        text='Número de Alunos',
+        color='Curso',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    # Adicionar rótulos com os valores e ajustar layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(
+        yaxis_title="Curso",
+        xaxis_title="Número de Alunos",
+    )
+    return fig
+
+
+#Select - Número de Cursos Técnicos por Modalidade
+@grafico('cursos_modalidade', 'Número de Cursos Técnicos por Modalidade', ['NO_UF'], ['QT_CURSO_TEC_CT', 'QT_CURSO_TEC_SUBS'])
+def grafico_cursos_modalidade(df_cursos_modalidade):
+    # Ajustar os nomes das colunas
+    df_cursos_modalidade.columns = ['Estado', 'Ensino Médio Integrado', 'Educação Subsequente']
+    # Transformar os dados em formato longo para barras empilhadas
+    df_long = df_cursos_modalidade.melt(
+        id_vars=['Estado'],
+        value_vars=['Ensino Médio Integrado', 'Educação Subsequente'],
+        var_name='Modalidade',
+        value_name='Número de Cursos'
+    )
+
+    # Criar o gráfico de barras empilhadas
+    fig = px.bar(
+        df_long,
+        x='Estado',
+        y='Número de Cursos',
+        color='Modalidade',
+        title="Número de Cursos Técnicos por Modalidade e Estado",
+        text='Número de Cursos',
+        color_discrete_sequence=['#00FA9A', '#00BFFF']
+    )
+    # Ajustar layout e rótulos
+    fig.update_traces(texttemplate='%{text}', textposition='inside')
+    fig.update_layout(
+        xaxis_title="Estado",
+        yaxis_title="Número de Cursos",
+        barmode='stack'  # Empilhamento das barras
+    )
+    return fig
+
+
+#Select - Matrículas por Dependência Administrativa
+@grafico('matriculas_dependencia', 'Matrículas por Dependência Administrativa', ['TP_DEPENDENCIA'], ['QT_MAT_CURSO_TEC'])
+def grafico_matriculas_dependencia(df_matriculas_dependencia):
+    # Mapear os códigos de dependência administrativa para nomes mais intuitivos
+    df_matriculas_dependencia['Dependência'] = df_matriculas_dependencia['TP_DEPENDENCIA'].map(NOMES_DEPENDENCIA)
+
+    # Renomear as colunas
+    df_matriculas_dependencia.columns = ['Código', 'Número de Matrículas', 'Dependência']
+    # Paleta de cores personalizada
+    cores_personalizadas = ['#1f77b4', '#ff7f0e','#d62728','#2ca02c']  # Azul, Laranja, Vermelho e Verde
+
+    # Criar o gráfico de barras
+    fig = px.bar(
+        df_matriculas_dependencia,
+        x='Dependência',
+        y='Número de Matrículas',
+        title="Número de Matrículas por Dependência Administrativa",
+        text='Número de Matrículas',  # Exibe o número de matrículas nos rótulos
+        color='Dependência',  # Adiciona cores distintas
+        color_discrete_sequence=cores_personalizadas  # Aplicar paleta de cores
+    )
+
+    # Ajustar a posição dos rótulos e layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(
+        xaxis_title="Dependência Administrativa",
+        yaxis_title="Número de Matrículas",
+        uniformtext_minsize=8,
+        uniformtext_mode='hide'
+    )
+    return fig
+
+
+#Select - Evolução de Matrículas ao Longo dos Anos
+@grafico('evolucao_matriculas', 'Evolução de Matrículas ao Longo dos Anos', ['NU_ANO_CENSO'], ['QT_MAT_CURSO_TEC'], limite=0)
+def grafico_evolucao_matriculas(df_evolucao):
+    df_evolucao.columns = ['Ano', 'Número de Matrículas']
+    fig = px.line(
+        df_evolucao,
+        x='Ano',
+        y='Número de Matrículas',
+        title="Evolução de Matrículas ao Longo dos Anos",
+        markers=True  # Adiciona marcadores nos pontos
+    )
+    # Adicionar rótulos nos pontos
+    fig.update_traces(text='Número de Matrículas', textposition='top center')
+    fig.update_layout(
+        xaxis_title="Ano",
+        yaxis_title="Número de Matrículas",
+        hovermode='x unified'
+    )
+    return fig
+
+
+#Select - Cursos com Maior Número de Matrículas por Região (5 maiores por região)
+@grafico('maior_cursos_regiao', 'Cursos com Maior Número de Matrículas por Região',
+         ['NO_REGIAO', 'NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'], top_n=5, grupo_top='NO_REGIAO')
+def grafico_maior_cursos_regiao(df_top_cursos):
+    df_top_cursos.columns = ['Região', 'Curso', 'Número de Matrículas']
+
+    fig = px.bar(
+        df_top_cursos,
+        x='Região',
+        y='Número de Matrículas',
+        color='Curso',
+        title="Cursos com Maior Número de Matrículas por Região",
+        text='Número de Matrículas'
+    )
+    # Ajustar layout para gráfico empilhado
+    fig.update_layout(
+        xaxis_title="Região",
+        yaxis_title="Número de Matrículas",
+        barmode='stack',  # Empilhamento das barras
+        legend_title="Curso"
+    )
+    return fig
+
+
+#Select - Cursos com Maior Número de Matrículas por Estado (3 maiores por estado)
+@grafico('maior_cursos_estado', 'Cursos com Maior Número de Matrículas por Estado',
+         ['SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'], top_n=3, grupo_top='SG_UF')
+def grafico_maior_cursos_estado(df_top_cursos):
+    df_top_cursos.columns = ['Estado', 'Curso', 'Número de Matrículas']
+
+    fig = px.bar(
+        df_top_cursos,
+        x='Estado',
+        y='Número de Matrículas',
+        color='Curso',
+        title="Cursos com Maior Número de Matrículas por Estado",
+        text='Número de Matrículas',
+        color_discrete_sequence=PALETA_CURSOS_ESTADO
+    )
+    # Ajustar layout para gráfico empilhado
+    fig.update_layout(
+        xaxis_title="Estado",
+        yaxis_title="Número de Matrículas",
+        barmode='stack',  # Empilhamento das barras
+        legend_title="Curso"
+    )
+    return fig
+
+
+#Select - Cursos com Menor Número de Matrículas (10 menores)
+@grafico('menor_matriculas', 'Cursos com Menor Número de Matrículas',
+         ['NO_CURSO_EDUC_PROFISSIONAL'], ['QT_MAT_CURSO_TEC'], top_n=10, crescente=True)
+def grafico_menor_matriculas(df_menor_matriculas):
+    df_menor_matriculas.columns = ['Curso', 'Número de Matrículas']
+
+    # Criar uma nova coluna para as cores: top 3 com cor específica, restante com outra cor
+    df_menor_matriculas['Cor'] = categoria_por_posicao(len(df_menor_matriculas), 3, 'Top 3', 'Outros')
+
+    fig = px.bar(
+        df_menor_matriculas,
+        x='Número de Matrículas',
+        y='Curso',
+        orientation='h',  # Gráfico de barras horizontais
+        title="Top 10 Cursos com Menor Número de Matrículas",
+        text='Número de Matrículas',
+        color='Cor',
+        color_discrete_map={
+            'Top 3': '#FF7F50',  # Cor personalizada para os 3 primeiros
+            'Outros': '#d3d3d3'  # Cor cinza para os demais
+        },
+    )
+    # Adicionar rótulos com os valores e ajustar layout
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(
+        xaxis_title="Número de Matrículas",
+        yaxis_title="Curso",
+        yaxis=dict(autorange="reversed")  # Reverter ordem para exibir do menor para o maior
+    )
+    return fig
+
+
+def registrar_mapas():
+    """Registra os mapas por estado quando a malha das UFs está versionada
+    em base/geo/ (ver mapas.py); retorna se eles estão no registro.
+
+    Chamada na importação e de novo depois que mapas.garantir_geometrias
+    baixa as malhas (ver exportar.py).
+    """
+    if not geometria_disponivel('uf'):
+        return False
+    if 'mapa_alunos_estado' in GRAFICOS:
+        return True
+
+    @grafico('mapa_alunos_estado', 'Mapa de Alunos por Estado', ['SG_UF'], ['QT_MAT_CURSO_TEC'])
+    def grafico_mapa_alunos_estado(df_alunos_estado):
+        df_alunos_estado['CO_UF'] = df_alunos_estado['SG_UF'].map(CODIGOS_UF)
+        df_alunos_estado.columns = ['Estado', 'Número de Alunos', 'CO_UF']
+        return figura_mapa(df_alunos_estado, url_geometria('uf'), 'CO_UF', 'Número de Alunos',
+                           "Número de Alunos por Estado", nome='Estado')
+
+    @grafico('mapa_cursos_estado', 'Mapa de Cursos por Estado', ['SG_UF'], ['NO_ENTIDADE'])
+    def grafico_mapa_cursos_estado(df_cursos_estado):
+        df_cursos_estado['CO_UF'] = df_cursos_estado['SG_UF'].map(CODIGOS_UF)
+        df_cursos_estado.columns = ['Estado', 'Número de Cursos', 'CO_UF']
+        return figura_mapa(df_cursos_estado, url_geometria('uf'), 'CO_UF', 'Número de Cursos',
+                           "Número de Cursos por Estado", nome='Estado')
+
+    return True
+
+
+registrar_mapas()
+
+
+def dados_busca(valor, cubo):
+    """(tabela, título, eixo) do item escolhido na busca do filtro.
+
+    `valor` é 'curso:<nome>' (matrículas do curso por estado) ou
+    'escola:<CO_ENTIDADE>' (matrículas da escola por curso); None se não
+    for nenhum dos dois ou se o cruzamento ainda não estiver pronto.
+    """
+    tipo, _, chave = (valor or '').partition(':')
+    if tipo == 'curso':
+        df = cubo.agregar(('SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL'), ('QT_MAT_CURSO_TEC',))
+        df = df[(df['NO_CURSO_EDUC_PROFISSIONAL'] == chave).to_numpy()]
+        return df[['SG_UF', 'QT_MAT_CURSO_TEC']], f"Matrículas por Estado - {chave}", 'Estado'
+    if tipo == 'escola' and chave.isdigit():
+        cursos, escolas = cubo.cruzamento('cursos_escola', copia=False), cubo.cruzamento('escolas', copia=False)
+        if cursos is None or escolas is None:
+            return None
+        nome = escolas.loc[escolas['CO_ENTIDADE'] == int(chave), 'NO_ENTIDADE']
+        df = cursos[(cursos['CO_ENTIDADE'] == int(chave)).to_numpy()]
+        titulo = f"Matrículas por Curso - {nome.iloc[0] if len(nome) else chave}"
+        return df[['NO_CURSO_EDUC_PROFISSIONAL', 'QT_MAT_CURSO_TEC']], titulo, 'Curso'
+    return None
+
+
+def figura_busca(valor, cubo):
+    """Barras do curso ou da escola escolhido na busca; `{}` se desconhecido."""
+    with fase('agregar'):
+        dados = dados_busca(valor, cubo)
+    if dados is None:
+        return {}
+    df, titulo, eixo = dados
+    df = df.sort_values('QT_MAT_CURSO_TEC', ascending=False, kind='stable')
+    df.columns = [eixo, 'Número de Matrículas']
+    # Só as categorias do item escolhido, não todas as do cubo
+    df[eixo] = df[eixo].astype(str)
+    with fase('montar_figura'):
+        fig = px.bar(
+            df,
+            x=eixo,
+            y='Número de Matrículas',
+            title=titulo,
+            text='Número de Matrículas',
+            color_discrete_sequence=px.colors.qualitative.Set2
+        )
+        fig.update_traces(texttemplate='%{text}', textposition='outside')
+        fig.update_layout(xaxis_title=eixo, yaxis_title="Número de Matrículas")
+        return limitar_rotulos(fig)
+
+
+# Nome de cada nível do drill-down, na ordem de agregados.NIVEIS_HIERARQUIA
+NOMES_NIVEIS = ['Região', 'Estado', 'Município', 'Escola']
+
+
+def figura_drill(df_filhos, nivel, rotulos_caminho=(), limite=LIMITE_CATEGORIAS):
+    """Barras dos filhos de um nó do drill-down.
+
+    Cada barra leva a chave (e o rótulo, quando é outra coluna) em
+    customdata, lido no clique para descer um nível; o eixo usa a chave,
+    pois nomes de escola se repetem. Acima de `limite` filhos (municípios
+    de uma UF, escolas de uma capital) os menores viram uma barra
+    "Outros", que não desce de nível.
+    """
+    chave, rotulo, medida = df_filhos.columns[0], df_filhos.columns[-2], df_filhos.columns[-1]
+    if limite and len(df_filhos) > limite:
+        # Filhos já vêm ordenados pela medida (ver agregados.Hierarquia)
+        outros = {coluna: ROTULO_OUTROS for coluna in df_filhos.columns}
+        outros[medida] = df_filhos[medida].iloc[limite - 1:].sum()
+        df_filhos = pd.concat([df_filhos.iloc[:limite - 1].astype({chave: object, rotulo: object}),
+                               pd.DataFrame([outros])], ignore_index=True)
+    df_filhos['Código'] = df_filhos[chave].astype(str)
+    titulo = f"Matrículas por {NOMES_NIVEIS[nivel]}"
+    if rotulos_caminho:
+        titulo += f" - {' > '.join(rotulos_caminho)}"
+
+    fig = px.bar(
+        df_filhos,
+        x='Código',
+        y=medida,
+        title=titulo,
+        text=medida,
+        hover_name=rotulo,
+        custom_data=[chave, rotulo] if rotulo != chave else [chave],
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_xaxes(type='category', tickmode='array', tickvals=df_filhos['Código'], ticktext=df_filhos[rotulo])
+    fig.update_layout(xaxis_title=NOMES_NIVEIS[nivel], yaxis_title="Número de Matrículas")
+    return limitar_rotulos(fig)
@@ -0,0 +1,145 @@
+import os
+import time
+
+import pandas as pd
+
+from carregador import COLUNAS_USADAS, ESQUEMA, FORMATO_SNAPSHOT, gerar_snapshot, gravar_snapshot, impressao_digital, ler_csv, ler_snapshot
+
+# Correções do INEP mexem em poucas linhas da base. Com DISC_TAC_INCREMENTAL=1
+# a recarga (ver atualizacao.py) compara o CSV novo com as linhas da versão
+# carregada pela chave abaixo e aplica só as linhas que mudaram ao cubo, às
+# agregações e aos cruzamentos, em vez de refazer todos os agrupamentos
+ATIVO = os.environ.get("DISC_TAC_INCREMENTAL") == "1"
+
+# Uma linha da base por escola e curso
+CHAVE = ['CO_ENTIDADE', 'CO_CURSO_EDUC_PROFISSIONAL']
+
+# Versões das linhas mantidas em disco: a atual e a anterior, para que os
+# workers que ainda não recarregaram também encontrem a sua
+VERSOES_GUARDADAS = 2
+
+# Acima desta fração de linhas alteradas a recarga completa sai mais barata
+LIMITE_ALTERADAS = 0.2
+
+
+def diretorio_linhas(caminho_csv):
+    return f"{os.path.splitext(caminho_csv)[0]}.linhas"
+
+
+def caminho_linhas(caminho_csv, impressao):
+    return os.path.join(diretorio_linhas(caminho_csv), f"{impressao}.{FORMATO_SNAPSHOT}")
+
+
+def ler_linhas(caminho_csv):
+    """Todas as colunas do CSV (as dos cruzamentos também), com os tipos do ESQUEMA."""
+    return ler_csv(caminho_csv, list(ESQUEMA))
+
+
+def guardar_linhas(linhas, caminho_csv, impressao):
+    """Grava as linhas da versão `impressao`, apagando as mais antigas."""
+    diretorio = diretorio_linhas(caminho_csv)
+    os.makedirs(diretorio, exist_ok=True)
+    gravar_snapshot(linhas, caminho_linhas(caminho_csv, impressao))
+    versoes = sorted((entrada for entrada in os.scandir(diretorio) if entrada.name.endswith(f".{FORMATO_SNAPSHOT}")),
+                     key=lambda entrada: entrada.stat().st_mtime_ns, reverse=True)
+    for entrada in versoes[VERSOES_GUARDADAS:]:
+        try:
+            os.remove(entrada.path)
+        except OSError:
+            pass
+
+
+def preparar(caminho_csv, impressao):
+    """Guarda as linhas da versão carregada, base do diff da próxima mudança."""
+    if os.path.exists(caminho_linhas(caminho_csv, impressao)):
+        return
+    linhas = ler_linhas(caminho_csv)
+    # O CSV pode ter mudado depois de calculada a impressão
+    if impressao_digital(caminho_csv) == impressao:
+        guardar_linhas(linhas, caminho_csv, impressao)
+
+
+def _numerar(linhas):
+    # Linhas repetidas com a mesma chave são casadas pela ordem em que aparecem
+    return linhas.assign(_ocorrencia=linhas.groupby(CHAVE, sort=False).cumcount())
+
+
+def diferencas(antigas, novas):
+    """(removidas, adicionadas): linhas que só existem na versão antiga ou
+    só na nova. Uma linha alterada aparece nas duas, com os valores antigos
+    numa e os novos na outra."""
+    colunas = list(novas.columns)
+    juntas = pd.concat([_numerar(antigas).assign(_nova=False), _numerar(novas).assign(_nova=True)],
+                       ignore_index=True)
+    unicas = juntas[~juntas.duplicated(subset=colunas + ['_ocorrencia'], keep=False)]
+    # Cada lado com as categorias da sua versão: o nome de uma escola que
+    # saiu da base não existe nas categorias da nova
+    removidas = unicas.loc[~unicas['_nova'], colunas].astype(_tipos(antigas))
+    adicionadas = unicas.loc[unicas['_nova'], colunas].astype(_tipos(novas))
+    return removidas.reset_index(drop=True), adicionadas.reset_index(drop=True)
+
+
+def _tipos(linhas):
+    return {coluna: linhas[coluna].dtype if isinstance(linhas[coluna].dtype, pd.CategoricalDtype) else ESQUEMA[coluna]
+            for coluna in linhas.columns}
+
+
+def ufs_alteradas(removidas, adicionadas):
+    return set(removidas['SG_UF'].dropna()) | set(adicionadas['SG_UF'].dropna())
+
+
+def aplicar(caminho_csv, cubo, impressao_anterior, impressao, relatorio=print):
+    """Cubo da versão `impressao` do CSV a partir do `cubo` da anterior.
+
+    Retorna (cubo novo, linhas novas, UFs alteradas), ou None quando a
+    recarga precisa ser completa: linhas da versão anterior não guardadas,
+    colunas diferentes ou alterações demais. O snapshot da base, os
+    cruzamentos em disco e as linhas guardadas passam à versão nova.
+    """
+    from precomputo import ajustar_cruzamentos
+
+    inicio = time.perf_counter()
+    try:
+        antigas = ler_snapshot(caminho_linhas(caminho_csv, impressao_anterior))
+    except (OSError, ValueError):
+        return None
+    novas = ler_linhas(caminho_csv)
+    if list(antigas.columns) != list(novas.columns):
+        return None
+    removidas, adicionadas = diferencas(antigas, novas)
+    if max(len(removidas), len(adicionadas)) > LIMITE_ALTERADAS * max(len(novas), 1):
+        return None
+
+    novo = cubo.com_delta(adicionadas, removidas, novas)
+    ajustar_cruzamentos(novo, adicionadas, removidas, novas, caminho_csv, impressao)
+    gerar_snapshot(caminho_csv, novas[COLUNAS_USADAS])
+    guardar_linhas(novas, caminho_csv, impressao)
+    ufs = ufs_alteradas(removidas, adicionadas)
+    if relatorio:
+        relatorio(f"Delta aplicado em {time.perf_counter() - inicio:.2f}s: {len(removidas)} linhas saíram, "
+                  f"{len(adicionadas)} entraram (UFs: {', '.join(sorted(ufs)) or 'nenhuma'})")
+    return novo, novas, ufs
+
+
+def mesmos_dados(antes, depois):
+    """Se as duas tabelas têm as mesmas linhas, na mesma ordem."""
+    if antes is None or depois is None:
+        return antes is depois
+    if list(antes.columns) != list(depois.columns) or len(antes) != len(depois):
+        return False
+    return antes.reset_index(drop=True).astype(object).equals(depois.reset_index(drop=True).astype(object))
+
+
+def figura_inalterada(parametros, cubo_anterior, cubo, ufs):
+    """Se a figura de (tipo, ufs do filtro) usa os mesmos dados nas duas
+    versões do cubo; `ufs` são as UFs com linhas alteradas."""
+    from graficos import GRAFICOS, dados_grafico
+
+    tipo_grafico, filtro_ufs = parametros
+    if tipo_grafico not in GRAFICOS:
+        return False
+    # Gráfico filtrado por UFs que não mudaram: mesmas linhas do cubo
+    if filtro_ufs and not set(filtro_ufs) & ufs:
+        return True
+    return mesmos_dados(dados_grafico(tipo_grafico, cubo_anterior, ufs=filtro_ufs),
+                       dados_grafico(tipo_grafico, cubo, ufs=filtro_ufs))
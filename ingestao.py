@@ -0,0 +1,135 @@
+import json
+import os
+import re
+
+import pandas as pd
+
+from carregador import FORMATO_SNAPSHOT, gravar_snapshot, impressao_digital, ler_csv, ler_snapshot
+
+# Arquivos anuais aceitos pela ingestão
+PADRAO_ARQUIVO = re.compile(r'^suplemento_cursos_tecnicos_(\d{4})\.csv$')
+
+# Dimensões e medidas do resumo anual usado pelos gráficos de série histórica
+DIMENSOES_SERIE = ['NU_ANO_CENSO', 'NO_REGIAO']
+MEDIDAS_SERIE = {
+    'NO_ENTIDADE': ('NO_ENTIDADE', 'count'),
+    'QT_MAT_CURSO_TEC': ('QT_MAT_CURSO_TEC', 'sum'),
+}
+
+
+def diretorio_particoes(diretorio_base):
+    return os.path.join(diretorio_base, 'particoes')
+
+
+def caminho_particao(diretorio_base, ano, nome):
+    return os.path.join(diretorio_particoes(diretorio_base), f"ano={ano}", f"{nome}.{FORMATO_SNAPSHOT}")
+
+
+def _caminho_manifesto(diretorio_base):
+    return os.path.join(diretorio_particoes(diretorio_base), 'manifesto.json')
+
+
+def ler_manifesto(diretorio_base):
+    try:
+        with open(_caminho_manifesto(diretorio_base)) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_manifesto(diretorio_base, manifesto):
+    caminho = _caminho_manifesto(diretorio_base)
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, 'w') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def arquivos_anuais(diretorio_base):
+    """Retorna {ano: caminho} dos CSVs anuais encontrados em `diretorio_base`."""
+    arquivos = {}
+    for nome in sorted(os.listdir(diretorio_base)):
+        encontrado = PADRAO_ARQUIVO.match(nome)
+        if encontrado:
+            arquivos[encontrado.group(1)] = os.path.join(diretorio_base, nome)
+    return arquivos
+
+
+def resumir_ano(dados):
+    """Resumo anual por região usado pelas séries históricas."""
+    return dados.groupby(DIMENSOES_SERIE, observed=True).agg(**MEDIDAS_SERIE).reset_index()
+
+
+def ingerir_ano(diretorio_base, ano, caminho_csv):
+    """Grava as partições de um ano: linhas tipadas e resumo anual."""
+    dados = ler_csv(caminho_csv)
+    os.makedirs(os.path.dirname(caminho_particao(diretorio_base, ano, 'dados')), exist_ok=True)
+    gravar_snapshot(dados, caminho_particao(diretorio_base, ano, 'dados'))
+    gravar_snapshot(resumir_ano(dados), caminho_particao(diretorio_base, ano, 'serie'))
+
+
+def ingerir(diretorio_base):
+    """Ingere os CSVs anuais novos ou alterados e retorna os anos processados.
+
+    Anos cujo arquivo não mudou (mesmo mtime/tamanho ou mesmo hash) não são
+    relidos.
+    """
+    os.makedirs(diretorio_particoes(diretorio_base), exist_ok=True)
+    manifesto = ler_manifesto(diretorio_base)
+    processados = []
+    for ano, caminho_csv in arquivos_anuais(diretorio_base).items():
+        estado = os.stat(caminho_csv)
+        registro = manifesto.get(ano)
+        if registro and (registro['mtime_ns'], registro['tamanho']) == (estado.st_mtime_ns, estado.st_size):
+            continue
+        impressao = impressao_digital(caminho_csv)
+        if not registro or registro['sha1'] != impressao or registro.get('formato') != FORMATO_SNAPSHOT:
+            ingerir_ano(diretorio_base, ano, caminho_csv)
+            processados.append(ano)
+        manifesto[ano] = {
+            'arquivo': os.path.basename(caminho_csv),
+            'mtime_ns': estado.st_mtime_ns,
+            'tamanho': estado.st_size,
+            'sha1': impressao,
+            'formato': FORMATO_SNAPSHOT,
+        }
+        # Manifesto gravado a cada ano para não perder o progresso
+        _gravar_manifesto(diretorio_base, manifesto)
+    return processados
+
+
+def anos_disponiveis(diretorio_base):
+    return sorted(ler_manifesto(diretorio_base))
+
+
+def carregar_ano(diretorio_base, ano):
+    """Linhas tipadas de um único ano."""
+    return ler_snapshot(caminho_particao(diretorio_base, ano, 'dados'))
+
+
+def carregar_serie(diretorio_base, anos=None):
+    """Resumos anuais dos `anos` pedidos (todos por padrão).
+
+    Retorna None quando nenhum ano foi ingerido.
+    """
+    anos = anos_disponiveis(diretorio_base) if anos is None else [str(ano) for ano in anos]
+    resumos = []
+    for ano in anos:
+        caminho = caminho_particao(diretorio_base, ano, 'serie')
+        if os.path.exists(caminho):
+            resumos.append(ler_snapshot(caminho))
+    if not resumos:
+        return None
+    return pd.concat(resumos, ignore_index=True)
+
+
+# Ingere os CSVs anuais da pasta base (somente arquivos novos ou alterados)
+if __name__ == "__main__":
+    import sys
+    import time
+
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else "base"
+    inicio = time.perf_counter()
+    anos = ingerir(diretorio)
+    print(f"Anos processados: {', '.join(anos) or 'nenhum'} ({time.perf_counter() - inicio:.2f}s)")
+    print(f"Anos disponíveis: {', '.join(anos_disponiveis(diretorio))}")
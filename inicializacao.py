@@ -0,0 +1,86 @@
+import threading
+import time
+import traceback
+
+# Subida rápida dos apps: o servidor responde /health logo que é criado e a
+# base é carregada em segundo plano; /ready só fica 200 com os dados prontos
+
+
+class Carregamento:
+    """Executa `carregar()` uma única vez, em segundo plano ou não.
+
+    `pronto` é sinalizado quando a carga termina. Em segundo plano, uma
+    falha (base ausente ou copiada pela metade, por exemplo) fica em `erro`
+    e a carga é tentada de novo, com espera dobrando de `espera_inicial` até
+    `espera_maxima` segundos, até dar certo. Sem segundo plano o erro é
+    levantado na hora.
+    """
+
+    def __init__(self, carregar, espera_inicial=1.0, espera_maxima=60.0):
+        self._carregar = carregar
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._iniciado = False
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self.pronto = threading.Event()
+        self.erro = None
+        self.segundos = None
+        self.tentativas = 0
+
+    def iniciar(self, segundo_plano=True):
+        with self._trava:
+            if self._iniciado:
+                return
+            self._iniciado = True
+        if segundo_plano:
+            threading.Thread(target=self._executar_ate_conseguir, name='carregamento', daemon=True).start()
+        elif not self._executar():
+            raise self.erro
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        self.tentativas += 1
+        try:
+            self._carregar()
+        except Exception as erro:
+            self.erro = erro
+            traceback.print_exc()
+            return False
+        self.erro = None
+        self.segundos = time.perf_counter() - inicio
+        self.pronto.set()
+        return True
+
+    def _executar_ate_conseguir(self):
+        espera = self.espera_inicial
+        while not self._executar():
+            if self._parar.wait(espera):
+                return
+            espera = min(espera * 2, self.espera_maxima)
+
+    def parar(self):
+        self._parar.set()
+
+    def situacao(self):
+        return {
+            'pronto': self.pronto.is_set(),
+            'segundos': self.segundos,
+            'tentativas': self.tentativas,
+            'erro': None if self.erro is None else repr(self.erro),
+        }
+
+
+def registrar_saude(server, carregamento):
+    """/health (processo no ar) e /ready (dados carregados) no servidor Flask."""
+    from flask import jsonify
+
+    def saude():
+        return jsonify({'ok': True})
+
+    def prontidao():
+        situacao = carregamento.situacao()
+        return jsonify(situacao), 200 if situacao['pronto'] else 503
+
+    server.add_url_rule('/health', 'saude', saude)
+    server.add_url_rule('/ready', 'prontidao', prontidao)
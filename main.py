@@ -1,480 +1,307 @@
-from dash import Dash, dcc, html, Input, Output
+import os
+
+from dash import ClientsideFunction, Dash, dcc, html, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
 
-# Inicializar o app com Bootstrap para estilo
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+from atualizacao import Atualizador, arquivos_versao
+from compressao import registrar_compressao
+from consulta import registrar_consulta
+from inicializacao import Carregamento, registrar_saude
+from metricas import registrar_endpoint, requisicao
 
-# Carregar a base real
+# Base real
 caminho_base = "base/suplemento_cursos_tecnicos_2023.csv"
-dados = pd.read_csv(caminho_base, sep=";", encoding="latin1")
-
-# Layout do app
-app.layout = dbc.Container([
-    dbc.Row(
-        dbc.Col(
-            html.H1("Suplemento Cursos Técnicos 2023", className="text-center mb-4"),
-            width=12
-        )
-    ),
-    dbc.Row(
-        [
-            dbc.Col(
-                dbc.Button("Acesso a base", 
-                        href="https://github.com/Adjailson/disc_tac/blob/main/base/suplemento_cursos_tecnicos_2023.csv", 
-                        target="_blank",
-                        color="success", size="sm", className="mb-6 me-2"),
-                width="auto"
-            ),
 
-            dbc.Col(
-                dbc.Button("Mais informações", 
-                        href="https://github.com/Adjailson/disc_tac/blob/main/base/RelatorioAdjailsonDisc-TAC.pdf",
-                        target="_blank",
-                        color="primary", size="sm", className="mb-6"),
-                width="auto"
-            )
-        ],
-        justify="center",
-        className="mb-4"
-    ),
-
-    dbc.Row(
-        dbc.Col(
-            dcc.Dropdown(
-                id='dropdown-grafico',
-                options=[
-                    {'label': 'Número de Escolas por Região', 'value': 'regiao'},
-                    {'label': 'Número de Escolas por Zona (Urbana/Rural)', 'value': 'zona'},
-                    {'label': 'Número por Dependência Administrativa', 'value': 'dependencia'},
-                    {'label': 'Análise por Ano e Região', 'value': 'ano_regiao'},
-                    {'label': 'Número de Cursos por Estado', 'value': 'cursos_estado'},
-                    {'label': 'Matrículas por Curso (Top 10)', 'value': 'matriculas_curso'},
-                    {'label': 'Número de Alunos por Estado', 'value': 'alunos_estado'},
-                    {'label': 'Número de Alunos por Curso', 'value': 'alunos_curso'},
-                    {'label': 'Número de Cursos Técnicos por Modalidade', 'value': 'cursos_modalidade'},
-                    {'label': 'Matrículas por Dependência Administrativa', 'value': 'matriculas_dependencia'},
-                    {'label': 'Evolução de Matrículas ao Longo dos Anos', 'value': 'evolucao_matriculas'},
-                    {'label': 'Cursos com Maior Número de Matrículas por Região', 'value': 'maior_cursos_regiao'},
-                    {'label': 'Cursos com Maior Número de Matrículas por Estado', 'value': 'maior_cursos_estado'},
-                    {'label': 'Cursos com Menor Número de Matrículas', 'value': 'menor_matriculas'},
-
-
-                ],
-                value='barras',
-                placeholder='Escolha o tipo de gráfico',
-                multi=False
-            ),
-            width=12,
-            className="mb-4"
-        )
-    ),
+# Com DISC_TAC_CLIENTSIDE=1 a troca de gráfico roda no navegador, a partir
+# de um payload com os gráficos enviado no carregamento da página
+modo_clientside = os.environ.get("DISC_TAC_CLIENTSIDE") == "1"
+
+# Intervalo (s) entre as verificações de mudança na base; 0 desliga a recarga
+intervalo_atualizacao = float(os.environ.get("DISC_TAC_ATUALIZACAO_S", "30"))
+
+# Versão da base em uso (ver montar_estado): trocada por inteiro a cada
+# recarga, então um callback que já leu `estado` segue com a versão antiga
+estado = None
+
+
+def arquivos_base():
+    """Arquivos cuja mudança gera uma nova versão do app: o CSV e o
+    manifesto das partições anuais (ver atualizacao.arquivos_versao)."""
+    return arquivos_versao(caminho_base)
+
+
+def montar_estado():
+    """Lê a base e monta o cubo, o cache de figuras e as opções do dropdown.
+
+    pandas e plotly.express só são importados aqui, fora do caminho de
+    subida do servidor.
+    """
+    from types import SimpleNamespace
+
+    from agregados import CuboAgregado
+    from atualizacao import versao_arquivos
+    from cache_figuras import CacheFiguras
+    from carregador import carregar_dados, ler_em_blocos
+    from clientside import payload_main
+    from compartilhado import carregar_compartilhado
+    from graficos import opcoes
+    from ingestao import carregar_serie
+    from precomputo import iniciar_em_segundo_plano
+
+    # Versão lida antes dos arquivos: se mudarem durante a carga, a próxima
+    # verificação do atualizador recarrega de novo
+    versao = versao_arquivos(arquivos_base())
+    serie = carregar_serie(os.path.dirname(caminho_base))
+
+    # Agregados pré-calculados compartilhados por todos os gráficos; as séries
+    # históricas vêm das partições anuais geradas por `python ingestao.py`.
+    # Com DISC_TAC_STREAMING=1 a base é lida em blocos (limite de memória em
+    # DISC_TAC_LIMITE_MB) e só o cubo fica em memória. Com DISC_TAC_COMPARTILHADO=1
+    # a base é mapeada de arquivos compartilhados pelos workers (compartilhado.py).
+    if os.environ.get("DISC_TAC_STREAMING") == "1":
+        dados = None
+        limite_mb = float(os.environ.get("DISC_TAC_LIMITE_MB", "64"))
+        cubo = CuboAgregado.de_blocos(ler_em_blocos(caminho_base, limite_memoria_mb=limite_mb), serie=serie)
+    elif os.environ.get("DISC_TAC_COMPARTILHADO") == "1":
+        dados = carregar_compartilhado(caminho_base)
+        cubo = CuboAgregado(dados, serie=serie)
+    else:
+        dados = carregar_dados(caminho_base)
+        cubo = CuboAgregado(dados, serie=serie)
+
+    # Com DISC_TAC_PRECOMPUTO=1 os cruzamentos pesados (precomputo.py) são
+    # calculados em processos separados e ficam disponíveis em
+    # `cubo.cruzamento(nome)` conforme terminam; a API de consulta
+    # (DISC_TAC_CONSULTA=1) também responde a partir deles
+    if precomputo_ativo():
+        iniciar_em_segundo_plano(cubo, caminho_base)
+
+    # Linhas desta versão, base do diff da próxima recarga incremental
+    if incremental_ativo():
+        from incremental import preparar
+        preparar(caminho_base, versao[0])
+
+    return SimpleNamespace(
+        versao=versao,
+        impressao=versao[0],
+        serie=serie,
+        dados=dados,
+        cubo=cubo,
+        # Cache das figuras desta versão: descartado junto com ela na troca
+        cache_figuras=CacheFiguras(caminho_base),
+        payload=payload_main(cubo) if modo_clientside else None,
+        # Gráficos disponíveis no dropdown, na ordem do registro
+        opcoes_grafico=opcoes(),
+    )
 
-    dbc.Row(
-        dbc.Col(
-            dcc.Graph(id='grafico-escolas'),
-            width=12
-        )
-    ),
-    dbc.Row(
-        dbc.Col(
-            html.P("© 2023 Suplemento Cursos Técnicos", className="text-center"),
-            width=12,
-            className="mt-4"
-        )
+
+def precomputo_ativo():
+    return os.environ.get("DISC_TAC_PRECOMPUTO") == "1" or os.environ.get("DISC_TAC_CONSULTA") == "1"
+
+
+def incremental_ativo():
+    """Recarga incremental (ver incremental.py) com a base inteira em
+    memória: no streaming e na base compartilhada a recarga é completa."""
+    from incremental import ATIVO
+
+    return (ATIVO and os.environ.get("DISC_TAC_STREAMING") != "1"
+            and os.environ.get("DISC_TAC_COMPARTILHADO") != "1")
+
+
+def montar_estado_incremental(anterior):
+    """Nova versão a partir de `anterior` aplicando só as linhas do CSV que
+    mudaram; None quando a recarga precisa ser completa.
+
+    As figuras cujos dados não mudaram passam para o cache novo.
+    """
+    from types import SimpleNamespace
+
+    from atualizacao import versao_arquivos
+    from cache_figuras import CacheFiguras
+    from carregador import COLUNAS_USADAS
+    from clientside import payload_main
+    from incremental import aplicar, figura_inalterada
+    from precomputo import CRUZAMENTOS, iniciar_em_segundo_plano
+
+    versao = versao_arquivos(arquivos_base())
+    # Partições novas mudam a série histórica: só a recarga completa refaz
+    if versao[1:] != anterior.versao[1:]:
+        return None
+    resultado = aplicar(caminho_base, anterior.cubo, anterior.impressao, versao[0])
+    if resultado is None:
+        return None
+    cubo, linhas, ufs = resultado
+
+    # Cruzamentos que ainda estavam em cálculo na versão anterior
+    pendentes = [nome for nome in CRUZAMENTOS if cubo.cruzamento(nome, copia=False) is None]
+    if pendentes and precomputo_ativo():
+        iniciar_em_segundo_plano(cubo, caminho_base, nomes=pendentes)
+
+    cache_figuras = CacheFiguras(caminho_base)
+    cache_figuras.herdar(anterior.cache_figuras, anterior.versao, versao,
+                         lambda parametros: figura_inalterada(parametros, anterior.cubo, cubo, ufs))
+    return SimpleNamespace(
+        versao=versao,
+        impressao=versao[0],
+        serie=anterior.serie,
+        dados=linhas[COLUNAS_USADAS],
+        cubo=cubo,
+        cache_figuras=cache_figuras,
+        payload=payload_main(cubo) if modo_clientside else None,
+        opcoes_grafico=anterior.opcoes_grafico,
     )
-], fluid=True)
 
-# Callback para os gráficos
-@app.callback(
-    Output('grafico-escolas', 'figure'),
-    Input('dropdown-grafico', 'value')
-)
-def atualizar_grafico(tipo_grafico):
-    
-    #Select - Número de Escolas por Região
-    if tipo_grafico == 'regiao':
-        df_regioes = dados.groupby('NO_REGIAO')['NO_ENTIDADE'].count().reset_index()
-        df_regioes.columns = ['Região', 'Número de Escolas']
-
-        
-        df_regioes['Porcentagem'] = (df_regioes['Número de Escolas'] / df_regioes['Número de Escolas'].sum()) * 100
-
-        # Criar o gráfico
-        fig = px.bar(
-            df_regioes, 
-            x='Região', 
-            y='Número de Escolas', 
-            title="Número de Escolas por Região",
-            text=df_regioes.apply(lambda row: f"{row['Número de Escolas']} ({row['Porcentagem']:.1f}%)", axis=1),  # Valores + Porcentagem
-            color='Região',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
 
-        # Ajustar posição e layout do texto
-        fig.update_traces(
-            textposition='outside'
-        )
-        fig.update_layout(
-            xaxis_title="Região",
-            yaxis_title="Número de Escolas",
-            uniformtext_minsize=8,
-            uniformtext_mode='hide'
-        )        
-
-    #Select - Número de Escolas por Zona (Urbana/Rural)
-    elif tipo_grafico == 'zona':
-        # Número de escolas por Zona
-        df_localizacao = dados.groupby('TP_LOCALIZACAO')['NO_ENTIDADE'].count().reset_index()
-        df_localizacao['Zona'] = df_localizacao['TP_LOCALIZACAO'].map({1: 'Urbana', 2: 'Rural'})
-        df_localizacao.columns = ['TP_LOCALIZACAO', 'Número de Escolas', 'Zona']
-
-        fig = px.pie(
-            df_localizacao, 
-            names='Zona', 
-            values='Número de Escolas', 
-            title="Distribuição de Escolas por Zona Urbana/Rural",
-            hole=0.4,  # Gráfico de pizza semi-donut
-            color='Zona',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        # Adicionar valores e porcentagens nos rótulos
-        fig.update_traces(
-            textinfo='label+percent+value',
-            texttemplate='%{label}: %{value} (%{percent})'
-        )
+def carregar():
+    global estado
+    novo = None
+    # Com DISC_TAC_INCREMENTAL=1 a recarga tenta primeiro aplicar só o que
+    # mudou na base
+    if estado is not None and incremental_ativo():
+        novo = montar_estado_incremental(estado)
+    # Atribuição única: as requisições veem a versão antiga ou a nova inteira
+    estado = novo or montar_estado()
 
-    #Número por Dependência Administrativa
-    elif tipo_grafico == 'dependencia':
-        #Comparação por Dependência Administrativa (Pública, privada , federal..)
-        df_dependencia = dados.groupby('TP_DEPENDENCIA')['NO_ENTIDADE'].count().reset_index()
-        df_dependencia['Dependência'] = df_dependencia['TP_DEPENDENCIA'].map({
-            1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'
-        })
-        df_dependencia.columns = ['TP_DEPENDENCIA', 'Número de Escolas', 'Dependência']
-        # Calcular a porcentagem
-        df_dependencia['Porcentagem'] = (df_dependencia['Número de Escolas'] / df_dependencia['Número de Escolas'].sum()) * 100
-
-        # Criar o gráfico
-        fig = px.bar(
-            df_dependencia,
-            x='Dependência',
-            y='Número de Escolas',
-            title="Comparação por Dependência Administrativa",
-            text=df_dependencia.apply(lambda row: f"{row['Número de Escolas']} ({row['Porcentagem']:.1f}%)", axis=1),
-            color='Dependência',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
 
+def __getattr__(nome):
+    # main.cubo, main.dados, main.cache_figuras... da versão em uso
+    if estado is not None and hasattr(estado, nome):
+        return getattr(estado, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
-    elif tipo_grafico == 'cursos_estado':
-        # Agrupar os dados para calcular o número de cursos por estado
-        df_cursos_estado = dados.groupby('NO_UF')['NO_ENTIDADE'].count().reset_index()
-        df_cursos_estado.columns = ['Estado', 'Número de Cursos']
 
-        fig = px.bar(
-            df_cursos_estado,
-            x='Estado',
-            y='Número de Cursos',
-            title="Número de Cursos por Estado",
-            text='Número de Cursos',
-            color='Estado',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        # Adicionar valores como rótulos e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(xaxis_title="Estado", yaxis_title="Número de Cursos")
+carregamento = Carregamento(carregar)
 
 
-    elif tipo_grafico == 'ano_regiao':
+def aviso_carregando():
+    if carregamento.pronto.is_set():
+        return None
+    return dbc.Alert("Carregando a base, recarregue a página em instantes.", color="info")
 
-        # Agrupar os dados por Ano e Região
-        df_ano_regiao = dados.groupby(['NU_ANO_CENSO', 'NO_REGIAO'])['NO_ENTIDADE'].count().reset_index()
-        df_ano_regiao.columns = ['Ano', 'Região', 'Número de Escolas']
 
-        fig = px.line(
-            df_ano_regiao,
-            x='Ano',
-            y='Número de Escolas',
-            color='Região',
-            title="Número de Escolas por Ano e Região",
-            markers=True
-        )
-        # Adicionar rótulos nos pontos
-        fig.update_traces(text='Número de Escolas', textposition='top center')
-        # Ajustar o layout para melhor visualização
-        fig.update_layout(hovermode='x unified')
-
-    elif tipo_grafico == 'cursos_estado':
-        # Agrupar os dados para calcular o número de cursos por estado
-        df_cursos_estado = dados.groupby('NO_UF')['NO_ENTIDADE'].count().reset_index()
-        df_cursos_estado.columns = ['Estado', 'Número de Cursos']
-
-        fig = px.bar(
-            df_cursos_estado,
-            x='Estado',
-            y='Número de Cursos',
-            title="Número de Cursos por Estado",
-            text='Número de Cursos',
-            color='Estado',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        # Adicionar valores como rótulos e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(xaxis_title="Estado", yaxis_title="Número de Cursos")
-
-    elif tipo_grafico == 'matriculas_curso':
-        # Agrupar os dados para calcular o número de matrículas por curso
-        df_matriculas_curso = dados.groupby('NO_CURSO_EDUC_PROFISSIONAL')['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_matriculas_curso.columns = ['Curso', 'Número de Matrículas']
-        df_matriculas_curso = df_matriculas_curso.sort_values(by='Número de Matrículas', ascending=False)
-
-        # Criar uma nova coluna para as cores: top 3 com cor específica, restante com outra cor
-        df_matriculas_curso['Cor'] = ['Top 3 - Cursos' if i < 3 else 'Outros' for i in range(len(df_matriculas_curso))]
-
-        fig = px.bar(
-            df_matriculas_curso.head(10),  # Mostrar os 10 cursos com mais matrículas
-            x='Número de Matrículas',
-            y='Curso',
-            orientation='h',  # Gráfico de barras horizontal
-            title="Top 10 Cursos por Matrículas",
-            text='Número de Matrículas',
-            color='Cor',
-            #color_discrete_sequence=px.colors.qualitative.Set2
-            color_discrete_map={
-                'Top 3 - Cursos': '#FF7F50',  # Cor personalizada para os 3 primeiros (Azul)
-                'Outros': '#d3d3d3'  # Cor cinza para os demais
-            },
-        )
-        # Adicionar rótulos com os valores e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(
-            yaxis_title="Curso",
-            xaxis_title="Número de Matrículas",
-            yaxis=dict(autorange="reversed")  # Reverter ordem para exibir do maior ao menor
-        )
+# Layout do app, montado a cada carregamento da página
+def layout():
+    atual = estado
+    return dbc.Container([
+        dbc.Row(
+            dbc.Col(
+                html.H1("Suplemento Cursos Técnicos 2023", className="text-center mb-4"),
+                width=12
+            )
+        ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Button("Acesso a base", 
+                            href="https://github.com/Adjailson/disc_tac/blob/main/base/suplemento_cursos_tecnicos_2023.csv", 
+                            target="_blank",
+                            color="success", size="sm", className="mb-6 me-2"),
+                    width="auto"
+                ),
+
+                dbc.Col(
+                    dbc.Button("Mais informações", 
+                            href="https://github.com/Adjailson/disc_tac/blob/main/base/RelatorioAdjailsonDisc-TAC.pdf",
+                            target="_blank",
+                            color="primary", size="sm", className="mb-6"),
+                    width="auto"
+                )
+            ],
+            justify="center",
+            className="mb-4"
+        ),
 
-    #Select  - Número de Alunos por Estado
-    elif tipo_grafico == 'alunos_estado':
-        # Agrupar os dados para calcular o número de alunos por estado
-        df_alunos_estado = dados.groupby('NO_UF')['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_alunos_estado.columns = ['Estado', 'Número de Alunos']
-
-        fig = px.bar(
-            df_alunos_estado,
-            x='Estado',
-            y='Número de Alunos',
-            title="Número de Alunos por Estado",
-            text='Número de Alunos',
-            color='Estado',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        # Adicionar rótulos com os valores e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(xaxis_title="Estado", yaxis_title="Número de Alunos")
-
-    #select - Número de Alunos por Curso
-    elif tipo_grafico == 'alunos_curso':
-        # Agrupar os dados para calcular o número de alunos por curso
-        df_alunos_curso = dados.groupby('NO_CURSO_EDUC_PROFISSIONAL')['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_alunos_curso.columns = ['Curso', 'Número de Alunos']
-        df_alunos_curso = df_alunos_curso.sort_values(by='Número de Alunos', ascending=False)
-
-        fig = px.bar(
-            df_alunos_curso.head(10),  # Mostrar os 10 cursos com mais alunos
-            x='Número de Alunos',
-            y='Curso',
-            orientation='h',  # Gráfico de barras horizontal
-            title="Top 10 Cursos por Número de Alunos",
-            text='Número de Alunos',
-            color='Curso',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        # Adicionar rótulos com os valores e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(
-            yaxis_title="Curso",
-            xaxis_title="Número de Alunos",
-            
-        )
+        aviso_carregando(),
 
-    #Select - Número de Cursos Técnicos por Modalidade
-    elif tipo_grafico == 'cursos_modalidade':
-        # Agrupar os dados por estado e modalidade
-        df_cursos_modalidade = dados.groupby('NO_UF').agg({
-            'QT_CURSO_TEC_CT': 'sum',
-            'QT_CURSO_TEC_SUBS': 'sum'
-        }).reset_index()
-        # Ajustar os nomes das colunas
-        df_cursos_modalidade.columns = ['Estado', 'Ensino Médio Integrado', 'Educação Subsequente']
-    # Transformar os dados em formato longo para barras empilhadas
-        df_long = df_cursos_modalidade.melt(
-            id_vars=['Estado'],
-            value_vars=['Ensino Médio Integrado', 'Educação Subsequente'],
-            var_name='Modalidade',
-            value_name='Número de Cursos'
-        )
-        
-        # Criar o gráfico de barras empilhadas
-        fig = px.bar(
-            df_long,
-            x='Estado',
-            y='Número de Cursos',
-            color='Modalidade',
-            title="Número de Cursos Técnicos por Modalidade e Estado",
-            text='Número de Cursos',
-            color_discrete_sequence=['#00FA9A', '#00BFFF']
-        )
-        # Ajustar layout e rótulos
-        fig.update_traces(texttemplate='%{text}', textposition='inside')
-        fig.update_layout(
-            xaxis_title="Estado",
-            yaxis_title="Número de Cursos",
-            barmode='stack'  # Empilhamento das barras,
-        )
+        dbc.Row(
+            dbc.Col(
+                dcc.Dropdown(
+                    id='dropdown-grafico',
+                    options=atual.opcoes_grafico if atual else [],
+                    value='barras',
+                    placeholder='Escolha o tipo de gráfico',
+                    multi=False
+                ),
+                width=12,
+                className="mb-4"
+            )
+        ),
 
-    elif tipo_grafico == 'matriculas_dependencia':
-        
-        # Agrupar os dados por dependência administrativa e somar o número de matrículas
-        df_matriculas_dependencia = dados.groupby('TP_DEPENDENCIA')['QT_MAT_CURSO_TEC'].sum().reset_index()
-
-        # Mapear os códigos de dependência administrativa para nomes mais intuitivos
-        df_matriculas_dependencia['Dependência'] = df_matriculas_dependencia['TP_DEPENDENCIA'].map({
-            1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'
-        })
-
-        # Renomear as colunas
-        df_matriculas_dependencia.columns = ['Código', 'Número de Matrículas', 'Dependência']
-        # Paleta de cores personalizada
-        cores_personalizadas = ['#1f77b4', '#ff7f0e','#d62728','#2ca02c']  # Azul, Laranja, Vermelho e Verde
-
-        # Criar o gráfico de barras
-        fig = px.bar(
-            df_matriculas_dependencia,
-            x='Dependência',
-            y='Número de Matrículas',
-            title="Número de Matrículas por Dependência Administrativa",
-            text='Número de Matrículas',  # Exibe o número de matrículas nos rótulos
-            color='Dependência',  # Adiciona cores distintas
-            color_discrete_sequence=cores_personalizadas  # Aplicar paleta de cores
+        dbc.Row(
+            dbc.Col(
+                dcc.Graph(id='grafico-escolas'),
+                width=12
+            )
+        ),
+        dcc.Store(id='payload-graficos', data=atual.payload if atual else None),
+        dbc.Row(
+            dbc.Col(
+                html.P("© 2023 Suplemento Cursos Técnicos", className="text-center"),
+                width=12,
+                className="mt-4"
+            )
         )
+    ], fluid=True)
 
-        # Ajustar a posição dos rótulos e layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(
-            xaxis_title="Dependência Administrativa",
-            yaxis_title="Número de Matrículas",
-            uniformtext_minsize=8,
-            uniformtext_mode='hide'
-        )
 
-    #Select - Evolução de Matrículas ao Longo dos Anos
-    elif tipo_grafico == 'evolucao_matriculas':
-        # Agrupar os dados por ano
-        df_evolucao = dados.groupby('NU_ANO_CENSO')['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_evolucao.columns = ['Ano', 'Número de Matrículas']
-        fig = px.line(
-            df_evolucao,
-            x='Ano',
-            y='Número de Matrículas',
-            title="Evolução de Matrículas ao Longo dos Anos",
-            markers=True  # Adiciona marcadores nos pontos
-        )
-        # Adicionar rótulos nos pontos
-        fig.update_traces(text='Número de Matrículas', textposition='top center')
-        fig.update_layout(
-            xaxis_title="Ano",
-            yaxis_title="Número de Matrículas",
-            hovermode='x unified'
+def atualizar_grafico(tipo_grafico):
+    if not carregamento.pronto.is_set():
+        raise PreventUpdate
+    atual = estado
+    with requisicao(tipo_grafico):
+        return atual.cache_figuras.obter(
+            (tipo_grafico, ()),
+            lambda: construir_grafico(tipo_grafico, atual),
+            versao=atual.versao
         )
 
-    #Select - Cursos com Menor Número de Matrículas
-    elif tipo_grafico == 'menor_matriculas':
-        # Agrupar os dados para calcular o número de matrículas por curso
-        df_menor_matriculas = dados.groupby('NO_CURSO_EDUC_PROFISSIONAL')['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_menor_matriculas.columns = ['Curso', 'Número de Matrículas']
-        # Ordenar pelo menor número de matrículas e pegar os 10 menores
-        df_menor_matriculas = df_menor_matriculas.sort_values(by='Número de Matrículas', ascending=True).head(10)
-
-        # Criar uma nova coluna para as cores: top 3 com cor específica, restante com outra cor
-        df_menor_matriculas['Cor'] = ['Top 3' if i < 3 else 'Outros' for i in range(len(df_menor_matriculas))]
-
-        fig = px.bar(
-            df_menor_matriculas,
-            x='Número de Matrículas',
-            y='Curso',
-            orientation='h',  # Gráfico de barras horizontais
-            title="Top 10 Cursos com Menor Número de Matrículas",
-            text='Número de Matrículas',
-            color='Cor',
-            #color_discrete_sequence=px.colors.qualitative.Set3
-            color_discrete_map={
-                'Top 3': '#FF7F50',  # Cor personalizada para os 3 primeiros (Azul)
-                'Outros': '#d3d3d3'  # Cor cinza para os demais
-            },
-        )
-        # Adicionar rótulos com os valores e ajustar layout
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(
-            xaxis_title="Número de Matrículas",
-            yaxis_title="Curso",
-            yaxis=dict(autorange="reversed")  # Reverter ordem para exibir do menor para o maior
-        )
 
-    #Select - Cursos com Maior Número de Matrículas por Região
-    elif tipo_grafico == 'maior_cursos_regiao':
-        df_cursos_regiao = dados.groupby(['NO_REGIAO', 'NO_CURSO_EDUC_PROFISSIONAL'])['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_cursos_regiao.columns = ['Região', 'Curso', 'Número de Matrículas']
-
-        df_top_cursos = df_cursos_regiao.sort_values(by=['Região', 'Número de Matrículas'], ascending=[True, False])
-        df_top_cursos = df_top_cursos.groupby('Região').head(5)  # Pega os 5 maiores por região
-
-        fig = px.bar(
-            df_top_cursos,
-            x='Região',
-            y='Número de Matrículas',
-            color='Curso',
-            title="Cursos com Maior Número de Matrículas por Região",
-            text='Número de Matrículas'
-        )
-        # Ajustar layout para gráfico empilhado
-        fig.update_layout(
-            xaxis_title="Região",
-            yaxis_title="Número de Matrículas",
-            barmode='stack',  # Empilhamento das barras
-            legend_title="Curso"
-        )
+def construir_grafico(tipo_grafico, atual=None):
+    from graficos import gerar_figura
 
-    #Select - Cursos com Maior Número de Matrículas por Estado
-    elif tipo_grafico == 'maior_cursos_estado':
-        df_cursos_estado = dados.groupby(['SG_UF', 'NO_CURSO_EDUC_PROFISSIONAL'])['QT_MAT_CURSO_TEC'].sum().reset_index()
-        df_cursos_estado.columns = ['Estado', 'Curso', 'Número de Matrículas']
-
-        df_top_cursos = df_cursos_estado.sort_values(by=['Estado', 'Número de Matrículas'], ascending=[True, False])
-        df_top_cursos = df_top_cursos.groupby('Estado').head(3)  # Pega os 3 maiores por região
-
-        fig = px.bar(
-            df_top_cursos,
-            x='Estado',
-            y='Número de Matrículas',
-            color='Curso',
-            title="Cursos com Maior Número de Matrículas por Estado",
-            text='Número de Matrículas',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        # Ajustar layout para gráfico empilhado
-        fig.update_layout(
-            xaxis_title="Estado",
-            yaxis_title="Número de Matrículas",
-            barmode='stack',  # Empilhamento das barras
-            legend_title="Curso"
-        )
+    return gerar_figura(tipo_grafico, (atual or estado).cubo)
+
+
+def create_app(segundo_plano=True):
+    """Cria o app Dash e inicia a carga da base.
 
+    Com `segundo_plano` o servidor já responde /health enquanto a base é
+    carregada; /ready retorna 503 até os dados ficarem prontos.
+    """
+    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    app.layout = layout
+
+    # Callback para os gráficos: no navegador (assets/clientside.js) ou no servidor
+    if modo_clientside:
+        app.clientside_callback(
+            ClientsideFunction(namespace='disc_tac', function_name='figura_main'),
+            Output('grafico-escolas', 'figure'),
+            Input('dropdown-grafico', 'value'),
+            State('payload-graficos', 'data')
+        )
     else:
-        fig = {}
-    return fig
+        app.callback(
+            Output('grafico-escolas', 'figure'),
+            Input('dropdown-grafico', 'value')
+        )(atualizar_grafico)
+
+    registrar_saude(app.server, carregamento)
+    # Respostas comprimidas (brotli/gzip); DISC_TAC_COMPRESSAO=0 desliga
+    registrar_compressao(app.server)
+    # /metrics (Prometheus) quando DISC_TAC_METRICAS=1
+    registrar_endpoint(app.server, lambda: estado and estado.cache_figuras)
+    # /api/consulta (JSON, CSV e Arrow) quando DISC_TAC_CONSULTA=1
+    registrar_consulta(app.server, lambda: estado)
+
+    carregamento.iniciar(segundo_plano)
+    # Recarga da base sem reiniciar: a nova versão é montada na thread do
+    # atualizador e trocada de uma vez (ver carregar)
+    if segundo_plano and intervalo_atualizacao > 0:
+        Atualizador(arquivos_base(), lambda: estado and estado.versao, carregar, intervalo_atualizacao).iniciar()
+    return app
+
 
 # Executar o servidor localhost
 if __name__ == "__main__":
-    app.run_server(debug=True)
+    create_app().run(debug=True)
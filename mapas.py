@@ -0,0 +1,337 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import plotly.express as px
+
+# Malhas simplificadas versionadas em base/geo/ (uf.geojson, municipio.geojson),
+# baixadas uma vez da API de malhas do IBGE com `python mapas.py baixar` (ou
+# pela exportação, ver garantir_geometrias); os apps não acessam a rede. Cada
+# feição é identificada pelo código IBGE, lido de `properties.codarea`
+# (malhas do IBGE), `properties.codigo` ou do `id`
+DIRETORIO_GEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base', 'geo')
+PROPRIEDADES_CODIGO = ('codarea', 'codigo', 'CD_UF', 'CD_MUN')
+
+# Malhas já simplificadas por zoom, gravadas em assets/geo/ e servidas pelo
+# Dash como arquivos estáticos: as figuras só levam a URL, e o navegador
+# baixa cada malha uma vez e a guarda em cache
+DIRETORIO_ASSETS_GEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'geo')
+URL_GEO = '/assets/geo/'
+
+# Malhas do país por UF e por município na API do IBGE (ver baixar)
+URL_IBGE = ('https://servicodados.ibge.gov.br/api/v3/malhas/paises/BR'
+            '?formato=application/vnd.geo%2Bjson&qualidade=minima&intrarregiao={nivel}')
+NIVEIS_IBGE = {'uf': 'UF', 'municipio': 'municipio'}
+
+# Com DISC_TAC_MAPAS=0 os mapas ficam desligados e as malhas não são exigidas
+ATIVO = os.environ.get("DISC_TAC_MAPAS", "1") != "0"
+
+# Tolerância de simplificação (graus) e casas decimais das coordenadas por
+# nível de zoom: o país inteiro aguenta traçado bem mais grosso que uma UF
+ZOOM = {
+    'brasil': {'tolerancia': 0.05, 'casas': 2},
+    'uf': {'tolerancia': 0.01, 'casas': 3},
+}
+
+# Códigos IBGE das UFs, para juntar os agregados por sigla às malhas
+CODIGOS_UF = {
+    'RO': 11, 'AC': 12, 'AM': 13, 'RR': 14, 'PA': 15, 'AP': 16, 'TO': 17,
+    'MA': 21, 'PI': 22, 'CE': 23, 'RN': 24, 'PB': 25, 'PE': 26, 'AL': 27, 'SE': 28, 'BA': 29,
+    'MG': 31, 'ES': 32, 'RJ': 33, 'SP': 35,
+    'PR': 41, 'SC': 42, 'RS': 43,
+    'MS': 50, 'MT': 51, 'GO': 52, 'DF': 53,
+}
+
+
+def caminho_geometria(nivel):
+    return os.path.join(DIRETORIO_GEO, f"{nivel}.geojson")
+
+
+def geometria_disponivel(nivel):
+    return ATIVO and os.path.exists(caminho_geometria(nivel))
+
+
+def simplificar_linha(pontos, tolerancia):
+    """Douglas-Peucker sobre um array (n, 2); mantém o primeiro e o último."""
+    if len(pontos) <= 4:
+        return pontos
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[[0, -1]] = True
+    pilha = [(0, len(pontos) - 1)]
+    while pilha:
+        inicio, fim = pilha.pop()
+        if fim - inicio < 2:
+            continue
+        a, b = pontos[inicio], pontos[fim]
+        meio = pontos[inicio + 1:fim]
+        direcao = b - a
+        comprimento = np.hypot(*direcao)
+        if comprimento == 0:
+            distancias = np.hypot(*(meio - a).T)
+        else:
+            distancias = np.abs(direcao[0] * (meio[:, 1] - a[1]) - direcao[1] * (meio[:, 0] - a[0])) / comprimento
+        maior = int(np.argmax(distancias))
+        if distancias[maior] > tolerancia:
+            indice = inicio + 1 + maior
+            manter[indice] = True
+            pilha.append((inicio, indice))
+            pilha.append((indice, fim))
+    return pontos[manter]
+
+
+def _simplificar_poligono(aneis, tolerancia, casas):
+    resultado = []
+    for anel in aneis:
+        pontos = simplificar_linha(np.asarray(anel, dtype='float64'), tolerancia)
+        # Um anel precisa de ao menos 4 pontos (o último repete o primeiro)
+        if len(pontos) < 4:
+            pontos = np.asarray(anel, dtype='float64')
+        resultado.append(np.round(pontos, casas).tolist())
+    return resultado
+
+
+def simplificar_feicao(feicao, tolerancia, casas):
+    geometria = feicao['geometry']
+    if geometria['type'] == 'Polygon':
+        coordenadas = _simplificar_poligono(geometria['coordinates'], tolerancia, casas)
+    elif geometria['type'] == 'MultiPolygon':
+        coordenadas = [_simplificar_poligono(poligono, tolerancia, casas) for poligono in geometria['coordinates']]
+    else:
+        coordenadas = geometria['coordinates']
+    return {
+        'type': 'Feature',
+        'id': feicao['id'],
+        'properties': {},
+        'geometry': {'type': geometria['type'], 'coordinates': coordenadas},
+    }
+
+
+def codigo_feicao(feicao):
+    propriedades = feicao.get('properties') or {}
+    for nome in PROPRIEDADES_CODIGO:
+        if propriedades.get(nome) is not None:
+            return str(int(propriedades[nome]))
+    return str(int(feicao['id']))
+
+
+@lru_cache(maxsize=None)
+def _ler_geometria(nivel):
+    with open(caminho_geometria(nivel), encoding='utf-8') as arquivo:
+        colecao = json.load(arquivo)
+    for feicao in colecao['features']:
+        feicao['id'] = codigo_feicao(feicao)
+    return colecao
+
+
+@lru_cache(maxsize=None)
+def geometria(nivel, zoom='brasil', uf=None):
+    """Malha do `nivel` simplificada para o `zoom`, lida e guardada uma vez.
+
+    Com `uf` (sigla), só as feições daquela UF: os códigos de município
+    começam pelo código da UF.
+    """
+    parametros = ZOOM[zoom]
+    feicoes = _ler_geometria(nivel)['features']
+    if uf is not None:
+        prefixo = str(CODIGOS_UF[uf])
+        feicoes = [feicao for feicao in feicoes if feicao['id'].startswith(prefixo)]
+    return {
+        'type': 'FeatureCollection',
+        'features': [simplificar_feicao(feicao, parametros['tolerancia'], parametros['casas']) for feicao in feicoes],
+    }
+
+
+def nome_asset(nivel, zoom='brasil', uf=None):
+    return '_'.join(parte for parte in (nivel, zoom, uf) if parte) + '.json'
+
+
+@lru_cache(maxsize=None)
+def url_geometria(nivel, zoom='brasil', uf=None):
+    """URL da malha de `geometria(nivel, zoom, uf)`, gravada em assets/geo/.
+
+    O arquivo só é regravado quando a malha de base/geo/ é mais nova que
+    ele; a URL leva o mtime da malha, para o navegador não usar uma cópia
+    antiga depois de uma malha nova.
+    """
+    origem = os.stat(caminho_geometria(nivel)).st_mtime_ns
+    nome = nome_asset(nivel, zoom, uf)
+    caminho = os.path.join(DIRETORIO_ASSETS_GEO, nome)
+    if not os.path.exists(caminho) or os.stat(caminho).st_mtime_ns < origem:
+        os.makedirs(DIRETORIO_ASSETS_GEO, exist_ok=True)
+        # Temporário por processo: vários workers podem gravar ao mesmo tempo
+        temporario = f"{caminho}.tmp{os.getpid()}"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(geometria(nivel, zoom, uf), arquivo, separators=(',', ':'))
+        os.replace(temporario, caminho)
+    return f"{URL_GEO}{nome}?v={origem}"
+
+
+def figura_mapa(df, geojson, coluna_codigo, medida, titulo, nome=None, grupo=None):
+    """Coroplético de `medida` com as linhas de `df` ligadas às feições pelo código.
+
+    `geojson` é a URL da malha (ver url_geometria) ou, com `grupo`, um dict
+    {valor de `grupo`: URL}: um traço por valor, cada um com a sua malha e
+    as suas linhas, todos na mesma escala de cores.
+    """
+    df = df.assign(codigo=df[coluna_codigo].astype('int64').astype(str))
+    malhas = {None: geojson} if grupo is None else geojson
+    fig = None
+    for valor, url in malhas.items():
+        parte = df if grupo is None else df[(df[grupo] == valor).to_numpy()]
+        mapa = px.choropleth(
+            parte,
+            geojson=url,
+            locations='codigo',
+            color=medida,
+            hover_name=nome,
+            title=titulo,
+            color_continuous_scale='Blues',
+        )
+        if fig is None:
+            fig = mapa
+        else:
+            fig.add_trace(mapa.data[0])
+    # Sem mapa-base: só as malhas locais, enquadradas nas feições desenhadas
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(margin={'r': 0, 'l': 0, 'b': 0})
+    return fig
+
+
+def figura_municipios(cruzamento, medida='QT_MAT_CURSO_TEC', uf=None, titulo="Matrículas por Município", ufs=()):
+    """Mapa por município a partir do cruzamento `modalidade_municipio`
+    (ver precomputo.py), do país inteiro, de uma UF ou das UFs em `ufs`.
+
+    Só as malhas das UFs escolhidas são referenciadas: com uma UF, a dela no
+    traçado mais fino; com várias, a de cada uma num traço próprio.
+    """
+    ufs = [sigla for sigla in ((uf,) if uf is not None else ufs) if sigla in CODIGOS_UF]
+    if ufs:
+        cruzamento = cruzamento[cruzamento['SG_UF'].isin(ufs).to_numpy()]
+    if len(ufs) == 1:
+        geojson, grupo = url_geometria('municipio', 'uf', ufs[0]), None
+    elif ufs:
+        geojson, grupo = {sigla: url_geometria('municipio', 'brasil', sigla) for sigla in ufs}, 'SG_UF'
+    else:
+        geojson, grupo = url_geometria('municipio'), None
+    return figura_mapa(cruzamento, geojson, 'CO_MUNICIPIO', medida, titulo, nome='NO_MUNICIPIO', grupo=grupo)
+
+
+def versionar(colecao, nivel, tolerancia=ZOOM['uf']['tolerancia'] / 2):
+    """Grava em base/geo/ a malha `colecao` simplificada, com o código IBGE
+    de cada feição no `id`; retorna o caminho gravado."""
+    feicoes = []
+    for feicao in colecao['features']:
+        feicao['id'] = codigo_feicao(feicao)
+        feicoes.append(simplificar_feicao(feicao, tolerancia, 4))
+    os.makedirs(DIRETORIO_GEO, exist_ok=True)
+    with open(caminho_geometria(nivel), 'w', encoding='utf-8') as arquivo:
+        json.dump({'type': 'FeatureCollection', 'features': feicoes}, arquivo, separators=(',', ':'))
+    return caminho_geometria(nivel)
+
+
+def de_topojson(topologia, objeto=None):
+    """FeatureCollection GeoJSON do `objeto` (o primeiro, sem nome) de uma
+    malha TopoJSON.
+
+    Os anéis são refeitos a partir dos arcos compartilhados: índice negativo
+    `~i` é o arco `i` invertido, e com `transform` as coordenadas vêm
+    quantizadas e codificadas por diferença.
+    """
+    transformacao = topologia.get('transform')
+    arcos = []
+    for arco in topologia['arcs']:
+        pontos = np.asarray([posicao[:2] for posicao in arco], dtype='float64').reshape(-1, 2)
+        if transformacao:
+            pontos = np.cumsum(pontos, axis=0) * transformacao['scale'] + transformacao['translate']
+        arcos.append(pontos.tolist())
+
+    def anel(indices):
+        pontos = []
+        for indice in indices:
+            arco = arcos[indice] if indice >= 0 else arcos[~indice][::-1]
+            # Cada arco começa no último ponto do anterior
+            pontos.extend(arco[1:] if pontos else arco)
+        return pontos
+
+    nome = objeto if objeto is not None else next(iter(topologia['objects']))
+    raiz = topologia['objects'][nome]
+    geometrias = raiz['geometries'] if raiz['type'] == 'GeometryCollection' else [raiz]
+    feicoes = []
+    for geometria in geometrias:
+        if geometria.get('type') == 'Polygon':
+            coordenadas = [anel(indices) for indices in geometria['arcs']]
+        elif geometria.get('type') == 'MultiPolygon':
+            coordenadas = [[anel(indices) for indices in poligono] for poligono in geometria['arcs']]
+        else:
+            # Malhas de UFs e municípios só têm polígonos; o resto é ignorado
+            continue
+        feicao = {'type': 'Feature', 'properties': geometria.get('properties') or {},
+                  'geometry': {'type': geometria['type'], 'coordinates': coordenadas}}
+        if 'id' in geometria:
+            feicao['id'] = geometria['id']
+        feicoes.append(feicao)
+    return {'type': 'FeatureCollection', 'features': feicoes}
+
+
+def ler_malha(caminho):
+    """Malha GeoJSON ou TopoJSON de `caminho`, como FeatureCollection GeoJSON."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        colecao = json.load(arquivo)
+    return de_topojson(colecao) if colecao.get('type') == 'Topology' else colecao
+
+
+def baixar(nivel):
+    """Malha do `nivel` (uf ou municipio) do país inteiro, da API do IBGE."""
+    from urllib.request import urlopen
+
+    with urlopen(URL_IBGE.format(nivel=NIVEIS_IBGE[nivel]), timeout=120) as resposta:
+        return json.load(resposta)
+
+
+def garantir_geometrias(niveis=tuple(NIVEIS_IBGE), relatorio=print):
+    """Baixa e versiona em base/geo/ as malhas de `niveis` que faltam.
+
+    Sem rede (ou com a API fora do ar) levanta RuntimeError em vez de seguir
+    sem os mapas; com DISC_TAC_MAPAS=0 não faz nada. Retorna os caminhos gravados.
+    """
+    if not ATIVO:
+        return []
+    gravados = []
+    for nivel in niveis:
+        if geometria_disponivel(nivel):
+            continue
+        try:
+            colecao = baixar(nivel)
+        except (OSError, ValueError) as erro:
+            raise RuntimeError(
+                f"Malha '{nivel}' ausente em {DIRETORIO_GEO} e o download do IBGE falhou ({erro}). "
+                "Rode `python mapas.py baixar` com acesso à rede e versione base/geo/, "
+                "ou use DISC_TAC_MAPAS=0 para seguir sem os mapas"
+            ) from erro
+        gravados.append(versionar(colecao, nivel))
+        if relatorio:
+            relatorio(f"{gravados[-1]}: {len(colecao['features'])} feições baixadas do IBGE")
+    return gravados
+
+
+# Baixa as malhas do IBGE (`python mapas.py baixar`) ou simplifica uma malha de
+# origem já baixada (GeoJSON ou TopoJSON), para versioná-las em base/geo/
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ['baixar']:
+        for nivel in NIVEIS_IBGE:
+            colecao = baixar(nivel)
+            caminho = versionar(colecao, nivel)
+            print(f"{caminho}: {len(colecao['features'])} feições, {os.path.getsize(caminho) / 1e6:.2f} MB")
+        sys.exit()
+    if len(sys.argv) < 3:
+        sys.exit("uso: python mapas.py baixar\n"
+                 "     python mapas.py <malha de origem.geojson|.topojson> <uf|municipio> [tolerância]")
+    origem, nivel = sys.argv[1], sys.argv[2]
+    tolerancia = float(sys.argv[3]) if len(sys.argv) > 3 else ZOOM['uf']['tolerancia'] / 2
+    colecao = ler_malha(origem)
+    caminho = versionar(colecao, nivel, tolerancia)
+    print(f"{caminho}: {len(colecao['features'])} feições, "
+          f"{os.path.getsize(origem) / 1e6:.2f} MB -> {os.path.getsize(caminho) / 1e6:.2f} MB")
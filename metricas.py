@@ -0,0 +1,187 @@
+import contextvars
+import cProfile
+import itertools
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Instrumentação opcional dos callbacks: DISC_TAC_METRICAS=1 liga a medição
+# das fases; DISC_TAC_PERFIL_AMOSTRA (0 a 1) é a fração de requisições que
+# também gravam um perfil em DISC_TAC_PERFIS (cProfile, ou pyinstrument com
+# DISC_TAC_PERFILADOR=pyinstrument)
+ATIVO = os.environ.get("DISC_TAC_METRICAS") == "1"
+TAXA_PERFIL = float(os.environ.get("DISC_TAC_PERFIL_AMOSTRA", "0"))
+DIRETORIO_PERFIS = os.environ.get("DISC_TAC_PERFIS", "perfis")
+PERFILADOR = os.environ.get("DISC_TAC_PERFILADOR", "cprofile")
+
+# Rótulos (gráfico, estados) da requisição em andamento
+_rotulos = contextvars.ContextVar('rotulos', default=None)
+
+# Os rótulos vêm de valores do navegador: só os conhecidos viram rótulo e o
+# resto cai em ROTULO_OUTRO, para que o número de séries de /metrics (e de
+# entradas em _fases) não cresça sem limite
+ROTULO_OUTRO = 'outro'
+ROTULO_VARIOS = 'varios'
+
+# Gráficos do registro (graficos.grafico os adiciona) e visões fora dele
+GRAFICOS_CONHECIDOS = set()
+VISOES = {'consulta', 'busca', 'drill', 'mapa_municipios'}
+
+SIGLAS_UF = frozenset({
+    'RO', 'AC', 'AM', 'RR', 'PA', 'AP', 'TO', 'MA', 'PI', 'CE', 'RN', 'PB', 'PE', 'AL',
+    'SE', 'BA', 'MG', 'ES', 'RJ', 'SP', 'PR', 'SC', 'RS', 'MS', 'MT', 'GO', 'DF',
+})
+
+# (gráfico, estados, fase) -> [soma dos segundos, contagem, máximo]
+_fases = defaultdict(lambda: [0.0, 0, 0.0])
+# Acertos, falhas e figuras exportadas de todos os caches de figuras do
+# processo: cada recarga da base cria um cache novo, e os contadores de
+# /metrics não podem voltar a zero na troca
+_cache = {'acertos': 0, 'falhas': 0, 'exportados': 0}
+_trava = threading.Lock()
+_sequencia_perfis = itertools.count(1)
+
+
+def registrar(rotulos, nome_fase, segundos):
+    with _trava:
+        total = _fases[(*rotulos, nome_fase)]
+        total[0] += segundos
+        total[1] += 1
+        total[2] = max(total[2], segundos)
+
+
+def contar_cache(nome):
+    """Soma um em `nome` (acertos, falhas ou exportados) do cache de figuras."""
+    with _trava:
+        _cache[nome] += 1
+
+
+@contextmanager
+def fase(nome_fase):
+    """Mede o bloco como `nome_fase` da requisição em andamento, se houver."""
+    rotulos = _rotulos.get()
+    if rotulos is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(rotulos, nome_fase, time.perf_counter() - inicio)
+
+
+def rotulos_requisicao(grafico, estados=(), nivel=None):
+    """(gráfico, estados) com cardinalidade limitada.
+
+    Gráfico desconhecido vira 'outro'; estados viram '' (nenhum), a sigla
+    (um só), 'varios' ou 'outro' (algum inválido); com `nivel` (drill-down)
+    o segundo rótulo é o nível, nunca a chave do nó.
+    """
+    grafico = grafico if grafico in GRAFICOS_CONHECIDOS or grafico in VISOES else ROTULO_OUTRO
+    if nivel is not None:
+        return grafico, f"nivel_{int(nivel)}"
+    estados = set(estados or ())
+    if not estados:
+        return grafico, ''
+    if not estados <= SIGLAS_UF:
+        return grafico, ROTULO_OUTRO
+    return grafico, estados.pop() if len(estados) == 1 else ROTULO_VARIOS
+
+
+@contextmanager
+def requisicao(grafico, estados=(), nivel=None):
+    """Marca uma chamada de callback; as fases medidas dentro dela recebem o
+    gráfico e o filtro de estados (ou o `nivel` do drill-down) como rótulos."""
+    if not ATIVO:
+        yield
+        return
+    rotulos = rotulos_requisicao(grafico, estados, nivel)
+    token = _rotulos.set(rotulos)
+    perfil = _iniciar_perfil() if TAXA_PERFIL and random.random() < TAXA_PERFIL else None
+    try:
+        with fase('total'):
+            yield
+    finally:
+        if perfil is not None:
+            _gravar_perfil(perfil, *rotulos)
+        _rotulos.reset(token)
+
+
+def _iniciar_perfil():
+    if PERFILADOR == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            pass
+        else:
+            perfil = Profiler()
+            perfil.start()
+            return perfil
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def _gravar_perfil(perfil, grafico, estados):
+    os.makedirs(DIRETORIO_PERFIS, exist_ok=True)
+    nome = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequencia_perfis)}-{grafico}"
+    if estados:
+        nome += '-' + estados
+    caminho = os.path.join(DIRETORIO_PERFIS, nome)
+    if isinstance(perfil, cProfile.Profile):
+        perfil.disable()
+        perfil.dump_stats(f"{caminho}.prof")
+    else:
+        perfil.stop()
+        with open(f"{caminho}.txt", 'w') as arquivo:
+            arquivo.write(perfil.output_text())
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def texto_prometheus(cache=None):
+    """Métricas no formato texto do Prometheus."""
+    linhas = [
+        '# HELP disc_tac_fase_segundos Tempo gasto em cada fase do callback do gráfico.',
+        '# TYPE disc_tac_fase_segundos summary',
+    ]
+    maximos = []
+    with _trava:
+        fases = sorted(_fases.items())
+        contadores_cache = dict(_cache)
+    for (grafico, estados, nome_fase), (soma, contagem, maximo) in fases:
+        rotulos = f'grafico="{_escapar(grafico)}",estados="{_escapar(estados)}",fase="{nome_fase}"'
+        linhas.append(f'disc_tac_fase_segundos_sum{{{rotulos}}} {soma:.6f}')
+        linhas.append(f'disc_tac_fase_segundos_count{{{rotulos}}} {contagem}')
+        maximos.append(f'disc_tac_fase_segundos_max{{{rotulos}}} {maximo:.6f}')
+    linhas.append('# HELP disc_tac_fase_segundos_max Maior tempo observado em cada fase.')
+    linhas.append('# TYPE disc_tac_fase_segundos_max gauge')
+    linhas.extend(maximos)
+    for nome, valor in contadores_cache.items():
+        linhas.append(f'# TYPE disc_tac_cache_{nome}_total counter')
+        linhas.append(f'disc_tac_cache_{nome}_total {valor}')
+    if cache is not None:
+        # Entradas são do cache da versão em uso
+        linhas.append('# TYPE disc_tac_cache_entradas gauge')
+        linhas.append(f"disc_tac_cache_entradas {cache.estatisticas()['entradas']}")
+    return '\n'.join(linhas) + '\n'
+
+
+def registrar_endpoint(server, cache=None):
+    """Expõe /metrics no servidor Flask do app (somente com ATIVO).
+
+    `cache` pode ser uma função que retorna o cache de figuras, para apps que
+    só o criam depois de carregar a base.
+    """
+    if not ATIVO:
+        return
+
+    def metricas():
+        return texto_prometheus(cache() if callable(cache) else cache), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    server.add_url_rule('/metrics', 'metricas', metricas)
@@ -0,0 +1,231 @@
+import fcntl
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from agregados import ajustar_tabela
+from carregador import FORMATO_SNAPSHOT, gravar_snapshot, impressao_digital, ler_em_blocos, ler_snapshot
+
+# Matrículas de cada modalidade de oferta do curso técnico
+MODALIDADES = [
+    'QT_MAT_CURSO_TEC_CT',
+    'QT_MAT_CURSO_TEC_NM',
+    'QT_MAT_CURSO_TEC_CONC',
+    'QT_MAT_TEC_SUBS',
+    'QT_MAT_TEC_EJA',
+]
+
+# Cruzamentos pesados demais para o callback: calculados fora dele, cada um
+# num processo, direto do CSV (só com as colunas que usam)
+CRUZAMENTOS = {
+    'area_uf_dependencia': {
+        'dimensoes': ['NO_AREA_CURSO_PROFISSIONAL', 'SG_UF', 'TP_DEPENDENCIA'],
+        'somas': ['QT_MAT_CURSO_TEC'],
+        'contagens': ['NO_ENTIDADE'],
+    },
+    'modalidade_municipio': {
+        'dimensoes': ['SG_UF', 'CO_MUNICIPIO', 'NO_MUNICIPIO'],
+        'somas': ['QT_MAT_CURSO_TEC'] + MODALIDADES,
+        'contagens': [],
+        # Participação (%) de cada modalidade nas matrículas do município
+        'participacoes': MODALIDADES,
+    },
+    # Cursos por município com os filtros da API de consulta (ver
+    # consulta.py): dependência, localização e área
+    'curso_municipio': {
+        'dimensoes': ['NO_REGIAO', 'SG_UF', 'CO_MUNICIPIO', 'NO_MUNICIPIO', 'TP_DEPENDENCIA',
+                      'TP_LOCALIZACAO', 'NO_AREA_CURSO_PROFISSIONAL', 'NO_CURSO_EDUC_PROFISSIONAL'],
+        'somas': ['QT_MAT_CURSO_TEC', 'QT_CURSO_TEC'],
+        'contagens': ['NO_ENTIDADE'],
+    },
+    # Matrículas de cada curso de cada escola, para o gráfico da escola
+    # escolhida na busca do filtro (ver busca.py)
+    'cursos_escola': {
+        'dimensoes': ['CO_ENTIDADE', 'NO_CURSO_EDUC_PROFISSIONAL'],
+        'somas': ['QT_MAT_CURSO_TEC'],
+        'contagens': [],
+    },
+    # Uma linha por escola com toda a hierarquia acima dela, base do
+    # drill-down Região -> UF -> Município -> Escola (ver agregados.Hierarquia)
+    'escolas': {
+        'dimensoes': ['NO_REGIAO', 'SG_UF', 'CO_MUNICIPIO', 'NO_MUNICIPIO', 'CO_ENTIDADE', 'NO_ENTIDADE'],
+        'somas': ['QT_MAT_CURSO_TEC'],
+        'contagens': ['NO_CURSO_EDUC_PROFISSIONAL'],
+    },
+}
+
+
+def diretorio_cruzamentos(caminho_csv):
+    return os.path.join(os.path.dirname(caminho_csv), 'cruzamentos')
+
+
+def caminho_cruzamento(caminho_csv, nome):
+    return os.path.join(diretorio_cruzamentos(caminho_csv), f"{nome}.{FORMATO_SNAPSHOT}")
+
+
+def ler_manifesto(caminho_csv):
+    try:
+        with open(os.path.join(diretorio_cruzamentos(caminho_csv), 'manifesto.json')) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_manifesto(caminho_csv, manifesto):
+    # Os workers do gunicorn calculam e gravam os mesmos cruzamentos ao mesmo
+    # tempo: sob a trava, relê o manifesto e soma os cruzamentos que outro
+    # processo registrou desde a leitura deste, para nenhum se perder
+    caminho = os.path.join(diretorio_cruzamentos(caminho_csv), 'manifesto.json')
+    with open(f"{caminho}.lock", 'w') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        gravado = ler_manifesto(caminho_csv)
+        if (gravado.get('sha1'), gravado.get('formato')) == (manifesto['sha1'], manifesto['formato']):
+            manifesto = {**manifesto, 'cruzamentos': {**gravado.get('cruzamentos', {}), **manifesto['cruzamentos']}}
+        temporario = f"{caminho}.tmp{os.getpid()}"
+        with open(temporario, 'w') as arquivo:
+            json.dump(manifesto, arquivo, indent=2)
+        os.replace(temporario, caminho)
+
+
+def _agregar_bloco(bloco, especificacao):
+    colunas = {m: (m, 'sum') for m in especificacao['somas']}
+    colunas.update({m: (m, 'count') for m in especificacao['contagens']})
+    bloco = bloco.astype({m: 'int64' for m in especificacao['somas']})
+    # dropna=False: linha sem município, área etc. continua contando
+    return bloco.groupby(especificacao['dimensoes'], dropna=False, observed=True).agg(**colunas).reset_index()
+
+
+def calcular_cruzamento(nome, caminho_csv, limite_memoria_mb=64):
+    """Calcula o cruzamento `nome` lendo o CSV em blocos.
+
+    Roda dentro de um processo do pool; retorna (nome, resultado, segundos).
+    """
+    inicio = time.perf_counter()
+    especificacao = CRUZAMENTOS[nome]
+    dimensoes = especificacao['dimensoes']
+    colunas = dimensoes + especificacao['somas'] + especificacao['contagens']
+    resultado = None
+    for bloco in ler_em_blocos(caminho_csv, limite_memoria_mb, colunas, relatorio=None):
+        parcial = _agregar_bloco(bloco, especificacao)
+        if resultado is not None:
+            parcial = pd.concat([resultado, parcial], ignore_index=True)
+            parcial = parcial.groupby(dimensoes, dropna=False, observed=True).sum().reset_index()
+        resultado = parcial
+    return nome, _participacoes(resultado, especificacao), time.perf_counter() - inicio
+
+
+def _participacoes(resultado, especificacao):
+    total = resultado[especificacao.get('participacoes', [])].sum(axis=1)
+    for coluna in especificacao.get('participacoes', []):
+        resultado[f"PC_{coluna}"] = (resultado[coluna] / total.where(total > 0) * 100).fillna(0)
+    return resultado
+
+
+def precalcular(cubo, caminho_csv, nomes=None, processos=None, limite_memoria_mb=64, relatorio=print):
+    """Calcula os cruzamentos num pool de processos e os registra no cubo.
+
+    Cada resultado é gravado em `base/cruzamentos/` (compartilhado entre os
+    workers e reaproveitado enquanto o CSV não muda) e entregue ao cubo
+    assim que fica pronto. Retorna {nome: segundos} dos calculados agora.
+    """
+    nomes = list(CRUZAMENTOS) if nomes is None else nomes
+    impressao = impressao_digital(caminho_csv)
+    manifesto = ler_manifesto(caminho_csv)
+    if manifesto.get('sha1') != impressao or manifesto.get('formato') != FORMATO_SNAPSHOT:
+        manifesto = {'sha1': impressao, 'formato': FORMATO_SNAPSHOT, 'cruzamentos': {}}
+
+    pendentes = []
+    for nome in nomes:
+        caminho = caminho_cruzamento(caminho_csv, nome)
+        if nome in manifesto['cruzamentos'] and os.path.exists(caminho):
+            cubo.registrar_cruzamento(nome, ler_snapshot(caminho))
+        else:
+            pendentes.append(nome)
+    if not pendentes:
+        return {}
+
+    os.makedirs(diretorio_cruzamentos(caminho_csv), exist_ok=True)
+    inicio = time.perf_counter()
+    processos = processos or min(len(pendentes), os.cpu_count() or 1)
+    if processos == 1:
+        # Um processo só: calcula aqui mesmo, sem o custo de subir o pool
+        resultados = (calcular_cruzamento(nome, caminho_csv, limite_memoria_mb) for nome in pendentes)
+        return _registrar(resultados, cubo, caminho_csv, manifesto, len(pendentes), inicio, relatorio)
+    # spawn: o pool pode ser criado a partir da thread do app sem herdar travas
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [pool.submit(calcular_cruzamento, nome, caminho_csv, limite_memoria_mb) for nome in pendentes]
+        resultados = (futuro.result() for futuro in as_completed(futuros))
+        return _registrar(resultados, cubo, caminho_csv, manifesto, len(pendentes), inicio, relatorio)
+
+
+def _registrar(resultados, cubo, caminho_csv, manifesto, total, inicio, relatorio):
+    """Grava e entrega ao cubo cada cruzamento conforme fica pronto."""
+    tempos = {}
+    for feitos, (nome, resultado, segundos) in enumerate(resultados, start=1):
+        gravar_snapshot(resultado, caminho_cruzamento(caminho_csv, nome))
+        manifesto['cruzamentos'][nome] = tempos[nome] = round(segundos, 3)
+        _gravar_manifesto(caminho_csv, manifesto)
+        cubo.registrar_cruzamento(nome, resultado)
+        if relatorio:
+            relatorio(f"[{feitos}/{total}] {nome}: {len(resultado)} linhas em {segundos:.2f}s "
+                      f"({time.perf_counter() - inicio:.2f}s desde o início)")
+    return tempos
+
+
+def ajustar_cruzamentos(cubo, adicionadas, removidas, linhas, caminho_csv, impressao):
+    """Aplica as linhas alteradas aos cruzamentos já registrados em `cubo`.
+
+    Cada cruzamento é ajustado pelas parciais de `adicionadas` e `removidas`
+    (ver agregados.ajustar_tabela) em vez de recalculado do CSV, e gravado
+    como o da base `impressao`. Retorna os nomes ajustados.
+    """
+    anterior = ler_manifesto(caminho_csv).get('cruzamentos', {})
+    manifesto = {'sha1': impressao, 'formato': FORMATO_SNAPSHOT, 'cruzamentos': {}}
+    ajustados = []
+    for nome, especificacao in CRUZAMENTOS.items():
+        atual = cubo.cruzamento(nome, copia=False)
+        if atual is None:
+            continue
+        medidas = especificacao['somas'] + especificacao['contagens']
+        ajustado = ajustar_tabela(atual[especificacao['dimensoes'] + medidas], especificacao['dimensoes'], medidas,
+                                  _agregar_bloco(adicionadas, especificacao),
+                                  _agregar_bloco(removidas, especificacao), linhas, dropna=False)
+        ajustado = _participacoes(ajustado, especificacao)
+        cubo.registrar_cruzamento(nome, ajustado)
+        os.makedirs(diretorio_cruzamentos(caminho_csv), exist_ok=True)
+        gravar_snapshot(ajustado, caminho_cruzamento(caminho_csv, nome))
+        manifesto['cruzamentos'][nome] = anterior.get(nome, 0)
+        ajustados.append(nome)
+    if ajustados:
+        _gravar_manifesto(caminho_csv, manifesto)
+    return ajustados
+
+
+def iniciar_em_segundo_plano(cubo, caminho_csv, **opcoes):
+    """Roda `precalcular` numa thread, sem bloquear a subida do app."""
+    thread = threading.Thread(target=precalcular, args=(cubo, caminho_csv), kwargs=opcoes,
+                              name='precomputo', daemon=True)
+    thread.start()
+    return thread
+
+
+# Calcula (ou confere) os cruzamentos pesados da base
+if __name__ == "__main__":
+    import sys
+
+    from agregados import CuboAgregado
+    from carregador import carregar_dados
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "base/suplemento_cursos_tecnicos_2023.csv"
+    cubo = CuboAgregado(carregar_dados(caminho))
+    inicio = time.perf_counter()
+    tempos = precalcular(cubo, caminho)
+    print(f"{len(tempos)} cruzamentos calculados em {time.perf_counter() - inicio:.2f}s")
+    for nome in CRUZAMENTOS:
+        print(f"{nome}: {len(cubo.cruzamento(nome))} linhas")
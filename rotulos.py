@@ -0,0 +1,32 @@
+import numpy as np
+
+# Rótulos e anotações dos gráficos montados sobre arrays inteiros, sem laço
+# Python por linha: o custo cresce pouco com o número de grupos (municípios,
+# escolas) exibidos
+
+
+def porcentagem(valores):
+    """Participação de cada valor no total, em %."""
+    return valores / valores.sum() * 100
+
+
+def texto_decimal(valores, casas=1):
+    """Texto dos valores com `casas` decimais, igual a f"{valor:.1f}".
+
+    Formatado direto do float, sem passar por inteiro: `np.rint` arredonda
+    o meio para o par e 0.05 viraria "0.0" em vez de "0.1".
+    """
+    return np.char.mod(f'%.{casas}f', np.asarray(valores, dtype='float64'))
+
+
+def texto_valor_porcentagem(valores):
+    """Rótulo "valor (xx.x%)" de cada barra."""
+    valores = np.asarray(valores)
+    texto = np.char.add(valores.astype(str), ' (')
+    texto = np.char.add(texto, texto_decimal(porcentagem(valores)))
+    return np.char.add(texto, '%)')
+
+
+def categoria_por_posicao(quantidade, corte, primeiros, demais):
+    """Categoria de cor pela posição: os `corte` primeiros e os demais."""
+    return np.where(np.arange(quantidade) < corte, primeiros, demais)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregados import CONTAGENS, DIMENSOES, SOMAS, CuboAgregado
+from graficos import dados_grafico
+
+
+def linhas(matriculas_sudeste):
+    """Base de 2023 com uma escola no Nordeste e uma no Sudeste."""
+    dados = pd.DataFrame({
+        'NO_REGIAO': ['Nordeste', 'Sudeste'],
+        'NO_UF': ['Pernambuco', 'São Paulo'],
+        'SG_UF': ['PE', 'SP'],
+        'TP_LOCALIZACAO': [1, 1],
+        'TP_DEPENDENCIA': [2, 4],
+        'NU_ANO_CENSO': [2023, 2023],
+        'NO_CURSO_EDUC_PROFISSIONAL': ['Informática', 'Enfermagem'],
+        'NO_ENTIDADE': ['Escola A', 'Escola B'],
+    })
+    for medida in SOMAS:
+        dados[medida] = 1
+    dados['QT_MAT_CURSO_TEC'] = [100, matriculas_sudeste]
+    return dados[DIMENSOES + CONTAGENS + SOMAS]
+
+
+@pytest.fixture
+def particoes():
+    # Resumos de python ingestao.py: 2022 e a versão antiga de 2023
+    return pd.DataFrame({
+        'NU_ANO_CENSO': [2022, 2022, 2023, 2023],
+        'NO_REGIAO': ['Nordeste', 'Sudeste', 'Nordeste', 'Sudeste'],
+        'NO_ENTIDADE': [3, 4, 1, 1],
+        'QT_MAT_CURSO_TEC': [80, 150, 100, 200],
+    })
+
+
+def matriculas_por_ano(cubo):
+    df = dados_grafico('evolucao_matriculas', cubo)
+    return dict(zip(df['NU_ANO_CENSO'], df['QT_MAT_CURSO_TEC']))
+
+
+def test_serie_usa_o_ano_carregado_do_cubo(particoes):
+    cubo = CuboAgregado(linhas(250), serie=particoes)
+    assert matriculas_por_ano(cubo) == {2022: 230, 2023: 350}
+    ano_regiao = dados_grafico('ano_regiao', cubo)
+    assert list(ano_regiao['NU_ANO_CENSO']) == [2022, 2022, 2023, 2023]
+    assert list(ano_regiao['NO_ENTIDADE']) == [3, 4, 1, 1]
+
+
+def test_serie_acompanha_o_delta(particoes):
+    cubo = CuboAgregado(linhas(200), serie=particoes)
+    antigas, novas = linhas(200), linhas(250)
+    # Correção de um valor de 2023, aplicada sem reler a base
+    novo = cubo.com_delta(novas.iloc[[1]], antigas.iloc[[1]], novas)
+    assert matriculas_por_ano(cubo) == {2022: 230, 2023: 300}
+    assert matriculas_por_ano(novo) == {2022: 230, 2023: 350}
+    # A escola do Sudeste some de 2023: a contagem por região acompanha
+    novo = cubo.com_delta(novas.iloc[[]], antigas.iloc[[1]], novas.iloc[[0]])
+    ano_regiao = dados_grafico('ano_regiao', novo)
+    assert list(zip(ano_regiao['NU_ANO_CENSO'], ano_regiao['NO_REGIAO'], ano_regiao['NO_ENTIDADE'])) == [
+        (2022, 'Nordeste', 3), (2022, 'Sudeste', 4), (2023, 'Nordeste', 1)]
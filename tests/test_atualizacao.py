@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atualizacao import Atualizador, versao_arquivos
+
+
+def test_mudanca_durante_a_carga_inicial_gera_recarga(tmp_path):
+    caminho = tmp_path / 'base.csv'
+    caminho.write_text('versao 1\n')
+    caminhos = [str(caminho)]
+    estado = {'versao': None}
+    recargas = []
+
+    def recarregar():
+        recargas.append(versao_arquivos(caminhos))
+        estado['versao'] = recargas[-1]
+
+    atualizador = Atualizador(caminhos, lambda: estado['versao'], recarregar, relatorio=None)
+
+    # A carga leu a versão 1 e o arquivo muda antes dela terminar
+    lida = versao_arquivos(caminhos)
+    assert not atualizador.verificar()
+    caminho.write_text('versao 2, mais longa\n')
+    assert not atualizador.verificar()
+    estado['versao'] = lida
+
+    assert atualizador.verificar()
+    assert recargas == [versao_arquivos(caminhos)]
+    assert not atualizador.verificar()
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busca import LIMITE_RESULTADOS, IndiceBusca, normalizar
+
+
+@pytest.fixture
+def indice():
+    return IndiceBusca([
+        ('curso:Informática', 'Técnico em Informática', 500),
+        ('curso:Enfermagem', 'Técnico em Enfermagem', 900),
+        ('curso:Informática para Internet', 'Informática para Internet', 100),
+        ('escola:1', 'Escola Técnica Estadual (Recife - PE)', 300),
+    ])
+
+
+def rotulos(indice, texto, limite=LIMITE_RESULTADOS):
+    return [opcao['label'] for opcao in indice.opcoes(texto, limite)]
+
+
+def test_normalizar_tira_acentos_e_caixa():
+    assert normalizar('TÉCNICO em Informática') == 'tecnico em informatica'
+    # NFKD também decompõe as formas de compatibilidade
+    assert normalizar('ﬁção') == 'ficao'
+
+
+def test_busca_ignora_acentos_e_caixa(indice):
+    assert rotulos(indice, 'INFORMATICA') == rotulos(indice, 'informática')
+    assert set(rotulos(indice, 'informatica')) == {'Técnico em Informática', 'Informática para Internet'}
+    assert rotulos(indice, 'tecnica') == ['Escola Técnica Estadual (Recife - PE)']
+
+
+def test_prefixo_vazio_ou_curto_nao_busca(indice):
+    assert indice.buscar('') == []
+    assert indice.buscar(None) == []
+    assert indice.buscar('  ') == []
+    assert indice.buscar('t') == []
+
+
+def test_prefixo_da_ultima_palavra(indice):
+    # Cada termo é prefixo de alguma palavra, inclusive da última do rótulo
+    assert rotulos(indice, 'enferm') == ['Técnico em Enfermagem']
+    assert rotulos(indice, 'tec info') == ['Técnico em Informática']
+    assert rotulos(indice, 'inter') == ['Informática para Internet']
+    assert rotulos(indice, 'pe') == ['Escola Técnica Estadual (Recife - PE)']
+
+
+def test_ordem_comeca_com_o_texto_depois_peso(indice):
+    # 'Informática para Internet' começa com o texto apesar do peso menor
+    assert rotulos(indice, 'informatica') == ['Informática para Internet', 'Técnico em Informática']
+    assert rotulos(indice, 'tecnico') == ['Técnico em Enfermagem', 'Técnico em Informática']
+
+
+def test_limite_de_resultados():
+    indice = IndiceBusca([(i, f"Curso {i:03d}", i) for i in range(LIMITE_RESULTADOS + 10)])
+
+    assert len(indice.buscar('curso')) == LIMITE_RESULTADOS
+    # Os de maior peso primeiro
+    assert indice.buscar('curso', limite=3) == [29, 28, 27]
+
+
+def test_opcao_do_valor(indice):
+    assert indice.opcao_do_valor('curso:Enfermagem')['label'] == 'Técnico em Enfermagem'
+    assert indice.opcao_do_valor('curso:Inexistente') is None
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_figuras import CacheFiguras, normalizar_parametros
+
+
+def test_lista_do_dropdown_vira_tupla_ordenada():
+    assert normalizar_parametros(('barras', ['PE', 'AC'])) == ('barras', ('AC', 'PE'))
+    # Caminho do drill-down: a ordem importa
+    assert normalizar_parametros(('drill', ('Sudeste', 'SP'))) == ('drill', ('Sudeste', 'SP'))
+
+
+def test_obter_com_lista(tmp_path):
+    base = tmp_path / 'base.csv'
+    base.write_text('a;b\n1;2\n')
+    cache = CacheFiguras(str(base), diretorio_exportado=None)
+    construidas = []
+
+    def construir():
+        construidas.append(1)
+        return {'data': [], 'layout': {}}
+
+    primeira = cache.obter(('barras', ['PE', 'AC']), construir)
+    # Acerto devolve a figura guardada, sem decodificar o JSON de novo
+    assert cache.obter(('barras', ['AC', 'PE']), construir) is primeira
+    assert len(construidas) == 1
+    assert cache.estatisticas()['acertos'] == 1
+
+
+def test_exportado_de_outra_versao_das_particoes(tmp_path):
+    from atualizacao import arquivos_versao, versao_arquivos
+
+    base = tmp_path / 'base.csv'
+    base.write_text('a;b\n1;2\n')
+    exportado = tmp_path / 'graficos'
+    exportado.mkdir()
+    (exportado / 'ano_regiao.json').write_text('{"data": [], "layout": {"title": "exportada"}}')
+    with open(exportado / 'manifesto.json', 'w') as arquivo:
+        json.dump({'versao': list(versao_arquivos(arquivos_versao(str(base)))), 'graficos': {'ano_regiao.json': 1.0}}, arquivo)
+
+    def construir():
+        return {'data': [], 'layout': {'title': 'montada'}}
+
+    cache = CacheFiguras(str(base), diretorio_exportado=str(exportado))
+    assert cache.obter(('ano_regiao', ()), construir)['layout']['title'] == 'exportada'
+
+    # Mesmo CSV, partições novas (python ingestao.py): a exportada ficou velha
+    (tmp_path / 'particoes').mkdir()
+    (tmp_path / 'particoes' / 'manifesto.json').write_text('{"2022": {}}')
+    cache = CacheFiguras(str(base), diretorio_exportado=str(exportado))
+    assert cache.obter(('ano_regiao', ()), construir)['layout']['title'] == 'montada'
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import carregador
+from carregador import ESQUEMA, assinatura_esquema, carregar_dados, ler_csv, ler_em_blocos, snapshot_atualizado
+
+
+def _csv(caminho, qt_curso, qt_mat=10):
+    valores = {coluna: '1' for coluna in ESQUEMA}
+    valores.update({'NO_REGIAO': 'Nordeste', 'NO_UF': 'Pernambuco', 'SG_UF': 'PE', 'NO_MUNICIPIO': 'Recife',
+                    'NO_ENTIDADE': 'Escola', 'NO_AREA_CURSO_PROFISSIONAL': 'Saúde',
+                    'NO_CURSO_EDUC_PROFISSIONAL': 'Enfermagem', 'NU_ANO_CENSO': '2023',
+                    'QT_CURSO_TEC': str(qt_curso), 'QT_MAT_CURSO_TEC': str(qt_mat)})
+    caminho.write_text(';'.join(ESQUEMA) + '\n' + ';'.join(valores[c] for c in ESQUEMA) + '\n', encoding='latin1')
+    return str(caminho)
+
+
+def test_contador_acima_de_int8(tmp_path):
+    # 300 em int8 virava 44 sem erro
+    dados = ler_csv(_csv(tmp_path / 'base.csv', 300), list(ESQUEMA))
+    assert dados['QT_CURSO_TEC'].tolist() == [300]
+    assert str(dados['QT_CURSO_TEC'].dtype) == ESQUEMA['QT_CURSO_TEC']
+
+
+def test_valor_fora_do_tipo_falha(tmp_path):
+    caminho = _csv(tmp_path / 'base.csv', 1, qt_mat=3_000_000_000)
+    with pytest.raises(ValueError, match='QT_MAT_CURSO_TEC'):
+        ler_csv(caminho, list(ESQUEMA))
+    with pytest.raises(ValueError, match='QT_MAT_CURSO_TEC'):
+        list(ler_em_blocos(caminho, colunas=list(ESQUEMA), relatorio=None))
+
+
+def test_snapshot_de_esquema_antigo_e_refeito(tmp_path, monkeypatch):
+    caminho = _csv(tmp_path / 'base.csv', 3)
+    # Snapshot gravado antes da mudança dos contadores para int16
+    monkeypatch.setitem(carregador.ESQUEMA, 'QT_CURSO_TEC', 'int8')
+    antigo = assinatura_esquema()
+    assert str(carregar_dados(caminho)['QT_CURSO_TEC'].dtype) == 'int8'
+    assert snapshot_atualizado(caminho)
+    monkeypatch.undo()
+
+    assert assinatura_esquema() != antigo
+    # Mesmo CSV, esquema novo: o snapshot não vale mais e é refeito
+    assert not snapshot_atualizado(caminho)
+    dados = carregar_dados(caminho)
+    assert str(dados['QT_CURSO_TEC'].dtype) == ESQUEMA['QT_CURSO_TEC']
+    assert dados['QT_CURSO_TEC'].tolist() == [3]
+    assert snapshot_atualizado(caminho)
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregados import CuboAgregado
+from clientside import _arrays, _codificar_linhas, _codificar_tabela, _figura_sem_template, payload_main
+from compactacao import decodificar
+from graficos import GRAFICOS
+from test_incremental import linhas_base
+
+
+def test_mais_de_65535_categorias_usa_u4():
+    nomes = [f"Escola {i}" for i in range(70000)]
+    coluna = _codificar_tabela(pd.DataFrame({'NO_ENTIDADE': nomes}))['NO_ENTIDADE']
+    assert coluna['codigos']['dtype'] == 'u4'
+    codigos = decodificar(coluna['codigos'])
+    assert [coluna['valores'][codigo] for codigo in codigos[[0, 69999]]] == ['Escola 0', 'Escola 69999']
+
+
+def test_poucas_categorias_continuam_u2():
+    coluna = _codificar_tabela(pd.DataFrame({'SG_UF': ['PE', 'SP', 'PE']}))['SG_UF']
+    assert coluna['codigos']['dtype'] == 'u2'
+
+
+def test_indices_de_linha_acima_de_65535():
+    linhas = np.array([3, 70000, 5])
+    codificado = _codificar_linhas(linhas)
+    assert codificado['dtype'] == 'u4'
+    assert decodificar(codificado).tolist() == [3, 70000, 5]
+
+
+def montar(traco, tabelas):
+    """Mesma montagem de assets/clientside.js (montarTraco)."""
+    if '_tabela' not in traco:
+        return traco
+    linhas = traco['_linhas']
+    linhas = range(linhas['inicio'], linhas['fim']) if 'inicio' in linhas else decodificar(linhas)
+    montado = {propriedade: valor for propriedade, valor in traco.items() if not propriedade.startswith('_')}
+    for propriedade, nome in traco['_colunas'].items():
+        coluna = tabelas[traco['_tabela']][nome]
+        valores = ([coluna['valores'][codigo] for codigo in decodificar(coluna['codigos'])]
+                   if 'codigos' in coluna else decodificar(coluna).tolist())
+        montado[propriedade] = [valores[linha] for linha in linhas]
+    return montado
+
+
+def test_figuras_montadas_no_navegador_iguais_as_do_servidor():
+    cubo = CuboAgregado(linhas_base())
+    payload = payload_main(cubo)
+    ligados = 0
+    for tipo_grafico in GRAFICOS:
+        esperada = _figura_sem_template(tipo_grafico, cubo)
+        figura = payload['figuras'][tipo_grafico]
+        assert len(figura['data']) == len(esperada['data'])
+        for traco, esperado in zip(figura['data'], esperada['data']):
+            ligados += '_tabela' in traco
+            montado = montar(traco, payload['tabelas'])
+            assert set(montado) == set(esperado), tipo_grafico
+            assert _arrays(montado) == _arrays(esperado), tipo_grafico
+    assert ligados
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compactacao import codificar, decodificar, enxugar_figura
+
+
+def test_menor_inteiro_que_comporta_os_valores():
+    assert codificar([1, -2])['dtype'] == 'i1'
+    assert codificar([300, 1])['dtype'] == 'i2'
+    assert codificar([70000, 1])['dtype'] == 'i4'
+
+
+def test_inteiros_grandes_sem_int64():
+    # plotly.js não tem typed array de 64 bits inteiros
+    codificado = codificar([2 ** 40, -3])
+    assert codificado['dtype'] == 'f8'
+    assert decodificar(codificado).tolist() == [2 ** 40, -3]
+    assert codificar([2 ** 60, 1]) is None
+
+
+def test_lista_que_nao_cabe_fica_como_esta():
+    figura = enxugar_figura({'data': [{'type': 'bar', 'x': [2 ** 60, 1], 'y': [1, 2]}], 'layout': {}})
+    traco = figura['data'][0]
+    assert traco['x'] == [2 ** 60, 1]
+    assert np.array_equal(decodificar(traco['y']), [1, 2])
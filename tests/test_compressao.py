@@ -0,0 +1,32 @@
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.http import parse_accept_header
+
+from compressao import _comprimir
+
+CORPO = b'{"data": []}' * 100
+
+
+def codificacao(cabecalho):
+    return _comprimir(CORPO, parse_accept_header(cabecalho))[0]
+
+
+def test_q_zero_recusa_a_codificacao():
+    assert codificacao('gzip;q=0') is None
+    assert codificacao('br;q=0, gzip;q=0') is None
+    assert codificacao('*, gzip;q=0') in (None, 'br')
+
+
+def test_tokens_que_so_contem_as_letras_nao_valem():
+    assert codificacao('xbrx, gzipper') is None
+
+
+def test_curinga_e_gzip():
+    assert codificacao('br;q=0, *') == 'gzip'
+    codificado, comprimido = _comprimir(CORPO, parse_accept_header('gzip'))
+    assert codificado == 'gzip'
+    assert gzip.decompress(comprimido) == CORPO
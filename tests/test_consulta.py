@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import consulta
+from agregados import CONTAGENS, DIMENSOES, SOMAS, CuboAgregado
+
+UFS = ['AL', 'BA', 'CE', 'PE', 'SP']
+
+
+def linhas():
+    """Uma escola em cada UF, com 100, 200, ... matrículas."""
+    dados = pd.DataFrame({
+        'NO_REGIAO': ['Nordeste'] * 4 + ['Sudeste'],
+        'NO_UF': ['Alagoas', 'Bahia', 'Ceará', 'Pernambuco', 'São Paulo'],
+        'SG_UF': UFS,
+        'TP_LOCALIZACAO': [1, 1, 2, 1, 1],
+        'TP_DEPENDENCIA': [2, 2, 3, 4, 4],
+        'NU_ANO_CENSO': [2023] * 5,
+        'NO_CURSO_EDUC_PROFISSIONAL': ['Informática'] * 5,
+        'NO_ENTIDADE': [f"Escola {uf}" for uf in UFS],
+    })
+    for medida in SOMAS:
+        dados[medida] = 1
+    dados['QT_MAT_CURSO_TEC'] = [100, 200, 300, 400, 500]
+    return dados[DIMENSOES + CONTAGENS + SOMAS]
+
+
+@pytest.fixture
+def estado():
+    return SimpleNamespace(cubo=CuboAgregado(linhas()), impressao='abc')
+
+
+@pytest.fixture
+def cliente(monkeypatch, estado):
+    monkeypatch.setattr(consulta, 'ATIVO', True)
+    consulta.cache_consultas.limpar()
+    servidor = Flask(__name__)
+    consulta.registrar_consulta(servidor, lambda: estado)
+    return servidor.test_client()
+
+
+@pytest.mark.parametrize('query, mensagem', [
+    ('dependencia=federal', "'dependencia' aceita apenas códigos numéricos"),
+    ('formato=xml', "'formato' deve ser um de: json, csv, arrow"),
+    ('pagina=0', "'pagina' deve estar entre"),
+    ('pagina=um', "'pagina' deve ser um número inteiro"),
+    (f"por_pagina={consulta.MAXIMO_POR_PAGINA + 1}", "'por_pagina' deve estar entre"),
+    ('dimensoes=NO_MUNICIPIO_INEXISTENTE', "Nenhuma tabela agregada"),
+])
+def test_parametros_invalidos(cliente, query, mensagem):
+    resposta = cliente.get(f"/api/consulta?{query}")
+    assert resposta.status_code == 400
+    assert resposta.get_json()['erro'].startswith(mensagem)
+
+
+def test_cruzamento_em_calculo_responde_503(cliente):
+    # CO_MUNICIPIO só existe nos cruzamentos, que ainda não foram registrados
+    resposta = cliente.get('/api/consulta?dimensoes=SG_UF&municipio=2611606')
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == '5'
+
+
+def test_base_carregando_responde_503(monkeypatch):
+    monkeypatch.setattr(consulta, 'ATIVO', True)
+    servidor = Flask(__name__)
+    consulta.registrar_consulta(servidor, lambda: None)
+    assert servidor.test_client().get('/api/consulta').status_code == 503
+
+
+def test_filtros_e_agrupamento(cliente):
+    corpo = cliente.get('/api/consulta?dimensoes=NO_REGIAO&uf=PE,SP&uf=BA').get_json()
+    assert corpo['filtros'] == {'SG_UF': ['BA', 'PE', 'SP']}
+    assert corpo['linhas'] == [{'NO_REGIAO': 'Nordeste', 'QT_MAT_CURSO_TEC': 600},
+                               {'NO_REGIAO': 'Sudeste', 'QT_MAT_CURSO_TEC': 500}]
+
+
+def test_paginacao(cliente):
+    resposta = cliente.get('/api/consulta?dimensoes=SG_UF&por_pagina=2&pagina=2')
+    corpo = resposta.get_json()
+    assert [linha['SG_UF'] for linha in corpo['linhas']] == ['CE', 'PE']
+    assert (corpo['total_linhas'], corpo['total_paginas']) == (5, 3)
+    assert resposta.headers['X-Total-Count'] == '5'
+    assert 'pagina=3' in resposta.headers['Link'] and 'rel="next"' in resposta.headers['Link']
+    assert 'pagina=1' in resposta.headers['Link'] and 'rel="prev"' in resposta.headers['Link']
+
+    # Última página: só o link para a anterior; além dela, página vazia
+    ultima = cliente.get('/api/consulta?dimensoes=SG_UF&por_pagina=2&pagina=3')
+    assert [linha['SG_UF'] for linha in ultima.get_json()['linhas']] == ['SP']
+    assert 'rel="next"' not in ultima.headers['Link']
+    depois = cliente.get('/api/consulta?dimensoes=SG_UF&por_pagina=2&pagina=4')
+    assert depois.get_json()['linhas'] == []
+
+    # Um resultado que cabe numa página não tem links
+    assert 'Link' not in cliente.get('/api/consulta?dimensoes=SG_UF').headers
+
+
+def test_etag_e_304(cliente, estado):
+    resposta = cliente.get('/api/consulta?dimensoes=SG_UF&uf=SP,PE')
+    marca = resposta.headers['ETag']
+    assert resposta.headers['Cache-Control'] == 'no-cache'
+
+    # A mesma consulta escrita de outro jeito tem a mesma ETag
+    revalidada = cliente.get('/api/consulta?uf=PE&uf=SP&dimensoes=SG_UF', headers={'If-None-Match': marca})
+    assert revalidada.status_code == 304
+    assert revalidada.headers['ETag'] == marca
+    assert revalidada.data == b''
+    # Comparação fraca, como a ETag sai com compressão
+    fraca = cliente.get('/api/consulta?dimensoes=SG_UF&uf=SP,PE', headers={'If-None-Match': f"W/{marca}"})
+    assert fraca.status_code == 304
+
+    # Outra página, outro formato ou outra versão da base: nova ETag
+    assert cliente.get('/api/consulta?dimensoes=SG_UF&uf=SP,PE&formato=csv',
+                       headers={'If-None-Match': marca}).status_code == 200
+    estado.impressao = 'def'
+    assert cliente.get('/api/consulta?dimensoes=SG_UF&uf=SP,PE', headers={'If-None-Match': marca}).status_code == 200
+
+
+def test_formato_csv(cliente):
+    resposta = cliente.get('/api/consulta?dimensoes=SG_UF&medidas=QT_MAT_CURSO_TEC,NO_ENTIDADE&formato=csv')
+    assert resposta.mimetype == 'text/csv'
+    tabela = pd.read_csv(io.BytesIO(resposta.data))
+    assert list(tabela.columns) == ['SG_UF', 'QT_MAT_CURSO_TEC', 'NO_ENTIDADE']
+    assert tabela['SG_UF'].tolist() == UFS
+    assert tabela['QT_MAT_CURSO_TEC'].tolist() == [100, 200, 300, 400, 500]
+
+
+def test_formato_arrow(cliente):
+    pa = pytest.importorskip('pyarrow')
+    resposta = cliente.get('/api/consulta?dimensoes=TP_DEPENDENCIA&formato=arrow')
+    assert resposta.mimetype == 'application/vnd.apache.arrow.stream'
+    tabela = pa.ipc.open_stream(resposta.data).read_pandas()
+    assert tabela['TP_DEPENDENCIA'].tolist() == [2, 3, 4]
+    assert tabela['QT_MAT_CURSO_TEC'].tolist() == [300, 300, 900]
+    assert str(tabela['QT_MAT_CURSO_TEC'].dtype) == 'int64'
+
+
+def test_json_sem_dimensoes_soma_tudo(cliente):
+    corpo = json.loads(cliente.get('/api/consulta').data)
+    assert corpo['linhas'] == [{'QT_MAT_CURSO_TEC': 1500}]
@@ -0,0 +1,195 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import incremental
+from agregados import DIMENSOES, CuboAgregado
+from carregador import ESQUEMA, impressao_digital, ler_csv
+from graficos import GRAFICOS, dados_grafico
+from precomputo import CRUZAMENTOS, calcular_cruzamento, precalcular
+
+UFS = [('Nordeste', 'Pernambuco', 'PE', 2611606, 'Recife'),
+       ('Nordeste', 'Bahia', 'BA', 2927408, 'Salvador'),
+       ('Sudeste', 'São Paulo', 'SP', 3550308, 'São Paulo'),
+       ('Norte', 'Acre', 'AC', 1200401, 'Rio Branco')]
+CURSOS = [(1, 'Informática', 'Informação e Comunicação'),
+          (2, 'Enfermagem', 'Ambiente e Saúde'),
+          (3, 'Administração', 'Gestão e Negócios')]
+
+
+def linhas_base():
+    """29 linhas: escolas de PE, BA e SP com três cursos cada, a escola 8 com
+    a mesma chave repetida e uma única escola no Acre."""
+    linhas = []
+    for escola in range(9):
+        regiao, uf, sigla, municipio, nome_municipio = UFS[escola % 3]
+        for curso, nome_curso, area in CURSOS:
+            linhas.append((regiao, uf, sigla, municipio, nome_municipio, escola, curso, nome_curso, area,
+                           10 * (escola + 1) + curso))
+    linhas.append(linhas[-1][:9] + (5,))
+    linhas.append(UFS[3] + (9, 1, 'Informática', 'Informação e Comunicação', 40))
+    dados = pd.DataFrame(linhas, columns=['NO_REGIAO', 'NO_UF', 'SG_UF', 'CO_MUNICIPIO', 'NO_MUNICIPIO',
+                                          'CO_ENTIDADE', 'CO_CURSO_EDUC_PROFISSIONAL', 'NO_CURSO_EDUC_PROFISSIONAL',
+                                          'NO_AREA_CURSO_PROFISSIONAL', 'QT_MAT_CURSO_TEC'])
+    dados['NO_ENTIDADE'] = 'Escola ' + dados['CO_ENTIDADE'].astype(str)
+    dados['TP_DEPENDENCIA'] = dados['CO_ENTIDADE'] % 4 + 1
+    dados['TP_LOCALIZACAO'] = dados['CO_ENTIDADE'] % 2 + 1
+    for coluna in ESQUEMA:
+        if coluna not in dados:
+            dados[coluna] = 2023 if coluna == 'NU_ANO_CENSO' else 1
+    # Modalidades somando o total, para as participações do cruzamento
+    dados['QT_MAT_CURSO_TEC_CT'] = dados['QT_MAT_CURSO_TEC'] // 2
+    dados['QT_MAT_CURSO_TEC_NM'] = dados['QT_MAT_CURSO_TEC'] - dados['QT_MAT_CURSO_TEC_CT']
+    dados['QT_MAT_CURSO_TEC_CONC'] = dados['QT_MAT_TEC_SUBS'] = dados['QT_MAT_TEC_EJA'] = 0
+    return dados[list(ESQUEMA)]
+
+
+def gravar(dados, caminho):
+    dados.to_csv(caminho, sep=';', encoding='latin1', index=False)
+
+
+@pytest.fixture
+def carregado(tmp_path):
+    """CSV, cubo da versão carregada (com agregações, rankings e cruzamentos
+    já calculados) e a impressão dela, com as linhas guardadas para o diff."""
+    caminho = str(tmp_path / 'base.csv')
+    gravar(linhas_base(), caminho)
+    impressao = impressao_digital(caminho)
+    cubo = CuboAgregado(ler_csv(caminho))
+    for tipo_grafico in GRAFICOS:
+        dados_grafico(tipo_grafico, cubo)
+    precalcular(cubo, caminho, processos=1, relatorio=None)
+    incremental.preparar(caminho, impressao)
+    return caminho, cubo, impressao
+
+
+def ordenada(tabela, dimensoes):
+    tabela = tabela.astype({c: str for c in dimensoes if isinstance(tabela[c].dtype, pd.CategoricalDtype)})
+    return tabela.sort_values(list(dimensoes)).reset_index(drop=True).astype(object)
+
+
+def assert_igual_a_reconstruir(caminho, novo):
+    """O cubo ajustado tem os mesmos dados de um montado do zero com o CSV atual."""
+    do_zero = CuboAgregado(ler_csv(caminho))
+    assert ordenada(novo.cubo, DIMENSOES).equals(ordenada(do_zero.cubo, DIMENSOES))
+    for tipo_grafico in GRAFICOS:
+        assert incremental.mesmos_dados(dados_grafico(tipo_grafico, novo), dados_grafico(tipo_grafico, do_zero)), \
+            tipo_grafico
+    for nome, especificacao in CRUZAMENTOS.items():
+        _, esperado, _ = calcular_cruzamento(nome, caminho)
+        ajustado = novo.cruzamento(nome)[list(esperado.columns)]
+        assert ordenada(ajustado, especificacao['dimensoes']).equals(
+            ordenada(esperado, especificacao['dimensoes'])), nome
+
+
+def alterar(caminho, impressao, cubo, mudar):
+    dados = linhas_base()
+    gravar(mudar(dados), caminho)
+    return incremental.aplicar(caminho, cubo, impressao, impressao_digital(caminho), relatorio=None)
+
+
+def test_insercao(carregado):
+    caminho, cubo, impressao = carregado
+    nova = linhas_base().iloc[[0]].assign(CO_ENTIDADE=20, NO_ENTIDADE='Escola 20', QT_MAT_CURSO_TEC=70,
+                                          NO_CURSO_EDUC_PROFISSIONAL='Eletrotécnica', CO_CURSO_EDUC_PROFISSIONAL=4)
+    novo, _, ufs = alterar(caminho, impressao, cubo, lambda dados: pd.concat([dados, nova], ignore_index=True))
+    assert ufs == {'PE'}
+    assert_igual_a_reconstruir(caminho, novo)
+
+
+def test_remocao(carregado):
+    caminho, cubo, impressao = carregado
+    novo, _, ufs = alterar(caminho, impressao, cubo, lambda dados: dados.drop(index=[4]))
+    assert ufs == {'BA'}
+    assert_igual_a_reconstruir(caminho, novo)
+
+
+def test_atualizacao(carregado):
+    caminho, cubo, impressao = carregado
+
+    def mudar(dados):
+        dados.loc[3, 'QT_MAT_CURSO_TEC'] = 999
+        dados.loc[8, 'NO_CURSO_EDUC_PROFISSIONAL'] = 'Logística'
+        return dados
+
+    novo, _, ufs = alterar(caminho, impressao, cubo, mudar)
+    assert ufs == {'BA', 'SP'}
+    assert_igual_a_reconstruir(caminho, novo)
+    # O cubo da versão anterior continua como estava
+    assert 999 not in set(cubo.cubo['QT_MAT_CURSO_TEC'])
+
+
+def test_chave_repetida_casada_pela_ocorrencia(carregado):
+    caminho, cubo, impressao = carregado
+    # A escola 8 tem duas linhas do curso 3: muda só a segunda
+    repetidas = linhas_base().index[(linhas_base()['CO_ENTIDADE'] == 8)
+                                    & (linhas_base()['CO_CURSO_EDUC_PROFISSIONAL'] == 3)]
+    assert len(repetidas) == 2
+
+    def mudar(dados):
+        dados.loc[repetidas[1], 'QT_MAT_CURSO_TEC'] = 6
+        return dados
+
+    antigas, novas = linhas_base(), mudar(linhas_base())
+    removidas, adicionadas = incremental.diferencas(antigas, novas)
+    assert removidas['QT_MAT_CURSO_TEC'].tolist() == [5]
+    assert adicionadas['QT_MAT_CURSO_TEC'].tolist() == [6]
+
+    novo, _, _ = alterar(caminho, impressao, cubo, mudar)
+    assert_igual_a_reconstruir(caminho, novo)
+
+
+def test_grupo_que_zera(carregado):
+    caminho, cubo, impressao = carregado
+    # A única escola do Acre sai: a UF some do cubo e dos cruzamentos
+    novo, _, ufs = alterar(caminho, impressao, cubo, lambda dados: dados[dados['SG_UF'] != 'AC'])
+    assert ufs == {'AC'}
+    assert 'AC' not in set(novo.cubo['SG_UF'])
+    assert novo.ufs() == ['BA', 'PE', 'SP']
+    assert_igual_a_reconstruir(caminho, novo)
+
+
+def test_grupo_com_soma_zero_continua(carregado):
+    caminho, cubo, impressao = carregado
+
+    def mudar(dados):
+        dados.loc[dados['SG_UF'] == 'AC', ['QT_MAT_CURSO_TEC', 'QT_MAT_CURSO_TEC_CT', 'QT_MAT_CURSO_TEC_NM']] = 0
+        return dados
+
+    novo, _, _ = alterar(caminho, impressao, cubo, mudar)
+    # Soma zero não é grupo vazio: a escola continua na base
+    assert 'AC' in set(novo.cubo['SG_UF'])
+    assert_igual_a_reconstruir(caminho, novo)
+
+
+def test_alteracoes_demais_pedem_recarga_completa(carregado):
+    caminho, cubo, impressao = carregado
+    limite = int(incremental.LIMITE_ALTERADAS * len(linhas_base()))
+
+    def mudar(dados):
+        dados.loc[:limite, 'QT_MAT_CURSO_TEC'] += 1
+        return dados
+
+    assert alterar(caminho, impressao, cubo, mudar) is None
+
+
+def test_linhas_da_versao_anterior_ausentes_pedem_recarga_completa(carregado):
+    caminho, cubo, _ = carregado
+    assert incremental.aplicar(caminho, cubo, 'outra', impressao_digital(caminho), relatorio=None) is None
+
+
+def test_mesmos_dados():
+    tabela = pd.DataFrame({'SG_UF': pd.Categorical(['PE', 'SP']), 'QT_MAT_CURSO_TEC': [1, 2]})
+    assert incremental.mesmos_dados(tabela, tabela.copy())
+    # Índice e tipo de categoria não contam, só os valores em ordem
+    assert incremental.mesmos_dados(tabela, tabela.set_axis([5, 6]).astype({'SG_UF': str}))
+    assert not incremental.mesmos_dados(tabela, tabela.iloc[::-1])
+    assert not incremental.mesmos_dados(tabela, tabela.assign(QT_MAT_CURSO_TEC=[1, 3]))
+    assert not incremental.mesmos_dados(tabela, tabela.iloc[:1])
+    assert not incremental.mesmos_dados(tabela, tabela[['QT_MAT_CURSO_TEC', 'SG_UF']])
+    assert incremental.mesmos_dados(None, None)
+    assert not incremental.mesmos_dados(tabela, None)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inicializacao import Carregamento
+
+
+def test_carga_inicial_tenta_de_novo_ate_conseguir():
+    falhas = [OSError("base copiada pela metade"), ValueError("CSV inválido")]
+
+    def carregar():
+        if falhas:
+            raise falhas.pop(0)
+
+    carregamento = Carregamento(carregar, espera_inicial=0.01, espera_maxima=0.02)
+    carregamento.iniciar()
+    assert carregamento.pronto.wait(5)
+    situacao = carregamento.situacao()
+    assert situacao['tentativas'] == 3
+    assert situacao['erro'] is None
+
+
+def test_carga_sem_segundo_plano_levanta_o_erro():
+    def carregar():
+        raise OSError("base ausente")
+
+    carregamento = Carregamento(carregar)
+    with pytest.raises(OSError):
+        carregamento.iniciar(segundo_plano=False)
+    assert not carregamento.pronto.is_set()
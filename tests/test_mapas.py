@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import filtro
+import graficos
+import mapas
+from agregados import CuboAgregado
+from test_agregados import linhas
+
+# Malha mínima: dois municípios de PE e um de SP
+DIRETORIO_GEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'geo')
+
+
+@pytest.fixture(autouse=True)
+def malha_de_teste(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapas, 'DIRETORIO_GEO', DIRETORIO_GEO)
+    monkeypatch.setattr(mapas, 'DIRETORIO_ASSETS_GEO', str(tmp_path))
+    for funcao in (mapas._ler_geometria, mapas.geometria, mapas.url_geometria):
+        funcao.cache_clear()
+    yield
+    for funcao in (mapas._ler_geometria, mapas.geometria, mapas.url_geometria):
+        funcao.cache_clear()
+
+
+def feicoes(url):
+    """Códigos das feições da malha servida em `url` (ver mapas.url_geometria)."""
+    assert url.startswith(mapas.URL_GEO)
+    nome = url[len(mapas.URL_GEO):].split('?')[0]
+    with open(os.path.join(mapas.DIRETORIO_ASSETS_GEO, nome), encoding='utf-8') as arquivo:
+        return {feicao['id'] for feicao in json.load(arquivo)['features']}
+
+
+@pytest.fixture
+def cruzamento():
+    return pd.DataFrame({
+        'SG_UF': ['PE', 'PE', 'SP'],
+        'CO_MUNICIPIO': [2611606, 2607901, 3550308],
+        'NO_MUNICIPIO': ['Recife', 'Jaboatão dos Guararapes', 'São Paulo'],
+        'QT_MAT_CURSO_TEC': [1200, 300, 5000],
+    })
+
+
+def test_geometria_disponivel():
+    assert mapas.geometria_disponivel('municipio')
+    assert not mapas.geometria_disponivel('inexistente')
+
+
+def test_figura_municipios_do_pais(cruzamento):
+    figura = mapas.figura_municipios(cruzamento)
+    traco = figura.data[0]
+    assert traco.type == 'choropleth'
+    assert list(traco.locations) == ['2611606', '2607901', '3550308']
+    assert list(traco.z) == [1200, 300, 5000]
+    # A figura só referencia a malha, servida como arquivo estático
+    assert feicoes(traco.geojson) == {'2611606', '2607901', '3550308'}
+
+
+def test_figura_municipios_de_uma_uf(cruzamento):
+    figura = mapas.figura_municipios(cruzamento, ufs=('PE',))
+    traco = figura.data[0]
+    assert list(traco.locations) == ['2611606', '2607901']
+    # Só a malha da UF, sem os municípios de SP
+    assert feicoes(traco.geojson) == {'2611606', '2607901'}
+
+
+def test_figura_municipios_de_varias_ufs(cruzamento):
+    figura = mapas.figura_municipios(cruzamento, ufs=('PE', 'SP'))
+    pe, sp = figura.data
+    # Um traço por UF, cada um só com a malha dela
+    assert list(pe.locations) == ['2611606', '2607901']
+    assert feicoes(pe.geojson) == {'2611606', '2607901'}
+    assert list(sp.locations) == ['3550308']
+    assert feicoes(sp.geojson) == {'3550308'}
+    assert pe.coloraxis == sp.coloraxis
+
+
+def test_url_geometria_regrava_so_com_malha_nova():
+    url = mapas.url_geometria('municipio', 'uf', 'PE')
+    assert url == mapas.url_geometria('municipio', 'uf', 'PE')
+    caminho = os.path.join(mapas.DIRETORIO_ASSETS_GEO, mapas.nome_asset('municipio', 'uf', 'PE'))
+    gravado = os.stat(caminho).st_mtime_ns
+    mapas.url_geometria.cache_clear()
+    mapas.url_geometria('municipio', 'uf', 'PE')
+    assert os.stat(caminho).st_mtime_ns == gravado
+
+
+def test_mapa_do_filtro(cruzamento):
+    cubo = SimpleNamespace(cruzamento=lambda nome, copia=True: cruzamento if nome == 'modalidade_municipio' else None)
+    atual = SimpleNamespace(cubo=cubo, mapa_municipios=True)
+    figura = filtro.construir_mapa(('SP',), atual)
+    assert list(figura.data[0].locations) == ['3550308']
+    assert figura.layout.title.text == "Matrículas por Município"
+
+
+def test_mapa_do_filtro_sem_cruzamento():
+    atual = SimpleNamespace(cubo=SimpleNamespace(cruzamento=lambda nome, copia=True: None), mapa_municipios=True)
+    assert filtro.construir_mapa((), atual) == {}
+
+
+def test_registra_os_mapas_por_estado_com_a_malha_das_ufs(monkeypatch):
+    monkeypatch.setattr(graficos, 'GRAFICOS', {valor: especificacao for valor, especificacao in graficos.GRAFICOS.items()
+                                               if not valor.startswith('mapa_')})
+    assert graficos.registrar_mapas()
+    assert {'mapa_alunos_estado', 'mapa_cursos_estado'} <= set(graficos.GRAFICOS)
+    # De novo não duplica nada
+    assert graficos.registrar_mapas()
+
+    figura = graficos.gerar_figura('mapa_alunos_estado', CuboAgregado(linhas(250)))
+    traco = figura.data[0]
+    assert list(traco.locations) == ['26', '35']
+    assert list(traco.z) == [100, 250]
+    assert feicoes(traco.geojson) == {'26', '35'}
+
+
+def test_sem_a_malha_das_ufs_os_mapas_nao_entram(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapas, 'DIRETORIO_GEO', str(tmp_path / 'vazio'))
+    monkeypatch.setattr(graficos, 'GRAFICOS', {valor: especificacao for valor, especificacao in graficos.GRAFICOS.items()
+                                               if not valor.startswith('mapa_')})
+    assert not graficos.registrar_mapas()
+    assert 'mapa_alunos_estado' not in graficos.GRAFICOS
+
+
+def test_garantir_geometrias_baixa_so_as_que_faltam(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapas, 'DIRETORIO_GEO', str(tmp_path))
+    with open(os.path.join(DIRETORIO_GEO, 'uf.geojson'), encoding='utf-8') as arquivo:
+        malha = json.load(arquivo)
+    pedidos = []
+    monkeypatch.setattr(mapas, 'baixar', lambda nivel: pedidos.append(nivel) or malha)
+
+    assert mapas.garantir_geometrias(('uf',), relatorio=None) == [mapas.caminho_geometria('uf')]
+    assert mapas.garantir_geometrias(('uf',), relatorio=None) == []
+    assert pedidos == ['uf']
+
+
+def test_garantir_geometrias_sem_rede_para_com_erro(monkeypatch, tmp_path):
+    monkeypatch.setattr(mapas, 'DIRETORIO_GEO', str(tmp_path))
+
+    def sem_rede(nivel):
+        raise OSError('Name or service not known')
+
+    monkeypatch.setattr(mapas, 'baixar', sem_rede)
+    with pytest.raises(RuntimeError, match='python mapas.py baixar'):
+        mapas.garantir_geometrias(('uf',), relatorio=None)
+    assert not os.path.exists(mapas.caminho_geometria('uf'))
+
+
+def test_malha_topojson(tmp_path):
+    # Dois quadrados lado a lado dividindo o arco 0, com coordenadas
+    # quantizadas e codificadas por diferença; ~0 (-1) é o arco 0 invertido
+    topologia = {
+        'type': 'Topology',
+        'transform': {'scale': [0.5, 0.5], 'translate': [-40, -10]},
+        'arcs': [[[1, 0], [0, 1]], [[1, 1], [-1, 0], [0, -1], [1, 0]], [[1, 0], [1, 0], [0, 1], [-1, 0]]],
+        'objects': {'ufs': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'Polygon', 'arcs': [[0, 1]], 'properties': {'codarea': '26'}},
+            {'type': 'MultiPolygon', 'arcs': [[[-1, 2]]], 'id': 35},
+            {'type': None},
+        ]}},
+    }
+    caminho = tmp_path / 'ufs.topojson'
+    caminho.write_text(json.dumps(topologia), encoding='utf-8')
+
+    colecao = mapas.ler_malha(str(caminho))
+    pe, sp = colecao['features']
+    assert pe['geometry'] == {'type': 'Polygon', 'coordinates': [
+        [[-39.5, -10], [-39.5, -9.5], [-40, -9.5], [-40, -10], [-39.5, -10]]]}
+    assert sp['geometry'] == {'type': 'MultiPolygon', 'coordinates': [[
+        [[-39.5, -9.5], [-39.5, -10], [-39, -10], [-39, -9.5], [-39.5, -9.5]]]]}
+    assert [mapas.codigo_feicao(feicao) for feicao in colecao['features']] == ['26', '35']
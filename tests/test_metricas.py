@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graficos  # noqa: F401 (preenche GRAFICOS_CONHECIDOS)
+import metricas
+from metricas import ROTULO_OUTRO, ROTULO_VARIOS, rotulos_requisicao
+
+
+def test_grafico_desconhecido_vira_outro():
+    assert rotulos_requisicao('regiao') == ('regiao', '')
+    assert rotulos_requisicao('<script>') == (ROTULO_OUTRO, '')
+    assert rotulos_requisicao('consulta', ['SP']) == ('consulta', 'SP')
+
+
+def test_estados_com_cardinalidade_limitada():
+    assert rotulos_requisicao('regiao', ('PE', 'SP')) == ('regiao', ROTULO_VARIOS)
+    assert rotulos_requisicao('regiao', ('PE', 'XX')) == ('regiao', ROTULO_OUTRO)
+
+
+def test_drill_usa_o_nivel():
+    assert rotulos_requisicao('drill', nivel=2) == ('drill', 'nivel_2')
+
+
+def test_fases_nao_crescem_com_valores_do_navegador(monkeypatch):
+    monkeypatch.setattr(metricas, 'ATIVO', True)
+    monkeypatch.setattr(metricas, '_fases', type(metricas._fases)(metricas._fases.default_factory))
+    for i in range(500):
+        with metricas.requisicao(f'grafico{i}', [f'U{i}']):
+            pass
+        with metricas.requisicao('drill', nivel=i % 4):
+            pass
+    assert len(metricas._fases) == 5
+
+
+def test_contadores_do_cache_sobrevivem_a_troca_de_versao(monkeypatch, tmp_path):
+    from cache_figuras import CacheFiguras
+
+    monkeypatch.setattr(metricas, '_cache', {'acertos': 0, 'falhas': 0, 'exportados': 0})
+    base = tmp_path / 'base.csv'
+    base.write_text('a;b\n1;2\n')
+
+    def construir():
+        return {'data': [], 'layout': {}}
+
+    anterior = CacheFiguras(str(base), diretorio_exportado=None)
+    anterior.obter(('regiao', ()), construir)
+    anterior.obter(('regiao', ()), construir)
+    # Recarga da base: cache novo, contadores do processo continuam
+    atual = CacheFiguras(str(base), diretorio_exportado=None)
+    atual.obter(('regiao', ()), construir)
+    texto = metricas.texto_prometheus(atual)
+    assert 'disc_tac_cache_acertos_total 1\n' in texto
+    assert 'disc_tac_cache_falhas_total 2\n' in texto
+    assert 'disc_tac_cache_entradas 1\n' in texto
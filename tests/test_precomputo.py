@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carregador import FORMATO_SNAPSHOT
+from precomputo import _gravar_manifesto, calcular_cruzamento, diretorio_cruzamentos, ler_manifesto
+
+
+def test_linhas_sem_dimensao_continuam_no_cruzamento(tmp_path):
+    # Uma linha sem área, lida em blocos de poucas linhas: entra no primeiro
+    # agrupamento e na reagregação dos blocos seguintes
+    caminho = tmp_path / 'base.csv'
+    caminho.write_text(
+        'NO_AREA_CURSO_PROFISSIONAL;SG_UF;TP_DEPENDENCIA;QT_MAT_CURSO_TEC;NO_ENTIDADE\n'
+        'Saúde;PE;2;10;Escola A\n'
+        ';PE;2;5;Escola B\n'
+        'Saúde;PE;2;7;Escola C\n'
+        ';PE;2;3;Escola D\n',
+        encoding='latin1',
+    )
+
+    _, resultado, _ = calcular_cruzamento('area_uf_dependencia', str(caminho), limite_memoria_mb=0.0001)
+
+    assert resultado['QT_MAT_CURSO_TEC'].sum() == 25
+    sem_area = resultado[resultado['NO_AREA_CURSO_PROFISSIONAL'].isna()]
+    assert sem_area['QT_MAT_CURSO_TEC'].tolist() == [8]
+    assert sem_area['NO_ENTIDADE'].tolist() == [2]
+
+
+def test_manifesto_soma_cruzamentos_gravados_por_outro_processo(tmp_path):
+    # Dois workers leram o manifesto vazio e cada um calculou um cruzamento
+    caminho_csv = str(tmp_path / 'base.csv')
+    os.makedirs(diretorio_cruzamentos(caminho_csv))
+    primeiro = {'sha1': 'abc', 'formato': FORMATO_SNAPSHOT, 'cruzamentos': {'escolas': 1.0}}
+    segundo = {'sha1': 'abc', 'formato': FORMATO_SNAPSHOT, 'cruzamentos': {'cursos_escola': 2.0}}
+
+    _gravar_manifesto(caminho_csv, primeiro)
+    _gravar_manifesto(caminho_csv, segundo)
+
+    assert ler_manifesto(caminho_csv)['cruzamentos'] == {'escolas': 1.0, 'cursos_escola': 2.0}
+
+    # Base nova: o que foi calculado para a antiga não entra
+    _gravar_manifesto(caminho_csv, {'sha1': 'def', 'formato': FORMATO_SNAPSHOT, 'cruzamentos': {'escolas': 3.0}})
+    assert ler_manifesto(caminho_csv)['cruzamentos'] == {'escolas': 3.0}
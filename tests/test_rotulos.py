@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rotulos import texto_decimal, texto_valor_porcentagem
+
+
+def test_texto_decimal_igual_ao_format():
+    valores = np.array([0, 0.05, 0.15, 0.25, 1.45, 2.5, 99.95, 100, 33.333333, 12.35])
+    assert texto_decimal(valores).tolist() == [f"{valor:.1f}" for valor in valores]
+
+
+def test_texto_decimal_casas():
+    assert texto_decimal([1.2345, 7], casas=2).tolist() == ['1.23', '7.00']
+    assert texto_decimal([2.5, 3.5], casas=0).tolist() == [f"{2.5:.0f}", f"{3.5:.0f}"]
+
+
+def test_porcentagem_no_meio():
+    # 1 de 2000 = 0.05%: o rótulo antigo (f"{v:.1f}") mostrava 0.1%
+    assert texto_valor_porcentagem([1, 1999]).tolist() == ['1 (0.1%)', '1999 (100.0%)']
+
+
+def test_valor_porcentagem_igual_ao_laco():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        valores = rng.integers(0, 5000, size=rng.integers(1, 30))
+        if not valores.sum():
+            continue
+        total = valores.sum()
+        esperado = [f"{v} ({v / total * 100:.1f}%)" for v in valores]
+        assert texto_valor_porcentagem(valores).tolist() == esperado